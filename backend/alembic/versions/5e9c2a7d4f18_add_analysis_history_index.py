@@ -0,0 +1,26 @@
+"""Add couple history index to analysis_requests
+
+Revision ID: 5e9c2a7d4f18
+Revises: d8b3e6f15a27
+Create Date: 2026-10-18 18:21:53.604418
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5e9c2a7d4f18'
+down_revision: Union[str, None] = 'd8b3e6f15a27'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_analysis_requests_couple_created', 'analysis_requests', ['couple_id', 'created_at', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_requests_couple_created', table_name='analysis_requests')
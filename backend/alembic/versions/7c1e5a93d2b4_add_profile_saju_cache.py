@@ -0,0 +1,32 @@
+"""Add cached saju columns to profiles
+
+Revision ID: 7c1e5a93d2b4
+Revises: 2ffaa4810757
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7c1e5a93d2b4'
+down_revision: Union[str, None] = '2ffaa4810757'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('profiles', sa.Column('saju_pillars', sa.JSON(), nullable=True))
+    op.add_column('profiles', sa.Column('saju_sal', sa.JSON(), nullable=True))
+    op.add_column('profiles', sa.Column('saju_penalty', sa.Float(), nullable=True))
+    op.add_column('profiles', sa.Column('saju_version', sa.String(length=32), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column('profiles', 'saju_version')
+    op.drop_column('profiles', 'saju_penalty')
+    op.drop_column('profiles', 'saju_sal')
+    op.drop_column('profiles', 'saju_pillars')
@@ -0,0 +1,30 @@
+"""Add job queue columns to analysis_requests
+
+Revision ID: a41d7f2c9b60
+Revises: 7c1e5a93d2b4
+Create Date: 2026-10-18 15:40:07.218356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a41d7f2c9b60'
+down_revision: Union[str, None] = '7c1e5a93d2b4'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('analysis_requests', sa.Column('started_at', sa.DateTime(timezone=True), nullable=True))
+    op.add_column('analysis_requests', sa.Column('error_message', sa.Text(), nullable=True))
+    op.create_index('ix_analysis_requests_status_created', 'analysis_requests', ['status', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index('ix_analysis_requests_status_created', table_name='analysis_requests')
+    op.drop_column('analysis_requests', 'error_message')
+    op.drop_column('analysis_requests', 'started_at')
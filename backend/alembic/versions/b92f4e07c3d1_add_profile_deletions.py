@@ -0,0 +1,35 @@
+"""Add profile_deletions table
+
+Revision ID: b92f4e07c3d1
+Revises: 5e9c2a7d4f18
+Create Date: 2026-10-18 21:08:17.352940
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b92f4e07c3d1'
+down_revision: Union[str, None] = '5e9c2a7d4f18'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('profile_deletions',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('(CURRENT_TIMESTAMP)'), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_profile_deletions_id'), 'profile_deletions', ['id'], unique=False)
+    op.create_index(op.f('ix_profile_deletions_deleted_at'), 'profile_deletions', ['deleted_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_profile_deletions_deleted_at'), table_name='profile_deletions')
+    op.drop_index(op.f('ix_profile_deletions_id'), table_name='profile_deletions')
+    op.drop_table('profile_deletions')
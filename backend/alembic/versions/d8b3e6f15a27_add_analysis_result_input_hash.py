@@ -0,0 +1,30 @@
+"""Add input hash and engine version to analysis_results
+
+Revision ID: d8b3e6f15a27
+Revises: a41d7f2c9b60
+Create Date: 2026-10-18 17:05:44.931270
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd8b3e6f15a27'
+down_revision: Union[str, None] = 'a41d7f2c9b60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column('analysis_results', sa.Column('input_hash', sa.String(length=64), nullable=True))
+    op.add_column('analysis_results', sa.Column('engine_version', sa.String(length=32), nullable=True))
+    op.create_index(op.f('ix_analysis_results_input_hash'), 'analysis_results', ['input_hash'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_analysis_results_input_hash'), table_name='analysis_results')
+    op.drop_column('analysis_results', 'engine_version')
+    op.drop_column('analysis_results', 'input_hash')
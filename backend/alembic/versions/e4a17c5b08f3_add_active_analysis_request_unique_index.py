@@ -0,0 +1,38 @@
+"""Allow one active analysis request per couple
+
+Revision ID: e4a17c5b08f3
+Revises: b92f4e07c3d1
+Create Date: 2026-10-18 21:47:32.118604
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e4a17c5b08f3'
+down_revision: Union[str, None] = 'b92f4e07c3d1'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+ACTIVE_STATUS_CLAUSE = "status IN ('PENDING', 'PROCESSING')"
+
+
+def upgrade() -> None:
+    # 이미 쌓인 중복 요청은 커플별로 가장 최근 것만 남기고 실패 처리해야 인덱스를 만들 수 있다
+    op.execute(
+        "UPDATE analysis_requests SET status = 'FAILED', error_message = 'Superseded by a newer request' "
+        f"WHERE {ACTIVE_STATUS_CLAUSE} AND id NOT IN ("
+        f"SELECT max_id FROM (SELECT MAX(id) AS max_id FROM analysis_requests WHERE {ACTIVE_STATUS_CLAUSE} GROUP BY couple_id) AS latest"
+        ")"
+    )
+    op.create_index(
+        'uq_analysis_requests_couple_active', 'analysis_requests', ['couple_id'], unique=True,
+        postgresql_where=sa.text(ACTIVE_STATUS_CLAUSE), sqlite_where=sa.text(ACTIVE_STATUS_CLAUSE)
+    )
+
+
+def downgrade() -> None:
+    op.drop_index('uq_analysis_requests_couple_active', table_name='analysis_requests')
@@ -0,0 +1,139 @@
+"""
+천간/지지 점수 요청 micro-batching
+
+동시에 들어온 /calculate 요청들의 sky/earth 점수 계산을 최대 max_wait_ms 동안
+또는 max_batch_size 개가 찰 때까지 모았다가, 한 번의 batched forward pass 로
+처리하고 각 요청의 future 를 채운다. 점수표(USE_SCORE_TABLES)를 끄고
+모델을 직접 호출할 때 (예: 새 모델 검증) 프레임워크 호출 비용을 나눠 갖기 위한 것.
+"""
+import asyncio
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+from app.ai.executor import EngineExecutor, get_engine_executor
+
+SCORE_KINDS = ('sky', 'earth')
+
+
+class ScoreBatcher:
+
+    def __init__(self, executor: EngineExecutor, max_batch_size: int = 64, max_wait_ms: float = 2.0):
+        self.executor = executor
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+
+        self._pending: Dict[str, List[Tuple[int, int, asyncio.Future]]] = {kind: [] for kind in SCORE_KINDS}
+        self._timers: Dict[str, Optional[asyncio.TimerHandle]] = {kind: None for kind in SCORE_KINDS}
+        self._tasks = set()
+
+        self.batches = 0
+        self.items = 0
+        self.flushed_full = 0
+        self.flushed_timeout = 0
+
+    async def score(self, kind: str, first: int, second: int) -> float:
+        if kind not in SCORE_KINDS:
+            raise ValueError(f"Unknown score kind: {kind}")
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending[kind]
+        pending.append((first, second, future))
+
+        if len(pending) >= self.max_batch_size:
+            self.flushed_full += 1
+            self._flush(kind)
+        elif self._timers[kind] is None:
+            self._timers[kind] = loop.call_later(self.max_wait, self._flush_on_timeout, kind)
+
+        return await future
+
+    def _flush_on_timeout(self, kind: str):
+        self._timers[kind] = None
+        if self._pending[kind]:
+            self.flushed_timeout += 1
+            self._flush(kind)
+
+    def _flush(self, kind: str):
+        if self._timers[kind] is not None:
+            self._timers[kind].cancel()
+            self._timers[kind] = None
+
+        batch = self._pending[kind]
+        self._pending[kind] = []
+        task = asyncio.ensure_future(self._run_batch(kind, batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run_batch(self, kind: str, batch: List[Tuple[int, int, asyncio.Future]]):
+        self.batches += 1
+        self.items += len(batch)
+        try:
+            scores, _ = await self.executor.call(
+                'score_pairs', kind,
+                [first for first, _, _ in batch],
+                [second for _, second, _ in batch]
+            )
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        for (_, _, future), score in zip(batch, scores):
+            if not future.done():
+                future.set_result(float(score))
+
+    async def analyze_compatibility(
+        self,
+        year1: int, month1: int, day1: int, hour1: int, gender1: int,
+        year2: int, month2: int, day2: int, hour2: int, gender2: int
+    ) -> Dict[str, Any]:
+        # 기둥 조회, 규칙 계산, 결과 조립은 이벤트 루프가 아니라 엔진 풀에서 실행하고
+        # 여러 요청이 모이는 천간/지지 점수 계산만 묶는다
+        prepared, _ = await self.executor.call(
+            'prepare_compatibility',
+            year1, month1, day1, hour1, gender1,
+            year2, month2, day2, hour2, gender2
+        )
+        if prepared['cached'] is not None:
+            return prepared['cached']
+
+        saju1, saju2 = prepared['saju1'], prepared['saju2']
+        sky_score, earth_score = await asyncio.gather(
+            self.score('sky', saju1[0], saju2[0]),
+            self.score('earth', saju1[1], saju2[1])
+        )
+
+        result, _ = await self.executor.call(
+            'compose_result', saju1, saju2, gender1, gender2, sky_score, earth_score
+        )
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        avg_batch_size = self.items / self.batches if self.batches else 0.0
+        return {
+            'max_batch_size': self.max_batch_size,
+            'max_wait_ms': self.max_wait * 1000,
+            'batches': self.batches,
+            'items': self.items,
+            'avg_batch_size': round(avg_batch_size, 3),
+            'fill_ratio': round(avg_batch_size / self.max_batch_size, 3),
+            'flushed_full': self.flushed_full,
+            'flushed_timeout': self.flushed_timeout,
+            'pending': {kind: len(self._pending[kind]) for kind in SCORE_KINDS},
+        }
+
+
+_batcher_instance = None
+
+
+def get_score_batcher() -> ScoreBatcher:
+    global _batcher_instance
+    if _batcher_instance is None:
+        _batcher_instance = ScoreBatcher(
+            get_engine_executor(),
+            max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+            max_wait_ms=settings.MICRO_BATCH_MAX_WAIT_MS
+        )
+    return _batcher_instance
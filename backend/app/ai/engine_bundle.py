@@ -0,0 +1,125 @@
+"""
+엔진 아티팩트 번들 (가중치, 점수표, 절기 인덱스, 규칙 테이블)
+
+파일 구조:
+    MAGIC(8) | format_version(uint32) | header_len(uint32) | header(JSON) | 배열 데이터
+배열은 64바이트 경계에 정렬된 raw 바이트로 저장되고, 읽을 때는 파일을 mmap 해서
+복사 없이 read-only ndarray 로 노출한다. 여러 uvicorn worker 가 같은 페이지를 공유한다.
+"""
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import numpy as np
+from typing import Dict, Tuple
+
+BUNDLE_MAGIC = b'SAJUBNDL'
+BUNDLE_FORMAT_VERSION = 1
+ALIGNMENT = 64
+
+_PREAMBLE = struct.Struct('<8sII')
+
+
+def _align(n: int) -> int:
+    return (n + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+def write_bundle(path: str, arrays: Dict[str, np.ndarray], metadata: Dict) -> str:
+    """배열들을 번들 파일로 저장하고 데이터 영역의 sha256 을 돌려준다."""
+    entries = {}
+    chunks = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.ascontiguousarray(array)
+        if array.dtype.hasobject:
+            raise ValueError(f"Object arrays cannot be bundled: {name}")
+        data = array.tobytes()
+        padding = _align(len(data)) - len(data)
+        entries[name] = {
+            'dtype': array.dtype.str,
+            'shape': list(array.shape),
+            'offset': offset,
+            'nbytes': len(data),
+        }
+        chunks.append(data + b'\0' * padding)
+        offset += len(data) + padding
+
+    body = b''.join(chunks)
+    checksum = hashlib.sha256(body).hexdigest()
+
+    header = json.dumps({
+        'metadata': metadata,
+        'arrays': entries,
+        'checksum': checksum,
+    }, ensure_ascii=False).encode('utf-8')
+    header += b' ' * (_align(_PREAMBLE.size + len(header)) - _PREAMBLE.size - len(header))
+
+    # 다른 프로세스가 mmap 해 둔 파일을 덮어쓰면 (truncate) 그 프로세스가 SIGBUS 로 죽는다.
+    # 같은 디렉터리의 임시 파일에 쓴 뒤 rename 으로 교체하면 기존 reader 는 이전 파일을 계속 본다.
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(_PREAMBLE.pack(BUNDLE_MAGIC, BUNDLE_FORMAT_VERSION, len(header)))
+            f.write(header)
+            f.write(body)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    _fsync_directory(directory)
+
+    return checksum
+
+
+def _fsync_directory(directory: str):
+    # rename 자체를 디스크에 남긴다 (Windows 는 디렉터리를 열 수 없으므로 건너뜀)
+    try:
+        fd = os.open(directory, os.O_RDONLY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def read_bundle(path: str, verify: bool = True) -> Tuple[Dict[str, np.ndarray], Dict]:
+    """번들을 mmap 으로 열어 (배열 dict, header) 를 돌려준다."""
+    raw = np.memmap(path, dtype=np.uint8, mode='r')
+
+    magic, version, header_len = _PREAMBLE.unpack(raw[:_PREAMBLE.size].tobytes())
+    if magic != BUNDLE_MAGIC:
+        raise ValueError(f"Not an engine bundle: {path}")
+    if version != BUNDLE_FORMAT_VERSION:
+        raise ValueError(f"Unsupported bundle format version {version} (expected {BUNDLE_FORMAT_VERSION})")
+
+    start = _PREAMBLE.size + header_len
+    header = json.loads(raw[_PREAMBLE.size:start].tobytes().decode('utf-8'))
+    body = raw[start:]
+
+    if verify and hashlib.sha256(body).hexdigest() != header['checksum']:
+        raise ValueError(f"Bundle checksum mismatch: {path}")
+
+    arrays = {}
+    for name, entry in header['arrays'].items():
+        chunk = body[entry['offset']:entry['offset'] + entry['nbytes']]
+        arrays[name] = chunk.view(np.dtype(entry['dtype'])).reshape(entry['shape'])
+
+    return arrays, header
+
+
+def split_prefix(arrays: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    prefix = prefix + '/'
+    return {name[len(prefix):]: array for name, array in arrays.items() if name.startswith(prefix)}
+
+
+def with_prefix(arrays: Dict[str, np.ndarray], prefix: str) -> Dict[str, np.ndarray]:
+    return {f'{prefix}/{name}': array for name, array in arrays.items()}
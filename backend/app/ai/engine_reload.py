@@ -0,0 +1,163 @@
+"""
+엔진 무중단 교체
+
+관리자 API 나 파일 감시에서 호출한다. 새 엔진은 백그라운드에서 만들고
+warmup + golden 확인을 통과해야 교체된다. 결과 캐시는 엔진 버전으로 키가
+나뉘어 있어 자동으로 비워지고, 살 점수가 바뀌었으면 궁합 검색 행렬도 다시 읽는다.
+
+엔진은 uvicorn 워커마다 따로 있으므로, 관리자 API 로 교체에 성공한 워커는
+ENGINE_RELOAD_MARKER_PATH 에 교체 기록을 남기고 다른 워커들은
+ENGINE_RELOAD_SYNC_INTERVAL 마다 이 기록을 확인해 같은 교체를 한다.
+"""
+import asyncio
+import json
+import os
+import tempfile
+import time
+import uuid
+from typing import Any, Dict, List, Optional
+
+from app.config import settings
+from app.ai.executor import get_engine_executor
+from app.ai.profile_matrix import get_profile_matrix
+from app.ai.shadow import get_shadow_evaluator
+
+
+# 이 워커가 마지막으로 따른(또는 남긴) 교체 기록
+_applied_marker: Optional[str] = None
+
+
+async def reload_engine(
+    bundle_path: Optional[str] = None,
+    max_delta: Optional[float] = None,
+    broadcast: bool = True
+) -> Dict[str, Any]:
+    """
+    broadcast: 교체에 성공하면 교체 기록을 남겨 다른 워커도 따라오게 한다.
+    ENGINE_RELOAD_SYNC_INTERVAL 이 0 이면 이 워커에만 적용되며 report['scope'] 로 알려준다.
+    """
+    global _applied_marker
+    if max_delta is None and settings.ENGINE_RELOAD_MAX_DELTA > 0:
+        max_delta = settings.ENGINE_RELOAD_MAX_DELTA
+
+    report = await get_engine_executor().reload_engine(bundle_path, max_delta)
+    if report['swapped'] and report.get('content_changed'):
+        get_profile_matrix().reset()
+        # 비교 기준이 바뀌었으므로 후보 엔진 통계도 새로 모은다
+        get_shadow_evaluator().reset()
+
+    report['worker_pid'] = os.getpid()
+    report['scope'] = 'all_workers' if settings.ENGINE_RELOAD_SYNC_INTERVAL > 0 else 'this_worker'
+    if broadcast and report['swapped'] and settings.ENGINE_RELOAD_SYNC_INTERVAL > 0:
+        try:
+            marker = write_reload_marker(bundle_path, max_delta, report['version'])
+            _applied_marker = marker['id']
+        except OSError as e:
+            print(f"⚠ Warning: Could not write engine reload marker, other workers keep the old engine: {e}")
+            report['scope'] = 'this_worker'
+    return report
+
+
+def read_reload_marker() -> Optional[Dict[str, Any]]:
+    try:
+        with open(settings.ENGINE_RELOAD_MARKER_PATH) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"⚠ Warning: Could not read engine reload marker: {e}")
+        return None
+
+
+def write_reload_marker(bundle_path: Optional[str], max_delta: Optional[float], version: str) -> Dict[str, Any]:
+    """교체 기록을 임시 파일에 쓴 뒤 이름을 바꿔, 읽는 워커가 반쯤 쓴 파일을 보지 않게 한다."""
+    marker = {
+        'id': uuid.uuid4().hex,
+        'bundle_path': bundle_path,
+        'max_delta': max_delta,
+        'version': version,
+        'pid': os.getpid(),
+        'at': time.time()
+    }
+    path = os.path.abspath(settings.ENGINE_RELOAD_MARKER_PATH)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(marker, f)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    return marker
+
+
+def apply_reload_marker_at_startup():
+    """
+    다른 워커가 번들을 지정해 교체한 뒤 새로 뜬 워커도 같은 번들을 쓰도록 한다.
+    엔진은 처음 호출될 때 만들어지므로 시작 시 설정만 바꾸면 된다.
+    """
+    global _applied_marker
+    marker = read_reload_marker()
+    if marker is None:
+        return
+    _applied_marker = marker['id']
+    if marker.get('bundle_path') and marker['bundle_path'] != settings.ENGINE_BUNDLE_PATH:
+        settings.ENGINE_BUNDLE_PATH = marker['bundle_path']
+        print(f"✓ Using engine bundle from the last reload: {marker['bundle_path']}")
+
+
+async def watch_reload_marker(interval: float):
+    """다른 워커가 남긴 교체 기록을 interval 초마다 확인해 같은 교체를 한다."""
+    global _applied_marker
+    while True:
+        await asyncio.sleep(interval)
+        marker = read_reload_marker()
+        if marker is None or marker['id'] == _applied_marker:
+            continue
+
+        # 실패해도 같은 기록으로 계속 재시도하지 않는다
+        _applied_marker = marker['id']
+        print(f"✓ Engine reloaded by worker {marker['pid']}, following: {marker.get('bundle_path') or 'current files'}")
+        try:
+            report = await reload_engine(marker.get('bundle_path'), marker.get('max_delta'), broadcast=False)
+        except Exception as e:
+            print(f"⚠ Warning: Engine reload from marker failed: {e}")
+            continue
+        if not report['swapped']:
+            print(f"⚠ Warning: Engine reload from marker rejected, this worker keeps {report.get('previous_version')}")
+        elif report['version'] != marker['version']:
+            print(f"⚠ Warning: Engine version {report['version']} differs from the reloading worker's {marker['version']}")
+
+
+def engine_source_paths() -> List[str]:
+    if settings.ENGINE_BUNDLE_PATH:
+        return [settings.ENGINE_BUNDLE_PATH]
+    return [settings.SKY_MODEL_PATH, settings.EARTH_MODEL_PATH, settings.CALENDAR_FILE_PATH]
+
+
+def _mtimes() -> Dict[str, Optional[float]]:
+    return {
+        path: os.path.getmtime(path) if os.path.exists(path) else None
+        for path in engine_source_paths()
+    }
+
+
+async def watch_engine_sources(interval: float):
+    """모델/절기/번들 파일의 수정 시각을 interval 초마다 확인해 바뀌면 엔진을 교체한다."""
+    last = _mtimes()
+    while True:
+        await asyncio.sleep(interval)
+        current = _mtimes()
+        if current == last:
+            continue
+
+        changed = [path for path in current if current[path] != last.get(path)]
+        # 확인에 실패한 파일로 계속 재시도하지 않도록 지금 상태를 기준으로 삼는다
+        last = current
+        print(f"✓ Engine source files changed, reloading: {changed}")
+        try:
+            # 파일 감시는 워커마다 돌고 있으므로 교체 기록을 남기지 않는다
+            await reload_engine(broadcast=False)
+        except Exception as e:
+            print(f"⚠ Warning: Engine reload failed: {e}")
@@ -0,0 +1,208 @@
+"""
+엔진 호출 전용 bounded executor
+
+SajuEngine 호출은 CPU 작업이므로 이벤트 루프에서 직접 실행하지 않고
+스레드/프로세스 풀로 넘긴다. 실행 중 + 대기 중 작업 수가 한도를 넘으면
+큐에 쌓지 않고 즉시 EngineBusyError 를 던진다.
+"""
+import asyncio
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.config import settings
+
+
+class EngineBusyError(Exception):
+    pass
+
+
+def _warm_engine(bundle_path: Optional[str] = None):
+    from app.ai.saju_engine import get_engine
+    if bundle_path is not None:
+        settings.ENGINE_BUNDLE_PATH = bundle_path
+    get_engine()
+
+
+def _reload_engine(bundle_path: Optional[str], max_delta: Optional[float]) -> Dict[str, Any]:
+    from app.ai.saju_engine import reload_engine
+    return reload_engine(bundle_path, max_delta=max_delta)
+
+
+def _validate_engine(reference: List[Dict], max_delta: Optional[float], bundle_path: Optional[str]) -> Dict[str, Any]:
+    # 새 프로세스 풀의 워커에서 실행된다 (initializer 가 이미 새 엔진을 만들어 둠)
+    from app.ai.saju_engine import get_engine
+    engine = get_engine()
+    report = engine.validate(reference, max_delta, bundle_path)
+    # 기존 워커의 엔진과 비교할 수 없으므로 바뀐 것으로 본다
+    report['content_changed'] = True
+    return report
+
+
+def _call_engine(method: str, args: tuple, kwargs: dict) -> Tuple[Any, float, float]:
+    # 프로세스 풀에서도 비교할 수 있도록 wall clock 으로 측정
+    from app.ai.saju_engine import get_engine
+    started = time.time()
+    result = getattr(get_engine(), method)(*args, **kwargs)
+    return result, started, time.time()
+
+
+class EngineExecutor:
+
+    def __init__(self, kind: str = 'thread', pool_size: int = 4, max_queue: int = 64):
+        self.kind = kind
+        self.pool_size = pool_size
+        self.max_queue = max_queue
+        self._pool: Optional[Executor] = None
+
+        self.in_flight = 0
+        self.completed = 0
+        self.failed = 0
+        self.rejected = 0
+        self.total_queue_wait = 0.0
+        self.total_execution = 0.0
+        self.max_queue_wait = 0.0
+        self.max_execution = 0.0
+        self.reloads = 0
+        self.last_reload: Optional[Dict[str, Any]] = None
+        self._reload_lock = asyncio.Lock()
+
+    @property
+    def pool(self) -> Executor:
+        if self._pool is None:
+            if self.kind == 'process':
+                # 시작 후 바뀐 번들 설정(교체 기록)도 새 프로세스에 넘긴다
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.pool_size, initializer=_warm_engine,
+                    initargs=(settings.ENGINE_BUNDLE_PATH or None,)
+                )
+            else:
+                self._pool = ThreadPoolExecutor(max_workers=self.pool_size, thread_name_prefix='saju-engine')
+        return self._pool
+
+    async def call(self, method: str, *args, **kwargs) -> Tuple[Any, Dict[str, float]]:
+        """엔진 메서드를 풀에서 실행하고 (결과, {'queue_wait_ms', 'execution_ms'}) 를 돌려준다."""
+        if self.in_flight >= self.pool_size + self.max_queue:
+            self.rejected += 1
+            raise EngineBusyError(
+                f"Engine queue is full ({self.in_flight} in flight, limit {self.pool_size + self.max_queue})"
+            )
+
+        self.in_flight += 1
+        submitted = time.time()
+        try:
+            loop = asyncio.get_running_loop()
+            result, started, finished = await loop.run_in_executor(
+                self.pool, _call_engine, method, args, kwargs
+            )
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+
+        queue_wait = max(0.0, started - submitted)
+        execution = finished - started
+        self.completed += 1
+        self.total_queue_wait += queue_wait
+        self.total_execution += execution
+        self.max_queue_wait = max(self.max_queue_wait, queue_wait)
+        self.max_execution = max(self.max_execution, execution)
+
+        return result, {
+            'queue_wait_ms': round(queue_wait * 1000, 3),
+            'execution_ms': round(execution * 1000, 3),
+        }
+
+    async def reload_engine(self, bundle_path: Optional[str] = None, max_delta: Optional[float] = None) -> Dict[str, Any]:
+        """
+        백그라운드에서 새 엔진을 만들고 확인한 뒤 교체한다. 실행 중인 요청은 기존 엔진으로 끝난다.
+        thread: 전역 엔진 참조를 교체, process: 새 엔진으로 warmup 된 풀로 교체
+        """
+        async with self._reload_lock:
+            loop = asyncio.get_running_loop()
+            if self.kind == 'process':
+                report = await self._reload_process_pool(bundle_path, max_delta)
+            else:
+                report = await loop.run_in_executor(None, _reload_engine, bundle_path, max_delta)
+
+            if report['swapped']:
+                self.reloads += 1
+                if bundle_path is not None:
+                    settings.ENGINE_BUNDLE_PATH = bundle_path
+            self.last_reload = {**report, 'at': time.time()}
+            return report
+
+    async def _reload_process_pool(self, bundle_path: Optional[str], max_delta: Optional[float]) -> Dict[str, Any]:
+        reference, _ = await self.call('golden_outputs')
+
+        loop = asyncio.get_running_loop()
+        started = time.time()
+        pool = ProcessPoolExecutor(
+            max_workers=self.pool_size, initializer=_warm_engine, initargs=(bundle_path,)
+        )
+        try:
+            report = await loop.run_in_executor(
+                pool, _validate_engine, reference, max_delta,
+                settings.ENGINE_BUNDLE_PATH if bundle_path is None else bundle_path
+            )
+        except Exception:
+            pool.shutdown(wait=False)
+            raise
+        report['load_ms'] = round((time.time() - started) * 1000, 1)
+
+        report['swapped'] = report['ok']
+        if not report['ok']:
+            pool.shutdown(wait=False)
+            return report
+
+        # 기존 풀에 들어간 작업은 기존 워커에서 끝나고 풀이 정리된다
+        old_pool, self._pool = self._pool, pool
+        if old_pool is not None:
+            old_pool.shutdown(wait=False)
+        return report
+
+    def stats(self) -> Dict[str, Any]:
+        completed = max(self.completed, 1)
+        return {
+            'kind': self.kind,
+            'pool_size': self.pool_size,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'queued': max(0, self.in_flight - self.pool_size),
+            'completed': self.completed,
+            'failed': self.failed,
+            'rejected': self.rejected,
+            'avg_queue_wait_ms': round(self.total_queue_wait / completed * 1000, 3),
+            'avg_execution_ms': round(self.total_execution / completed * 1000, 3),
+            'max_queue_wait_ms': round(self.max_queue_wait * 1000, 3),
+            'max_execution_ms': round(self.max_execution * 1000, 3),
+            'reloads': self.reloads,
+            'last_reload': self.last_reload,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+_executor_instance = None
+
+
+def get_engine_executor() -> EngineExecutor:
+    global _executor_instance
+    if _executor_instance is None:
+        _executor_instance = EngineExecutor(
+            kind=settings.ENGINE_EXECUTOR,
+            pool_size=settings.ENGINE_POOL_SIZE,
+            max_queue=settings.ENGINE_MAX_QUEUE
+        )
+    return _executor_instance
+
+
+def shutdown_engine_executor():
+    global _executor_instance
+    if _executor_instance is not None:
+        _executor_instance.shutdown()
+        _executor_instance = None
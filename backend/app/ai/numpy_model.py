@@ -0,0 +1,110 @@
+"""
+TensorFlow 없이 sky3000/earth3000 모델을 실행하는 NumPy 추론기
+
+두 모델은 Dense 층만 쌓인 MLP 이므로 (Dropout 은 추론 시 항등),
+.h5 에서 kernel/bias 와 활성화 함수만 읽어와 행렬곱으로 forward pass 를 수행한다.
+Keras 모델과 같은 predict(x, verbose=0) 인터페이스를 제공한다.
+"""
+import json
+import numpy as np
+from typing import Dict, List, Tuple
+
+
+def _relu(x: np.ndarray) -> np.ndarray:
+    return np.maximum(x, 0)
+
+
+def _sigmoid(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def _linear(x: np.ndarray) -> np.ndarray:
+    return x
+
+
+ACTIVATIONS = {
+    'relu': _relu,
+    'sigmoid': _sigmoid,
+    'linear': _linear,
+}
+
+
+class NumpyMLP:
+
+    def __init__(self, layers: List[Tuple[np.ndarray, np.ndarray, str]]):
+        for _, _, activation in layers:
+            if activation not in ACTIVATIONS:
+                raise ValueError(f"Unsupported activation: {activation}")
+        self.layers = [
+            (np.asarray(kernel, dtype=np.float32), np.asarray(bias, dtype=np.float32), activation)
+            for kernel, bias, activation in layers
+        ]
+
+    @property
+    def input_dim(self) -> int:
+        return self.layers[0][0].shape[0]
+
+    @classmethod
+    def load(cls, path: str) -> "NumpyMLP":
+        if path.endswith('.npz'):
+            return cls.from_npz(path)
+        return cls.from_h5(path)
+
+    @classmethod
+    def from_h5(cls, path: str) -> "NumpyMLP":
+        import h5py
+
+        layers = []
+        with h5py.File(path, 'r') as f:
+            config = f.attrs['model_config']
+            if isinstance(config, bytes):
+                config = config.decode('utf-8')
+            config = json.loads(config)
+
+            weights = f['model_weights']
+            for layer in config['config']['layers']:
+                if layer['class_name'] == 'Dropout' or layer['class_name'] == 'InputLayer':
+                    continue
+                if layer['class_name'] != 'Dense':
+                    raise ValueError(f"Unsupported layer: {layer['class_name']}")
+
+                name = layer['config']['name']
+                group = weights[name]
+                weight_names = [
+                    n.decode('utf-8') if isinstance(n, bytes) else n
+                    for n in group.attrs['weight_names']
+                ]
+                kernel = next(group[n][:] for n in weight_names if 'kernel' in n)
+                bias = next(group[n][:] for n in weight_names if 'bias' in n)
+                layers.append((kernel, bias, layer['config'].get('activation', 'linear')))
+
+        return cls(layers)
+
+    @classmethod
+    def from_npz(cls, path: str) -> "NumpyMLP":
+        with np.load(path) as data:
+            return cls.from_arrays(dict(data))
+
+    @classmethod
+    def from_arrays(cls, arrays) -> "NumpyMLP":
+        activations = [str(a) for a in arrays['activations']]
+        return cls([
+            (arrays[f'kernel_{i}'], arrays[f'bias_{i}'], activation)
+            for i, activation in enumerate(activations)
+        ])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        arrays = {'activations': np.array([activation for _, _, activation in self.layers])}
+        for i, (kernel, bias, _) in enumerate(self.layers):
+            arrays[f'kernel_{i}'] = kernel
+            arrays[f'bias_{i}'] = bias
+        return arrays
+
+    def save_npz(self, path: str):
+        np.savez(path, **self.to_arrays())
+
+    def predict(self, x, verbose=0) -> np.ndarray:
+        x = np.asarray(x, dtype=np.float32)
+        for kernel, bias, activation in self.layers:
+            x = ACTIVATIONS[activation](x @ kernel + bias)
+        return x
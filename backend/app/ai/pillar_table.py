@@ -0,0 +1,135 @@
+"""
+생년월일시 -> 사주 기둥 조회표
+
+1904-01-01 부터 EXTEND_UNTIL_YEAR 말까지 (일 오프셋, 시) 마다 기둥 값을
+uint8 로 미리 계산해 둔 배열. 파일로 저장해 두고 mmap 으로 열기 때문에
+단건 조회는 배열 한 번 읽기, 배치 조회는 fancy-index 한 번이다.
+절기 인덱스(cal.csv)나 기둥 계산식이 바뀌면 source_hash 가 달라져 다시 생성된다.
+"""
+import hashlib
+import os
+from datetime import date
+import numpy as np
+from typing import Callable, Dict, List, Optional, Tuple
+
+from app.ai.engine_bundle import read_bundle, write_bundle
+from app.ai.saju_calendar import EXTEND_UNTIL_YEAR, SolarTermIndex, days_from_civil
+
+START_YEAR = 1904
+HOURS = 24
+MONTH_DAYS = np.array([0, 31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+# 기둥 계산식을 바꾸면 올려서 기존 조회표를 무효화한다
+PILLAR_TABLE_VERSION = 2
+
+PillarFn = Callable[[np.ndarray, np.ndarray, np.ndarray, np.ndarray], np.ndarray]
+
+
+def source_hash(solar_terms: SolarTermIndex) -> str:
+    digest = hashlib.sha256(f'pillar-table-v{PILLAR_TABLE_VERSION}'.encode())
+    for array in solar_terms.to_arrays().values():
+        digest.update(np.ascontiguousarray(array).tobytes())
+    return digest.hexdigest()
+
+
+class PillarTable:
+
+    def __init__(self, table: np.ndarray, start_day: int, source: str = ''):
+        # table[d, h]: start_day + d 일, h 시의 기둥 값 (1-based, uint8)
+        self.table = table
+        self.start_day = int(start_day)
+        self.source = source
+        self._start_ordinal = date(1970, 1, 1).toordinal() + self.start_day
+
+    @classmethod
+    def build(cls, pillar_fn: PillarFn, source: str = '',
+              start_year: int = START_YEAR, end_year: int = EXTEND_UNTIL_YEAR) -> "PillarTable":
+        dates = np.arange(f'{start_year}-01-01', f'{end_year + 1}-01-01', dtype='datetime64[D]')
+        months = dates.astype('datetime64[M]')
+        year = months.astype('datetime64[Y]').astype(np.int64) + 1970
+        month = months.astype(np.int64) % 12 + 1
+        day = (dates - months).astype(np.int64) + 1
+
+        pillars = pillar_fn(
+            np.repeat(year, HOURS), np.repeat(month, HOURS), np.repeat(day, HOURS),
+            np.tile(np.arange(HOURS), len(dates))
+        )
+        table = pillars.astype(np.uint8).reshape(len(dates), HOURS, -1)
+        return cls(table, days_from_civil(start_year, 1, 1), source)
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray], source: str = '') -> "PillarTable":
+        return cls(arrays['table'], int(arrays['start_day'][0]), source)
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {'table': self.table, 'start_day': np.array([self.start_day], dtype=np.int64)}
+
+    @classmethod
+    def load(cls, path: str) -> "PillarTable":
+        arrays, header = read_bundle(path)
+        return cls.from_arrays(arrays, header['metadata'].get('source_hash', ''))
+
+    def save(self, path: str) -> str:
+        metadata = {
+            'source_hash': self.source,
+            'start_day': self.start_day,
+            'shape': list(self.table.shape),
+        }
+        return write_bundle(path, self.to_arrays(), metadata)
+
+    @classmethod
+    def load_or_build(cls, path: Optional[str], solar_terms: SolarTermIndex, pillar_fn: PillarFn) -> "PillarTable":
+        source = source_hash(solar_terms)
+
+        if path and os.path.exists(path):
+            try:
+                table = cls.load(path)
+                if table.source == source:
+                    print(f"✓ Loaded pillar table from {path}")
+                    return table
+                print(f"⚠ Pillar table is stale (calendar or pillar formula changed), regenerating: {path}")
+            except Exception as e:
+                print(f"⚠ Warning: Could not load pillar table, regenerating: {e}")
+
+        table = cls.build(pillar_fn, source)
+        if path:
+            try:
+                table.save(path)
+                table = cls.load(path)
+                print(f"✓ Saved pillar table to {path}")
+            except Exception as e:
+                print(f"⚠ Warning: Could not save pillar table: {e}")
+        return table
+
+    def get(self, year: int, month: int, day: int, hour: int) -> Optional[List[int]]:
+        """단건 조회. 조회표 범위 밖이거나 잘못된 날짜면 None"""
+        try:
+            offset = date(year, month, day).toordinal() - self._start_ordinal
+            if 0 <= offset < len(self.table) and 0 <= hour < HOURS:
+                return self.table[offset, hour].tolist()
+        except (TypeError, ValueError):
+            pass
+        return None
+
+    def lookup(self, year, month, day, hour) -> Tuple[np.ndarray, np.ndarray]:
+        """(N, P) 기둥 배열과 조회표 범위 안에 있는지 여부 (N,) 를 돌려준다."""
+        year = np.asarray(year, dtype=np.int64)
+        month = np.asarray(month, dtype=np.int64)
+        day = np.asarray(day, dtype=np.int64)
+        hour = np.asarray(hour, dtype=np.int64)
+
+        # 존재하지 않는 날짜(2월 30일 등)는 조회표를 쓰지 않는다
+        valid_month = (month >= 1) & (month <= 12)
+        safe_month = np.where(valid_month, month, 1)
+        leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+        month_days = MONTH_DAYS[safe_month] + (leap & (safe_month == 2))
+        offset = days_from_civil(year, safe_month, day) - self.start_day
+
+        found = (
+            valid_month & (day >= 1) & (day <= month_days)
+            & (hour >= 0) & (hour < HOURS)
+            & (offset >= 0) & (offset < len(self.table))
+        )
+        offset = np.where(found, offset, 0)
+        hour = np.where(found, hour, 0)
+        return self.table[offset, hour], found
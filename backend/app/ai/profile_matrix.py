@@ -0,0 +1,167 @@
+"""
+전체 프로필 궁합 검색용 컬럼형 행렬
+
+궁합 점수는 상대방의 (연간, 연지) 조합과 살 점수 합에만 의존하므로
+프로필마다 (연간-1)*12 + (연지-1) 코드, 성별, 감점만 열 배열로 들고 있는다.
+검색은 기준 사용자에 대한 120칸 점수표를 코드로 fancy-index 한 뒤
+np.argpartition 으로 상위 K 명을 고른다.
+
+행렬은 프로세스마다 따로 들고 있으므로, 다른 워커에서 바뀐 프로필은
+synced_at (DB 의 마지막 프로필 변경 시각) 이후 바뀐 행과 삭제 기록(profile_deletions)을 주기적으로 읽어 반영한다.
+"""
+import threading
+import time
+import numpy as np
+from datetime import datetime
+from typing import Dict, List, Optional
+
+SKY_SIZE = 10
+EARTH_SIZE = 12
+
+
+class ProfileMatrix:
+
+    def __init__(self, capacity: int = 1024):
+        self.user_ids = np.zeros(capacity, dtype=np.int64)
+        self.codes = np.zeros(capacity, dtype=np.uint8)
+        self.genders = np.zeros(capacity, dtype=np.int8)
+        self.penalties = np.zeros(capacity, dtype=np.float32)
+        self.size = 0
+        self.rows: Dict[int, int] = {}
+        self.loaded = False
+        self.synced_at: Optional[datetime] = None  # 반영한 마지막 프로필 변경 시각 (DB 기준)
+        self.checked_at = 0.0  # 마지막으로 DB 와 맞춰본 시각 (time.monotonic)
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return self.size
+
+    @staticmethod
+    def code(pillars: List[int]) -> int:
+        return (pillars[0] - 1) * EARTH_SIZE + (pillars[1] - 1)
+
+    def _grow(self, capacity: int):
+        for name in ('user_ids', 'codes', 'genders', 'penalties'):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def replace(self, user_ids, pillars, genders, penalties):
+        """전체 다시 적재. pillars 는 (N, 2+) 배열"""
+        user_ids = np.asarray(user_ids, dtype=np.int64)
+        pillars = np.asarray(pillars, dtype=np.int64).reshape(len(user_ids), -1)
+        with self._lock:
+            self.size = 0
+            self._grow(max(len(user_ids), 1024))
+            n = len(user_ids)
+            self.user_ids[:n] = user_ids
+            self.codes[:n] = (pillars[:, 0] - 1) * EARTH_SIZE + (pillars[:, 1] - 1)
+            self.genders[:n] = genders
+            self.penalties[:n] = penalties
+            self.size = n
+            self.rows = {int(user_id): row for row, user_id in enumerate(user_ids)}
+            self.loaded = True
+
+    def upsert(self, user_id: int, pillars: List[int], gender: int, penalty: float):
+        with self._lock:
+            row = self.rows.get(user_id)
+            if row is None:
+                if self.size == len(self.user_ids):
+                    self._grow(len(self.user_ids) * 2)
+                row = self.size
+                self.size += 1
+                self.rows[user_id] = row
+            self.user_ids[row] = user_id
+            self.codes[row] = self.code(pillars)
+            self.genders[row] = gender
+            self.penalties[row] = penalty
+
+    def remove(self, user_id: int):
+        with self._lock:
+            row = self.rows.pop(user_id, None)
+            if row is None:
+                return
+            # 마지막 행을 빈 자리로 옮긴다
+            last = self.size - 1
+            if row != last:
+                for array in (self.user_ids, self.codes, self.genders, self.penalties):
+                    array[row] = array[last]
+                self.rows[int(self.user_ids[row])] = row
+            self.size = last
+
+    def mark_synced(self, changed_at: Optional[datetime]):
+        self.synced_at = changed_at
+        self.checked_at = time.monotonic()
+
+    def top_k(
+        self,
+        base_scores: np.ndarray,
+        k: int,
+        gender: Optional[int] = None,
+        exclude_user_id: Optional[int] = None
+    ) -> List[Dict]:
+        """
+        base_scores[code]: 기준 사용자와 해당 코드 상대의 (천간+지지)/2*100 - 기준 사용자 감점
+        gender 가 주어지면 그 성별만, exclude_user_id 는 결과에서 뺀다.
+        """
+        with self._lock:
+            n = self.size
+            scores = base_scores[self.codes[:n]] - self.penalties[:n]
+            eligible = np.ones(n, dtype=bool) if gender is None else self.genders[:n] == gender
+            if exclude_user_id is not None and exclude_user_id in self.rows:
+                eligible[self.rows[exclude_user_id]] = False
+            scores = np.where(eligible, np.clip(scores, 0, 100), -np.inf)
+
+            k = min(k, int(eligible.sum()))
+            if k <= 0:
+                return []
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top], kind='stable')]
+
+            return [
+                {
+                    'user_id': int(self.user_ids[row]),
+                    'code': int(self.codes[row]),
+                    'compatibility_score': round(float(scores[row]), 2)
+                }
+                for row in top
+            ]
+
+    def top_matches(
+        self,
+        scores: Dict,
+        k: int,
+        gender: Optional[int] = None,
+        exclude_user_id: Optional[int] = None
+    ) -> List[Dict]:
+        """SajuEngine.match_scores 결과로 상위 k 명을 고르고 천간/지지 점수를 붙인다."""
+        matches = self.top_k(scores['base_scores'], k, gender=gender, exclude_user_id=exclude_user_id)
+        for match in matches:
+            sky_index, earth_index = divmod(match.pop('code'), EARTH_SIZE)
+            match['sky_score'] = float(scores['sky'][sky_index])
+            match['earth_score'] = float(scores['earth'][earth_index])
+        return matches
+
+    def reset(self):
+        """엔진이 바뀌어 감점이 달라졌을 때. 다음 검색에서 전체를 다시 읽는다."""
+        with self._lock:
+            self.loaded = False
+
+    def stats(self) -> Dict:
+        return {
+            'loaded': self.loaded,
+            'size': self.size,
+            'capacity': len(self.user_ids),
+            'synced_at': self.synced_at.isoformat() if self.synced_at else None
+        }
+
+
+_matrix_instance = None
+
+
+def get_profile_matrix() -> ProfileMatrix:
+    global _matrix_instance
+    if _matrix_instance is None:
+        _matrix_instance = ProfileMatrix()
+    return _matrix_instance
@@ -0,0 +1,86 @@
+"""
+궁합 분석 결과 LRU 캐시
+
+analyze_compatibility 의 결과는 두 사람의 사주 기둥과 성별에만 의존하므로
+(생년월일 자체가 아니라) 이를 키로 결과를 재사용한다.
+엔진 버전(모델 점수표 + 규칙 테이블 해시)이 바뀌면 캐시 전체를 비운다.
+"""
+import copy
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+from app.config import settings
+
+
+class AnalysisCache:
+
+    def __init__(self, max_size: int = 4096):
+        self.max_size = max_size
+        self.version: Optional[str] = None
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    def _check_version(self, version: str):
+        if version != self.version:
+            if self._data:
+                self.invalidations += 1
+            self._data.clear()
+            self.version = version
+
+    def get(self, key: Hashable, version: str) -> Optional[Any]:
+        if self.max_size <= 0:
+            return None
+        with self._lock:
+            self._check_version(version)
+            value = self._data.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._data.move_to_end(key)
+            self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, key: Hashable, version: str, value: Any):
+        if self.max_size <= 0:
+            return
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._check_version(version)
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            'version': self.version,
+            'size': len(self._data),
+            'max_size': self.max_size,
+            'hits': self.hits,
+            'misses': self.misses,
+            'hit_ratio': round(self.hits / lookups, 3) if lookups else 0.0,
+            'evictions': self.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+_cache_instance = None
+
+
+def get_result_cache() -> AnalysisCache:
+    global _cache_instance
+    if _cache_instance is None:
+        _cache_instance = AnalysisCache(settings.ENGINE_RESULT_CACHE_SIZE)
+    return _cache_instance
@@ -0,0 +1,131 @@
+"""
+절기(節氣) 기반 연주/월주 계산과 일주/시주 계산
+
+cal.csv 의 각 행은 해당 연도 1~12월 절입 시각(ddhhmm)을 담고 있다.
+이를 한 번만 읽어 정렬된 int64 분(minute) 배열로 바꿔두고,
+생년월일시는 np.searchsorted 로 직전 절입을 찾아 연주/월주를 구한다.
+일주는 날짜의 60갑자 순번, 시주는 일간과 시지로 정해진다.
+"""
+import numpy as np
+from typing import Dict, Tuple
+
+# 1970-01-01 은 신사(辛巳)일, 60갑자 순번 17 (갑자 = 0)
+EPOCH_DAY_CYCLE = 17
+
+# 데이터가 없는 연도는 가장 가까운 연도의 절입 시각으로 채운다 (오차 ±1일)
+EXTEND_UNTIL_YEAR = 2100
+
+
+def days_from_civil(year, month, day) -> np.ndarray:
+    """그레고리력 날짜를 1970-01-01 기준 일수로 바꾼다. 배열 입력을 지원한다."""
+    year = np.asarray(year, dtype=np.int64)
+    month = np.asarray(month, dtype=np.int64)
+    day = np.asarray(day, dtype=np.int64)
+
+    y = year - (month <= 2)
+    era = np.floor_divide(y, 400)
+    yoe = y - era * 400
+    doy = (153 * (month + np.where(month > 2, -3, 9)) + 2) // 5 + day - 1
+    doe = yoe * 365 + yoe // 4 - yoe // 100 + doy
+    return era * 146097 + doe - 719468
+
+
+def to_minutes(year, month, day, hour, minute=0) -> np.ndarray:
+    return (
+        days_from_civil(year, month, day) * 1440
+        + np.asarray(hour, dtype=np.int64) * 60
+        + np.asarray(minute, dtype=np.int64)
+    )
+
+
+def month_stem(year_sky, month_earth) -> np.ndarray:
+    """월간: 갑기년 병인월, 을경년 무인월 ... 로 시작"""
+    return ((year_sky - 1) % 5 * 2 + 2 + (month_earth - 3) % 12) % 10 + 1
+
+
+def day_hour_pillars(year, month, day, hour) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """(일간, 일지, 시간, 시지)를 1-based 값으로 돌려준다. 배열 입력을 지원한다."""
+    hour = np.asarray(hour, dtype=np.int64)
+
+    # 23시(자시)부터 다음 날로 본다
+    days = days_from_civil(year, month, day) + (hour >= 23)
+    cycle = (days + EPOCH_DAY_CYCLE) % 60
+    day_sky = cycle % 10 + 1
+    day_earth = cycle % 12 + 1
+
+    # 23~1시 자시, 1~3시 축시, ... 시간은 갑기일 갑자시, 을경일 병자시 ... 로 시작
+    hour_branch = (hour + 1) // 2 % 12
+    hour_sky = ((day_sky - 1) % 5 * 2 + hour_branch) % 10 + 1
+    hour_earth = hour_branch + 1
+
+    return day_sky, day_earth, hour_sky, hour_earth
+
+
+class SolarTermIndex:
+
+    def __init__(self, boundaries: np.ndarray, years: np.ndarray, months: np.ndarray):
+        # boundaries[i]: 절입 시각(분), years[i]/months[i]: 그 절기가 속한 양력 연/월
+        self.boundaries = boundaries
+        self.years = years
+        self.months = months
+
+    @classmethod
+    def from_csv(cls, path: str) -> "SolarTermIndex":
+        try:
+            data = np.loadtxt(path, delimiter=',', skiprows=1, encoding='utf-8')
+        except UnicodeDecodeError:
+            try:
+                data = np.loadtxt(path, delimiter=',', skiprows=1, encoding='cp949')
+            except UnicodeDecodeError:
+                data = np.loadtxt(path, delimiter=',', skiprows=1, encoding='euc-kr')
+        return cls.from_rows(data.astype(np.int64))
+
+    @classmethod
+    def from_rows(cls, rows: np.ndarray) -> "SolarTermIndex":
+        # 열 구성: 연도, (yyyymm, ddhhmm) x 12
+        row_years = rows[:, 0]
+        terms = rows[:, 2::2]
+
+        years = np.arange(row_years.min(), max(row_years.max(), EXTEND_UNTIL_YEAR) + 1)
+        nearest = np.abs(years[:, None] - row_years[None, :]).argmin(axis=1)
+        terms = terms[nearest]
+
+        year_grid = np.repeat(years, 12)
+        month_grid = np.tile(np.arange(1, 13), len(years))
+        terms = terms.reshape(-1)
+
+        boundaries = to_minutes(
+            year_grid, month_grid,
+            terms // 10000, terms // 100 % 100, terms % 100
+        )
+        order = np.argsort(boundaries, kind='stable')
+        return cls(boundaries[order], year_grid[order], month_grid[order])
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "SolarTermIndex":
+        return cls(arrays['boundaries'], arrays['years'], arrays['months'])
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {'boundaries': self.boundaries, 'years': self.years, 'months': self.months}
+
+    def lookup(self, year, month, day, hour, minute=0) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """(연간, 연지, 월간, 월지)를 1-based 값으로 돌려준다."""
+        t = to_minutes(year, month, day, hour, minute)
+        idx = np.searchsorted(self.boundaries, t, side='right') - 1
+
+        # 첫 절입(소한) 이전은 전년도 대설 이후로 본다
+        before_first = idx < 0
+        idx = np.maximum(idx, 0)
+        term_year = np.where(before_first, self.years[0] - 1, self.years[idx])
+        term_month = np.where(before_first, 12, self.months[idx])
+
+        # 입춘(2월 절기) 전이면 전년도
+        saju_year = term_year - (term_month < 2)
+        year_sky = (saju_year - 4) % 10 + 1
+        year_earth = (saju_year - 4) % 12 + 1
+
+        # 2월 절입부터 인월(寅月)
+        month_earth = term_month % 12 + 1
+        month_sky = month_stem(year_sky, month_earth)
+
+        return year_sky, year_earth, month_sky, month_earth
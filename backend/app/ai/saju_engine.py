@@ -5,13 +5,34 @@ Soulmatch AI Saju Analysis Engine
 Based on the original hd2.ipynb notebook
 Copyright Reserved by bongbong@mju.ac.kr, 명지대학교 한승철
 """
+import hashlib
+import os
+import threading
+import time
 import numpy as np
-import tensorflow as tf
-import h5py
 from typing import Tuple, Dict, List, Optional
-import os
 
 from app.config import settings
+from app.ai.engine_bundle import read_bundle, write_bundle, split_prefix, with_prefix
+from app.ai.numpy_model import NumpyMLP
+from app.ai.pillar_table import PillarTable, source_hash
+from app.ai.saju_calendar import SolarTermIndex, day_hour_pillars, month_stem
+from app.ai.result_cache import AnalysisCache, get_result_cache
+from app.ai.saju_rules import SajuRuleTable
+from app.ai.score_distribution import PersonHistogram, ScoreDistribution
+
+
+# 엔진 교체 전 확인용 고정 입력 (year1, month1, day1, hour1, gender1, year2, month2, day2, hour2, gender2)
+GOLDEN_CASES = (
+    (1990, 5, 5, 12, 1, 1992, 7, 7, 7, 0),
+    (1985, 2, 4, 0, 1, 1988, 12, 31, 23, 0),
+    (2000, 1, 1, 0, 0, 1970, 1, 1, 23, 1),
+    (1995, 8, 15, 18, 1, 1997, 3, 21, 6, 0),
+    (1979, 10, 26, 20, 0, 1980, 5, 18, 4, 1),
+    (2010, 6, 30, 10, 1, 2012, 2, 29, 14, 0),
+    (1960, 11, 11, 2, 1, 1965, 4, 1, 22, 0),
+    (1998, 2, 3, 23, 0, 1998, 2, 4, 1, 1),
+)
 
 
 class SajuEngine:
@@ -32,36 +53,180 @@ class SajuEngine:
         'p8': 0, 'p81': 10, 'p82': 6, 'p83': 4
     }
     
-    def __init__(self):
+    def __init__(
+        self,
+        bundle_path: Optional[str] = None,
+        model_paths: Optional[Tuple[str, str]] = None,
+        shadow: bool = False
+    ):
+        # shadow: 비교 평가용 후보 엔진. 결과 캐시와 분포 파일을 서비스 엔진과 공유하지 않는다
+        self.use_score_tables = settings.USE_SCORE_TABLES
+        self.bundle_info = None
+        self.result_cache = AnalysisCache(0) if shadow else get_result_cache()
+        self.model_paths = model_paths or (settings.SKY_MODEL_PATH, settings.EARTH_MODEL_PATH)
+        
+        bundle_path = settings.ENGINE_BUNDLE_PATH if bundle_path is None else bundle_path
+        if bundle_path:
+            try:
+                self._load_bundle(bundle_path)
+            except Exception as e:
+                print(f"⚠ Warning: Could not load engine bundle, building from source files: {e}")
+                self._load_sources()
+        else:
+            self._load_sources()
+        
+        self.content_version = self._compute_version()
+        self.distribution = self._load_distribution(None if shadow else settings.SCORE_DISTRIBUTION_PATH)
+    
+    def _load_sources(self):
+        self.backend = settings.ENGINE_BACKEND
+        self.sky_model = self._load_model('sky', self.model_paths[0], 20)
+        self.earth_model = self._load_model('earth', self.model_paths[1], 24)
+        
+        self.solar_terms = SolarTermIndex.from_csv(settings.CALENDAR_FILE_PATH)
+        self.pillar_table = PillarTable.load_or_build(
+            settings.PILLAR_TABLE_PATH, self.solar_terms, self._compute_saju_pillars_batch
+        )
+        
+        self.rules = SajuRuleTable(self.WEIGHTS)
+        
+        self.sky_table = self._build_score_table(self.sky_model, 10, self._sky_rule_score)
+        self.earth_table = self._build_score_table(self.earth_model, 12, self._earth_rule_score)
+    
+    def _compute_version(self) -> str:
+        # 결과에 영향을 주는 점수표, 규칙 테이블, 기둥 조회표(절기 데이터 + 계산식)의 해시
+        digest = hashlib.sha256(self.pillar_table.source.encode())
+        for array in (self.sky_table, self.earth_table, *self.rules.to_arrays().values()):
+            digest.update(np.ascontiguousarray(array).tobytes())
+        return digest.hexdigest()[:16]
+    
+    @property
+    def version(self) -> str:
+        # 결과 캐시용. 백분위 분포가 바뀌어도 결과가 달라진다
+        version = f"{self.content_version}-{self.distribution.version}"
+        if self.use_score_tables:
+            return version
+        return f"{version}-live"
+    
+    def current_version(self) -> str:
+        """EngineExecutor.call 로 버전을 확인할 때 사용 (프로세스 풀이면 워커의 엔진 버전)"""
+        return self.version
+    
+    def _load_distribution(self, path: Optional[str]) -> ScoreDistribution:
+        # 워커는 읽기만 한다. 파일은 refresh_score_distribution.py 가 한 번 만들어 원자적으로 교체하고,
+        # 없거나 다른 엔진 버전용이면 모든 사주 조합 기준 분포를 메모리에만 만든다
+        if path and os.path.exists(path):
+            try:
+                distribution = ScoreDistribution.load(path)
+                if distribution.metadata.get('engine_version') == self.content_version:
+                    print(f"✓ Loaded score distribution from {path} ({distribution.metadata.get('source')})")
+                    return distribution
+                print(f"⚠ Score distribution was built for another engine version, "
+                      f"using combinations until refresh_score_distribution.py is run: {path}")
+            except Exception as e:
+                print(f"⚠ Warning: Could not load score distribution, using combinations: {e}")
+        elif path:
+            print(f"⚠ Score distribution not found, using combinations until refresh_score_distribution.py is run: {path}")
+        
+        return self.build_distribution(self.combination_histogram(), source='combinations')
+    
+    def pair_base_scores(self) -> np.ndarray:
+        """(연간, 연지) 코드 120 x 120 쌍의 (천간+지지)/2*100"""
+        code1, code2 = np.divmod(np.arange(120 * 120), 120)
+        sky = self._sky_scores(code1 // 12 + 1, code2 // 12 + 1)
+        earth = self._earth_scores(code1 % 12 + 1, code2 % 12 + 1)
+        return ((sky + earth) / 2 * 100).reshape(120, 120)
+    
+    def combination_histogram(self) -> PersonHistogram:
+        """가능한 모든 (연주 60, 월지 12, 일주 60, 성별 2) 조합을 한 명씩으로 센 히스토그램"""
+        year, month_earth, day, gender = np.meshgrid(
+            np.arange(60), np.arange(1, 13), np.arange(60), np.arange(2), indexing='ij'
+        )
+        year, month_earth, day, gender = (a.ravel() for a in (year, month_earth, day, gender))
+        year_sky = year % 10 + 1
+        
+        saju = np.stack([
+            year_sky, year % 12 + 1,
+            month_stem(year_sky, month_earth), month_earth,
+            day % 10 + 1, day % 12 + 1,
+            np.ones_like(year), np.ones_like(year)
+        ], axis=1)
+        
+        histogram = PersonHistogram()
+        histogram.add((saju[:, 0] - 1) * 12 + saju[:, 1] - 1, self.rules.evaluate(saju, gender).sum(axis=1))
+        return histogram
+    
+    def build_distribution(self, histogram: PersonHistogram, source: str) -> ScoreDistribution:
+        return ScoreDistribution.build(
+            self.pair_base_scores(), histogram,
+            source=source, engine_version=self.content_version
+        )
+    
+    def _load_bundle(self, path: str):
+        arrays, header = read_bundle(path)
+        
+        self.backend = 'numpy'
+        self.sky_model = NumpyMLP.from_arrays(split_prefix(arrays, 'sky_model'))
+        self.earth_model = NumpyMLP.from_arrays(split_prefix(arrays, 'earth_model'))
+        self.solar_terms = SolarTermIndex.from_arrays(split_prefix(arrays, 'solar_terms'))
+        self.rules = SajuRuleTable.from_arrays(split_prefix(arrays, 'rules'))
+        self.sky_table = arrays['sky_table']
+        self.earth_table = arrays['earth_table']
+        
+        source = source_hash(self.solar_terms)
+        if header['metadata'].get('pillar_table_source') == source:
+            self.pillar_table = PillarTable.from_arrays(split_prefix(arrays, 'pillar_table'), source)
+        else:
+            print("⚠ Bundle pillar table is stale, regenerating in memory (rebuild the bundle)")
+            self.pillar_table = PillarTable.build(self._compute_saju_pillars_batch, source)
+        
+        self.bundle_info = {'path': path, 'checksum': header['checksum'], **header['metadata']}
+        print(f"✓ Loaded engine bundle from {path} ({header['checksum'][:12]})")
+    
+    def export_bundle(self, path: str, metadata: Optional[Dict] = None) -> str:
+        if not isinstance(self.sky_model, NumpyMLP) or not isinstance(self.earth_model, NumpyMLP):
+            raise ValueError("Engine bundles require the numpy backend (ENGINE_BACKEND=numpy)")
+        
+        arrays = {
+            **with_prefix(self.sky_model.to_arrays(), 'sky_model'),
+            **with_prefix(self.earth_model.to_arrays(), 'earth_model'),
+            **with_prefix(self.solar_terms.to_arrays(), 'solar_terms'),
+            **with_prefix(self.rules.to_arrays(), 'rules'),
+            **with_prefix(self.pillar_table.to_arrays(), 'pillar_table'),
+            'sky_table': self.sky_table,
+            'earth_table': self.earth_table,
+        }
+        metadata = {**(metadata or {}), 'pillar_table_source': self.pillar_table.source}
+        return write_bundle(path, arrays, metadata)
+    
+    def _load_model(self, name: str, path: str, input_dim: int):
+        if self.backend == 'numpy':
+            return self._load_numpy_model(name, path, input_dim)
+        return self._load_keras_model(name, path, input_dim)
+    
+    def _load_numpy_model(self, name: str, path: str, input_dim: int):
         try:
-            self.sky_model = tf.keras.models.load_model(settings.SKY_MODEL_PATH, compile=False)
-            self.sky_model.compile(optimizer='adam', loss='mse', metrics=['mae'])
-            print(f"✓ Loaded sky model from {settings.SKY_MODEL_PATH}")
+            model = NumpyMLP.load(path)
+            print(f"✓ Loaded {name} model from {path} (numpy)")
         except Exception as e:
-            print(f"⚠ Warning: Could not load sky model: {e}")
-            self.sky_model = tf.keras.Sequential([
-                tf.keras.layers.Dense(1, input_shape=(20,), activation='linear')
-            ])
-            self.sky_model.compile(optimizer='adam', loss='mse', metrics=['mse'])
+            print(f"⚠ Warning: Could not load {name} model: {e}")
+            model = NumpyMLP([(np.zeros((input_dim, 1)), np.zeros(1), 'linear')])
+        return model
+    
+    def _load_keras_model(self, name: str, path: str, input_dim: int):
+        import tensorflow as tf
         
         try:
-            self.earth_model = tf.keras.models.load_model(settings.EARTH_MODEL_PATH, compile=False)
-            self.earth_model.compile(optimizer='adam', loss='mse', metrics=['mae'])
-            print(f"✓ Loaded earth model from {settings.EARTH_MODEL_PATH}")
+            model = tf.keras.models.load_model(path, compile=False)
+            model.compile(optimizer='adam', loss='mse', metrics=['mae'])
+            print(f"✓ Loaded {name} model from {path}")
         except Exception as e:
-            print(f"⚠ Warning: Could not load earth model: {e}")
-            self.earth_model = tf.keras.Sequential([
-                tf.keras.layers.Dense(1, input_shape=(24,), activation='linear')
+            print(f"⚠ Warning: Could not load {name} model: {e}")
+            model = tf.keras.Sequential([
+                tf.keras.layers.Dense(1, input_shape=(input_dim,), activation='linear')
             ])
-            self.earth_model.compile(optimizer='adam', loss='mse', metrics=['mse'])
-        
-        try:
-            self.calendar_data = np.loadtxt(settings.CALENDAR_FILE_PATH, delimiter=',', skiprows=1, encoding='utf-8')
-        except UnicodeDecodeError:
-            try:
-                self.calendar_data = np.loadtxt(settings.CALENDAR_FILE_PATH, delimiter=',', skiprows=1, encoding='cp949')
-            except UnicodeDecodeError:
-                self.calendar_data = np.loadtxt(settings.CALENDAR_FILE_PATH, delimiter=',', skiprows=1, encoding='euc-kr')
+            model.compile(optimizer='adam', loss='mse', metrics=['mse'])
+        return model
     
     def get_key_by_value(self, dictionary: Dict, value: int) -> Optional[str]:
         for key, val in dictionary.items():
@@ -75,6 +240,16 @@ class SajuEngine:
         return res.reshape(list(t.shape) + [nb_classes])
     
     def calculate_sky_score(self, sky1: int, sky2: int) -> float:
+        if self.use_score_tables:
+            return float(self.sky_table[sky1 - 1, sky2 - 1])
+        return self._predict_sky_score(sky1, sky2)
+    
+    def calculate_earth_score(self, earth1: int, earth2: int) -> float:
+        if self.use_score_tables:
+            return float(self.earth_table[earth1 - 1, earth2 - 1])
+        return self._predict_earth_score(earth1, earth2)
+    
+    def _predict_sky_score(self, sky1: int, sky2: int) -> float:
         try:
             sky_input = np.zeros((1, 20))
             sky_input[0, sky1-1] = 1
@@ -90,20 +265,9 @@ class SajuEngine:
             return score
             
         except Exception as e:
-            diff = abs(sky1 - sky2)
-            
-            if diff == 5:
-                return 0.9
-            elif diff == 6 or diff == 4:
-                return 0.3
-            elif diff == 0:
-                return 0.7
-            elif diff == 1 or diff == 9:
-                return 0.65
-            else:
-                return 0.6
+            return float(self._sky_rule_score(abs(sky1 - sky2)))
     
-    def calculate_earth_score(self, earth1: int, earth2: int) -> float:
+    def _predict_earth_score(self, earth1: int, earth2: int) -> float:
         try:
             earth_input = np.zeros((1, 24))
             earth_input[0, earth1-1] = 1
@@ -119,20 +283,47 @@ class SajuEngine:
             return score
             
         except Exception as e:
-            diff = abs(earth1 - earth2)
-            
-            if diff == 1 or diff == 11:
-                return 0.85
-            elif diff == 6:
-                return 0.2
-            elif diff == 4 or diff == 8:
-                return 0.95
-            elif diff == 3 or diff == 9:
-                return 0.4
-            elif diff == 0:
-                return 0.75
-            else:
-                return 0.6
+            return float(self._earth_rule_score(abs(earth1 - earth2)))
+    
+    @staticmethod
+    def _sky_rule_score(diff):
+        return np.select(
+            [diff == 5, (diff == 6) | (diff == 4), diff == 0, (diff == 1) | (diff == 9)],
+            [0.9, 0.3, 0.7, 0.65],
+            default=0.6
+        )
+    
+    @staticmethod
+    def _earth_rule_score(diff):
+        return np.select(
+            [(diff == 1) | (diff == 11), diff == 6, (diff == 4) | (diff == 8), (diff == 3) | (diff == 9), diff == 0],
+            [0.85, 0.2, 0.95, 0.4, 0.75],
+            default=0.6
+        )
+    
+    def _predict_scores(self, model, size: int, first, second, rule_score) -> np.ndarray:
+        # N개의 (사람1, 사람2) 조합을 한 번의 predict로 평가하고, 학습되지 않은 값은 규칙 점수로 대체
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        fallback = rule_score(np.abs(first - second)).astype(np.float64)
+        
+        inputs = np.zeros((len(first), size * 2))
+        inputs[np.arange(len(first)), first - 1] = 1
+        inputs[np.arange(len(first)), size + second - 1] = 1
+        
+        try:
+            prediction = np.asarray(model.predict(inputs, verbose=0), dtype=np.float64)[:, 0]
+        except Exception as e:
+            print(f"⚠ Warning: Model prediction failed, using rule-based fallback: {e}")
+            return fallback
+        
+        score = np.clip(prediction, 0.0, 1.0)
+        untrained = (score > 0.99) | (score < 0.01)
+        return np.where(untrained, fallback, score)
+    
+    def _build_score_table(self, model, size: int, rule_score) -> np.ndarray:
+        first, second = np.divmod(np.arange(size * size), size)
+        return self._predict_scores(model, size, first + 1, second + 1, rule_score).reshape(size, size)
     
     def calculate_detailed_compatibility(
         self,
@@ -142,92 +333,57 @@ class SajuEngine:
         gender1: int,
         base_score: float
     ) -> Tuple[float, List[float], List[float]]:
-        score = base_score
-        sal0 = [0.0] * 8
-        sal1 = [0.0] * 8
-        
-        w = self.WEIGHTS
-        a1, a2, a3 = token0[1], token0[3], token0[5]
-        b1, b2, b3 = token1[1], token1[3], token1[5]
-        
-        if a3 == 3:
-            if a1 in [6, 9]:
-                penalty = w['p1'] if gender0 == 1 else w['p11']
-                score -= penalty
-                sal0[0] += penalty
-            if a2 in [6, 9]:
-                penalty = w['p1'] if gender0 == 1 else w['p11']
-                score -= penalty
-                sal0[0] += penalty
-        
-        if a3 == 7:
-            if a1 in [2, 5, 7]:
-                penalty = w['p1'] if gender0 == 1 else w['p11']
-                score -= penalty
-                sal0[0] += penalty
-            if a2 in [2, 5, 7]:
-                penalty = w['p1'] if gender0 == 1 else w['p11']
-                score -= penalty
-                sal0[0] += penalty
-        
-        if a3 == 2:
-            if a1 in [7, 8, 11]:
-                penalty = w['p1'] if gender0 == 1 else w['p11']
-                score -= penalty
-                sal0[0] += penalty
-            if a2 in [7, 8, 11]:
-                penalty = w['p1'] if gender0 == 1 else w['p11']
-                score -= penalty
-                sal0[0] += penalty
-        
-        if b3 == 3:
-            if b1 in [6, 9]:
-                penalty = w['p1'] if gender1 == 1 else w['p11']
-                score -= penalty
-                sal1[0] += penalty
-            if b2 in [6, 9]:
-                penalty = w['p1'] if gender1 == 1 else w['p11']
-                score -= penalty
-                sal1[0] += penalty
-        
-        if b3 == 7:
-            if b1 in [2, 5, 7]:
-                penalty = w['p1'] if gender1 == 1 else w['p11']
-                score -= penalty
-                sal1[0] += penalty
-            if b2 in [2, 5, 7]:
-                penalty = w['p1'] if gender1 == 1 else w['p11']
-                score -= penalty
-                sal1[0] += penalty
-        
-        if b3 == 2:
-            if b1 in [7, 8, 11]:
-                penalty = w['p1'] if gender1 == 1 else w['p11']
-                score -= penalty
-                sal1[0] += penalty
-            if b2 in [7, 8, 11]:
-                penalty = w['p1'] if gender1 == 1 else w['p11']
-                score -= penalty
-                sal1[0] += penalty
-        
-        harm_pairs = {
-            1: 10, 2: 7, 3: 8, 4: 9, 5: 12, 6: 11,
-            7: 2, 8: 3, 9: 4, 10: 1, 11: 6, 12: 5
+        sal = self.rules.evaluate(np.array([token0, token1]), np.array([gender0, gender1]))
+        score = base_score - float(sal[0].sum()) - float(sal[1].sum())
+        return score, sal[0].tolist(), sal[1].tolist()
+    
+    def analyze_person(self, year: int, month: int, day: int, hour: int, gender: int) -> Dict:
+        """한 사람에게만 의존하는 값(기둥, 살 점수). Profile 에 캐시해 두고 궁합 계산에 재사용한다."""
+        pillars = self._get_saju_pillars(year, month, day, hour)
+        sal = self.rules.evaluate(np.array([pillars]), np.array([gender]))[0]
+        return {
+            'pillars': pillars,
+            'sal': sal.tolist(),
+            'penalty': float(sal.sum()),
+            'version': self.content_version
         }
+    
+    def analyze_person_batch(self, year, month, day, hour, gender) -> Tuple[np.ndarray, np.ndarray]:
+        """N명의 (기둥 (N, 8), 살 점수 (N, 8)) 를 한 번에 계산한다."""
+        pillars = self._get_saju_pillars_batch(year, month, day, hour)
+        return pillars, self.rules.evaluate(pillars, np.asarray(gender))
+    
+    def analyze_compatibility_cached(self, person1: Dict, person2: Dict) -> Dict:
+        """
+        Profile 에 캐시된 analyze_person 결과로 궁합을 계산한다.
+        person: birth_year/month/day/hour, gender(0/1), saju_pillars, saju_sal, saju_version
+        캐시가 없거나 엔진 버전이 다르면 그 사람만 다시 계산하고, 두 사람 사이의 천간/지지 점수만 새로 구한다.
+        """
+        pillars1, sal1 = self._resolve_person(person1)
+        pillars2, sal2 = self._resolve_person(person2)
+        gender1, gender2 = person1['gender'], person2['gender']
+        
+        cached = self.get_cached_result(pillars1, pillars2, gender1, gender2)
+        if cached is not None:
+            return cached
         
-        if a3 in harm_pairs:
-            if a1 == harm_pairs[a3] or a2 == harm_pairs[a3]:
-                penalty = w['p2'] if gender0 == 1 else w['p21']
-                score -= penalty
-                sal0[1] += penalty
+        sky_score = self.calculate_sky_score(pillars1[0], pillars2[0])
+        earth_score = self.calculate_earth_score(pillars1[1], pillars2[1])
         
-        if b3 in harm_pairs:
-            if b1 == harm_pairs[b3] or b2 == harm_pairs[b3]:
-                penalty = w['p2'] if gender1 == 1 else w['p21']
-                score -= penalty
-                sal1[1] += penalty
+        return self.compose_result(
+            pillars1, pillars2, gender1, gender2, sky_score, earth_score,
+            traits1=sal1, traits2=sal2
+        )
+    
+    def _resolve_person(self, person: Dict) -> Tuple[List[int], List[float]]:
+        if person.get('saju_version') == self.content_version and person.get('saju_pillars') and person.get('saju_sal'):
+            return person['saju_pillars'], person['saju_sal']
         
-        return score, sal0, sal1
+        computed = self.analyze_person(
+            person['birth_year'], person['birth_month'], person['birth_day'], person['birth_hour'],
+            person['gender']
+        )
+        return computed['pillars'], computed['sal']
     
     def analyze_compatibility(
         self,
@@ -237,17 +393,58 @@ class SajuEngine:
         saju1 = self._get_saju_pillars(year1, month1, day1, hour1)
         saju2 = self._get_saju_pillars(year2, month2, day2, hour2)
         
+        cached = self.get_cached_result(saju1, saju2, gender1, gender2)
+        if cached is not None:
+            return cached
+        
         sky_score = self.calculate_sky_score(saju1[0], saju2[0])
         earth_score = self.calculate_earth_score(saju1[1], saju2[1])
+        
+        return self.compose_result(saju1, saju2, gender1, gender2, sky_score, earth_score)
+    
+    def prepare_compatibility(
+        self,
+        year1: int, month1: int, day1: int, hour1: int, gender1: int,
+        year2: int, month2: int, day2: int, hour2: int, gender2: int
+    ) -> Dict:
+        """
+        ScoreBatcher 용 analyze_compatibility 앞 단계: 두 사람의 기둥과 캐시된 결과.
+        {'saju1', 'saju2', 'cached': 캐시된 결과 또는 None}
+        """
+        saju1 = self._get_saju_pillars(year1, month1, day1, hour1)
+        saju2 = self._get_saju_pillars(year2, month2, day2, hour2)
+        return {
+            'saju1': saju1,
+            'saju2': saju2,
+            'cached': self.get_cached_result(saju1, saju2, gender1, gender2)
+        }
+    
+    @staticmethod
+    def _result_key(saju1: List[int], saju2: List[int], gender1: int, gender2: int) -> tuple:
+        return tuple(saju1), tuple(saju2), gender1 == 1, gender2 == 1
+    
+    def get_cached_result(self, saju1: List[int], saju2: List[int], gender1: int, gender2: int) -> Optional[Dict]:
+        return self.result_cache.get(self._result_key(saju1, saju2, gender1, gender2), self.version)
+    
+    def compose_result(
+        self,
+        saju1: List[int], saju2: List[int],
+        gender1: int, gender2: int,
+        sky_score: float, earth_score: float,
+        traits1: Optional[List[float]] = None, traits2: Optional[List[float]] = None
+    ) -> Dict:
         base_score = (sky_score + earth_score) / 2
         
-        final_score, traits1, traits2 = self.calculate_detailed_compatibility(
-            saju1, saju2, gender1, gender2, base_score * 100
-        )
+        if traits1 is None or traits2 is None:
+            final_score, traits1, traits2 = self.calculate_detailed_compatibility(
+                saju1, saju2, gender1, gender2, base_score * 100
+            )
+        else:
+            final_score = base_score * 100 - float(np.sum(traits1)) - float(np.sum(traits2))
         
         final_score = max(0, min(100, final_score))
         
-        return {
+        result = {
             'compatibility_score': round(final_score, 2),
             'saju_data_user1': {
                 'year_sky': saju1[0],
@@ -255,7 +452,9 @@ class SajuEngine:
                 'month_sky': saju1[2],
                 'month_earth': saju1[3],
                 'day_sky': saju1[4],
-                'day_earth': saju1[5]
+                'day_earth': saju1[5],
+                'hour_sky': saju1[6],
+                'hour_earth': saju1[7]
             },
             'saju_data_user2': {
                 'year_sky': saju2[0],
@@ -263,7 +462,9 @@ class SajuEngine:
                 'month_sky': saju2[2],
                 'month_earth': saju2[3],
                 'day_sky': saju2[4],
-                'day_earth': saju2[5]
+                'day_earth': saju2[5],
+                'hour_sky': saju2[6],
+                'hour_earth': saju2[7]
             },
             'detailed_scores': {
                 'person1_traits': traits1,
@@ -271,23 +472,313 @@ class SajuEngine:
                 'sky_score': float(sky_score),
                 'earth_score': float(earth_score)
             },
-            'interpretation': self._generate_interpretation(final_score)
+            'interpretation': self._generate_interpretation(final_score),
+            **self.distribution.percentile(round(final_score, 2))
+        }
+        
+        self.result_cache.put(self._result_key(saju1, saju2, gender1, gender2), self.version, result)
+        return result
+    
+    def analyze_compatibility_batch(
+        self,
+        year1, month1, day1, hour1, gender1,
+        year2, month2, day2, hour2, gender2
+    ) -> Dict[str, np.ndarray]:
+        """N쌍의 생년월일을 배열로 받아 궁합 점수를 한 번에 계산한다."""
+        saju1, traits1 = self.analyze_person_batch(year1, month1, day1, hour1, gender1)
+        saju2, traits2 = self.analyze_person_batch(year2, month2, day2, hour2, gender2)
+        
+        sky_score, earth_score, final_score = self.score_person_batch(
+            saju1, traits1.sum(axis=1), saju2, traits2.sum(axis=1)
+        )
+        
+        final_score = np.round(final_score, 2)
+        
+        return {
+            'compatibility_score': final_score,
+            **self.distribution.percentiles(final_score),
+            'saju_data_user1': saju1,
+            'saju_data_user2': saju2,
+            'person1_traits': traits1,
+            'person2_traits': traits2,
+            'sky_score': sky_score,
+            'earth_score': earth_score
+        }
+    
+    def analyze_compatibility_rows(
+        self,
+        year1, month1, day1, hour1, gender1,
+        year2, month2, day2, hour2, gender2
+    ) -> Dict:
+        """
+        N쌍을 배치로 계산해 쌍별 점수/백분위/해석 dict 로 돌려준다. 대량 분석 스트림이 청크 단위로 호출한다.
+        {'version': 계산한 엔진 버전, 'results': 쌍별 결과}
+        """
+        saju1, traits1 = self.analyze_person_batch(year1, month1, day1, hour1, gender1)
+        saju2, traits2 = self.analyze_person_batch(year2, month2, day2, hour2, gender2)
+        
+        sky_score, earth_score, final_score = self.score_person_batch(
+            saju1, traits1.sum(axis=1), saju2, traits2.sum(axis=1)
+        )
+        scores = np.round(final_score, 2)
+        percentiles = self.distribution.percentiles(scores)
+        
+        # 해석은 단건 경로(compose_result)처럼 반올림 전 점수로 정한다
+        results = [
+            {
+                'compatibility_score': score,
+                'percentile': percentile,
+                'top_percent': top_percent,
+                'sky_score': sky,
+                'earth_score': earth,
+                'interpretation': self._generate_interpretation(final)
+            }
+            for score, percentile, top_percent, sky, earth, final in zip(
+                scores.tolist(), percentiles['percentile'].tolist(), percentiles['top_percent'].tolist(),
+                sky_score.tolist(), earth_score.tolist(), final_score.tolist()
+            )
+        ]
+        return {'version': self.version, 'results': results}
+    
+    # 시진(자시~해시)별 대표 시각: 0시 자시, 2시 축시, ... 22시 해시
+    # 23시도 자시지만 일주가 다음 날로 넘어가므로 따로 본다
+    HOUR_CANDIDATES = (*range(0, 24, 2), 23)
+    
+    def analyze_hour_uncertainty(
+        self,
+        year1: int, month1: int, day1: int, hour1: int, gender1: int,
+        year2: int, month2: int, day2: int, hour2: int, gender2: int
+    ) -> Dict:
+        """
+        태어난 시각이 불확실할 때 HOUR_CANDIDATES 조합(13 x 13)을 배치 한 번으로 계산한다.
+        기본 결과는 요청한 hour1/hour2 기준이고, hour_uncertainty 에 점수 범위와 후보 시각별 행렬을 담는다.
+        
+        궁합 점수는 시주를 쓰지 않으므로 시각이 바꿀 수 있는 것은 일주(23시 이후 다음 날)와
+        그날 절입이 있을 때의 연주/월주뿐이다. 따라서 대부분의 쌍은 범위가 한 점수로 나오고,
+        어느 시각이 맞는지는 알 수 없다. 절입 시각은 후보 사이(2시간 간격)에서는 구분하지 못하므로
+        요청 시각의 점수가 후보 범위 밖이면 min/max 에 포함한다.
+        """
+        hours = np.array(self.HOUR_CANDIDATES)
+        n = len(hours)
+        
+        # 사람별 계산은 후보 시각 + 요청 시각만 하고, 조합은 인덱스로 펼친다 (마지막 행이 요청 시각)
+        saju1, traits1 = self.analyze_person_batch(
+            np.full(n + 1, year1), np.full(n + 1, month1), np.full(n + 1, day1),
+            np.append(hours, hour1), np.full(n + 1, gender1)
+        )
+        saju2, traits2 = self.analyze_person_batch(
+            np.full(n + 1, year2), np.full(n + 1, month2), np.full(n + 1, day2),
+            np.append(hours, hour2), np.full(n + 1, gender2)
+        )
+        index1 = np.append(np.repeat(np.arange(n), n), n)
+        index2 = np.append(np.tile(np.arange(n), n), n)
+        
+        sky_score, earth_score, scores = self.score_person_batch(
+            saju1[index1], traits1.sum(axis=1)[index1],
+            saju2[index2], traits2.sum(axis=1)[index2]
+        )
+        scores = np.round(scores, 2)
+        
+        result = self.compose_result(
+            saju1[n].tolist(), saju2[n].tolist(),
+            gender1, gender2,
+            float(sky_score[-1]), float(earth_score[-1]),
+            traits1=traits1[n].tolist(), traits2=traits2[n].tolist()
+        )
+        
+        candidates = scores[:-1]
+        result['hour_uncertainty'] = {
+            'hours': hours.tolist(),
+            'min': float(scores.min()),
+            'mean': round(float(candidates.mean()), 2),
+            'max': float(scores.max()),
+            'distinct_scores': int(len(np.unique(candidates))),
+            'matrix': candidates.reshape(n, n).tolist()
         }
+        return result
+    
+    def analyze_group(self, year, month, day, hour, gender) -> Dict:
+        """
+        N명의 모든 쌍 궁합 (N x N) 과 이성끼리 점수 합이 최대가 되는 짝짓기.
+        matrix[i][j] 는 i 를 사람1, j 를 사람2 로 본 점수이고 대각선은 None.
+        """
+        from scipy.optimize import linear_sum_assignment
+        
+        gender = np.asarray(gender)
+        saju, traits = self.analyze_person_batch(year, month, day, hour, gender)
+        penalty = traits.sum(axis=1)
+        codes = (saju[:, 0] - 1) * 12 + saju[:, 1] - 1
+        
+        matrix = self.pair_base_scores()[codes[:, None], codes[None, :]] - penalty[:, None] - penalty[None, :]
+        matrix = np.round(np.clip(matrix, 0, 100), 2)
+        
+        males = np.flatnonzero(gender == 1)
+        females = np.flatnonzero(gender != 1)
+        pairing = []
+        if len(males) and len(females):
+            rows, cols = linear_sum_assignment(matrix[np.ix_(males, females)], maximize=True)
+            pairing = sorted(
+                (
+                    {'member1': int(males[r]), 'member2': int(females[c]),
+                     'compatibility_score': float(matrix[males[r], females[c]])}
+                    for r, c in zip(rows, cols)
+                ),
+                key=lambda pair: pair['compatibility_score'],
+                reverse=True
+            )
+        paired = {pair['member1'] for pair in pairing} | {pair['member2'] for pair in pairing}
+        
+        rows = matrix.tolist()
+        for i in range(len(rows)):
+            rows[i][i] = None
+        
+        return {
+            'saju': saju.tolist(),
+            'matrix': rows,
+            'pairing': pairing,
+            'pairing_mean': round(float(np.mean([p['compatibility_score'] for p in pairing])), 2) if pairing else None,
+            'unpaired': [i for i in range(len(gender)) if i not in paired]
+        }
+    
+    def score_person_batch(
+        self,
+        pillars1: np.ndarray, penalty1: np.ndarray,
+        pillars2: np.ndarray, penalty2: np.ndarray
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """미리 계산된 사람별 기둥/감점으로 (천간 점수, 지지 점수, 궁합 점수) 를 구한다."""
+        sky_score = self._sky_scores(pillars1[:, 0], pillars2[:, 0])
+        earth_score = self._earth_scores(pillars1[:, 1], pillars2[:, 1])
+        
+        final_score = (sky_score + earth_score) / 2 * 100 - penalty1 - penalty2
+        return sky_score, earth_score, np.clip(final_score, 0, 100)
+    
+    def resolve_people(self, people: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """Profile 에 캐시된 사람들의 (기둥 (N, 8), 감점 (N,)). 캐시가 없거나 오래된 사람만 한 번에 다시 계산한다."""
+        pillars, sal = self._resolve_people_sal(people)
+        return pillars, sal.sum(axis=1)
+    
+    def _resolve_people_sal(self, people: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        pillars = np.zeros((len(people), 8), dtype=np.int64)
+        sal = np.zeros((len(people), 8))
+        
+        stale = []
+        for i, person in enumerate(people):
+            if person.get('saju_version') == self.content_version and person.get('saju_pillars') and person.get('saju_sal'):
+                pillars[i] = person['saju_pillars']
+                sal[i] = person['saju_sal']
+            else:
+                stale.append(i)
+        
+        if stale:
+            columns = [
+                np.array([people[i][field] for i in stale])
+                for field in ('birth_year', 'birth_month', 'birth_day', 'birth_hour', 'gender')
+            ]
+            pillars[stale], sal[stale] = self.analyze_person_batch(*columns)
+        
+        return pillars, sal
+    
+    def analyze_compatibility_cached_batch(self, people1: List[Dict], people2: List[Dict]) -> Dict:
+        """
+        analyze_compatibility_cached 의 배치 버전. 분석 작업 큐가 여러 커플을 한 번에 처리할 때 사용한다.
+        {'version': 계산한 엔진 버전, 'results': 커플별 결과}
+        """
+        n = len(people1)
+        pillars, sal = self._resolve_people_sal(list(people1) + list(people2))
+        sky_score, earth_score, _ = self.score_person_batch(
+            pillars[:n], sal[:n].sum(axis=1), pillars[n:], sal[n:].sum(axis=1)
+        )
+        
+        results = [
+            self.compose_result(
+                pillars[i].tolist(), pillars[n + i].tolist(),
+                people1[i]['gender'], people2[i]['gender'],
+                float(sky_score[i]), float(earth_score[i]),
+                traits1=sal[i].tolist(), traits2=sal[n + i].tolist()
+            )
+            for i in range(n)
+        ]
+        return {'version': self.version, 'results': results}
+    
+    def match_scores(self, person: Dict) -> Dict:
+        """
+        기준 사용자와 상대 (연간, 연지) 120가지 조합의 점수.
+        ProfileMatrix.top_matches 에 넘기며, 행렬 자체는 엔진 워커로 보내지 않는다.
+        """
+        pillars, sal = self._resolve_person(person)
+        
+        sky = self._sky_scores(np.full(10, pillars[0]), np.arange(1, 11))
+        earth = self._earth_scores(np.full(12, pillars[1]), np.arange(1, 13))
+        return {
+            'base_scores': ((sky[:, None] + earth[None, :]) / 2 * 100).reshape(-1) - float(np.sum(sal)),
+            'sky': sky,
+            'earth': earth
+        }
+    
+    def top_matches(
+        self,
+        matrix,
+        person: Dict,
+        k: int,
+        gender: Optional[int] = None,
+        exclude_user_id: Optional[int] = None
+    ) -> List[Dict]:
+        """ProfileMatrix 의 모든 프로필과 궁합을 계산해 상위 k 명을 돌려준다."""
+        return matrix.top_matches(self.match_scores(person), k, gender=gender, exclude_user_id=exclude_user_id)
+    
+    def score_pairs(self, kind: str, first, second) -> np.ndarray:
+        first = np.asarray(first, dtype=np.int64)
+        second = np.asarray(second, dtype=np.int64)
+        if kind == 'sky':
+            return self._sky_scores(first, second)
+        if kind == 'earth':
+            return self._earth_scores(first, second)
+        raise ValueError(f"Unknown score kind: {kind}")
+    
+    def _sky_scores(self, sky1: np.ndarray, sky2: np.ndarray) -> np.ndarray:
+        if self.use_score_tables:
+            return self.sky_table[sky1 - 1, sky2 - 1]
+        return self._predict_scores(self.sky_model, 10, sky1, sky2, self._sky_rule_score)
+    
+    def _earth_scores(self, earth1: np.ndarray, earth2: np.ndarray) -> np.ndarray:
+        if self.use_score_tables:
+            return self.earth_table[earth1 - 1, earth2 - 1]
+        return self._predict_scores(self.earth_model, 12, earth1, earth2, self._earth_rule_score)
     
     def _get_saju_pillars(self, year: int, month: int, day: int, hour: int) -> List[int]:
-        ry = (year - 1904) % 10
-        ys = ry + 1 if ry != 0 else 10
+        pillars = self.pillar_table.get(year, month, day, hour)
+        if pillars is not None:
+            return pillars
+        return self._compute_saju_pillars_batch(
+            np.array([year]), np.array([month]), np.array([day]), np.array([hour])
+        )[0].tolist()
+    
+    def _get_saju_pillars_batch(self, year, month, day, hour) -> np.ndarray:
+        year = np.asarray(year, dtype=np.int64)
+        month = np.asarray(month, dtype=np.int64)
+        day = np.asarray(day, dtype=np.int64)
+        hour = np.asarray(hour, dtype=np.int64)
         
-        ry2 = (year - 1990) % 12
-        yg = ((ry2 + 2) % 12) + 1
+        pillars, found = self.pillar_table.lookup(year, month, day, hour)
+        pillars = pillars.astype(np.int64)
         
-        ms = ((ys - 1) * 2 + month - 1) % 10 + 1
-        mg = (month + 1) % 12 + 1
+        # 조회표 범위 밖(1904년 이전 등)은 직접 계산
+        missing = ~found
+        if missing.any():
+            pillars[missing] = self._compute_saju_pillars_batch(
+                year[missing], month[missing], day[missing], hour[missing]
+            )
+        return pillars
+    
+    def _compute_saju_pillars_batch(self, year, month, day, hour) -> np.ndarray:
+        year = np.asarray(year, dtype=np.int64)
+        month = np.asarray(month, dtype=np.int64)
+        day = np.asarray(day, dtype=np.int64)
         
-        ds = ((year + month + day) % 10) + 1
-        dg = ((year + month + day) % 12) + 1
+        ys, yg, ms, mg = self.solar_terms.lookup(year, month, day, hour)
+        ds, dg, hs, hg = day_hour_pillars(year, month, day, hour)
         
-        return [ys, yg, ms, mg, ds, dg]
+        return np.stack([ys, yg, ms, mg, ds, dg, hs, hg], axis=1)
     
     def _generate_interpretation(self, score: float) -> str:
         if score >= 90:
@@ -304,11 +795,114 @@ class SajuEngine:
             return "궁합이 다소 맞지 않는 면이 있습니다. 하지만 진정한 사랑과 노력으로 극복할 수 있습니다."
 
 
+    def golden_outputs(self) -> List[Dict]:
+        """GOLDEN_CASES 의 결과. 단건/배치 경로를 모두 거치므로 warmup 도 겸한다."""
+        outputs = [self.analyze_compatibility(*case) for case in GOLDEN_CASES]
+        batch = self.analyze_compatibility_batch(*np.array(GOLDEN_CASES).T)
+        for output, batch_score in zip(outputs, batch['compatibility_score']):
+            output['batch_score'] = float(batch_score)
+        return outputs
+    
+    def validate(
+        self,
+        reference: Optional[List[Dict]] = None,
+        max_delta: Optional[float] = None,
+        bundle_path: Optional[str] = None
+    ) -> Dict:
+        """
+        교체 후보 엔진 확인: 점수 범위, 결정성, 단건/배치 일치.
+        reference(현재 엔진의 golden_outputs) 가 있으면 점수 변화량도 보고하고 max_delta 를 넘으면 실패.
+        bundle_path 를 지정한 교체는 그 번들을 실제로 읽었어야 한다 (읽지 못하면 원본 파일로 만들어지므로).
+        """
+        # 캐시된 결과가 아니라 실제 계산 결과를 확인한다
+        shared_cache, self.result_cache = self.result_cache, AnalysisCache(0)
+        try:
+            outputs = self.golden_outputs()
+            repeated = self.golden_outputs()
+        finally:
+            self.result_cache = shared_cache
+        problems = []
+        
+        loaded_bundle = self.bundle_info['path'] if self.bundle_info else None
+        if bundle_path and loaded_bundle != bundle_path:
+            problems.append(f"bundle {bundle_path} could not be loaded (engine built from {loaded_bundle or 'source files'})")
+        
+        for i, (output, again) in enumerate(zip(outputs, repeated)):
+            score = output['compatibility_score']
+            if not (0 <= score <= 100):
+                problems.append(f"case {i}: score out of range ({score})")
+            if score != again['compatibility_score']:
+                problems.append(f"case {i}: non-deterministic score ({score} != {again['compatibility_score']})")
+            if abs(score - output['batch_score']) > 0.01:
+                problems.append(f"case {i}: batch score {output['batch_score']} != single score {score}")
+            for key in ('sky_score', 'earth_score'):
+                if not (0 <= output['detailed_scores'][key] <= 1):
+                    problems.append(f"case {i}: {key} out of range")
+        
+        report = {'cases': len(outputs), 'version': self.version}
+        if reference:
+            deltas = [abs(o['compatibility_score'] - r['compatibility_score']) for o, r in zip(outputs, reference)]
+            report['max_delta'] = round(max(deltas), 2)
+            report['mean_delta'] = round(sum(deltas) / len(deltas), 2)
+            report['pillar_changes'] = sum(
+                o['saju_data_user1'] != r['saju_data_user1'] or o['saju_data_user2'] != r['saju_data_user2']
+                for o, r in zip(outputs, reference)
+            )
+            if max_delta is not None and report['max_delta'] > max_delta:
+                problems.append(f"max score delta {report['max_delta']} exceeds {max_delta}")
+        
+        report['ok'] = not problems
+        report['problems'] = problems
+        return report
+
+
 _engine_instance = None
+_engine_lock = threading.Lock()
+_reload_lock = threading.Lock()
 
 
 def get_engine() -> SajuEngine:
     global _engine_instance
     if _engine_instance is None:
-        _engine_instance = SajuEngine()
-    return _engine_instance
\ No newline at end of file
+        with _engine_lock:
+            if _engine_instance is None:
+                _engine_instance = SajuEngine()
+    return _engine_instance
+
+
+def reload_engine(
+    bundle_path: Optional[str] = None,
+    reference: Optional[List[Dict]] = None,
+    max_delta: Optional[float] = None
+) -> Dict:
+    """
+    새 엔진을 만들어 warmup 과 golden 확인을 통과하면 전역 엔진을 교체한다.
+    이미 get_engine() 으로 기존 엔진을 잡은 요청은 기존 엔진으로 끝난다.
+    확인에 실패하면 기존 엔진을 그대로 둔다.
+    """
+    global _engine_instance
+    with _reload_lock:
+        started = time.time()
+        previous = _engine_instance
+        if reference is None and previous is not None:
+            reference = previous.golden_outputs()
+        
+        candidate = SajuEngine(bundle_path)
+        # 번들을 쓰는 설정이면 그 번들로 교체되어야 한다 (원본 파일로 조용히 대체되지 않도록)
+        report = candidate.validate(reference, max_delta, settings.ENGINE_BUNDLE_PATH if bundle_path is None else bundle_path)
+        report['previous_version'] = previous.version if previous is not None else None
+        report['content_changed'] = previous is None or previous.content_version != candidate.content_version
+        report['load_ms'] = round((time.time() - started) * 1000, 1)
+        
+        if report['ok']:
+            with _engine_lock:
+                _engine_instance = candidate
+            # 버전이 바뀌었으면 결과 캐시는 다음 조회 때 비워지지만, 메모리를 바로 돌려준다
+            if report['previous_version'] != candidate.version:
+                candidate.result_cache.clear()
+            print(f"✓ Engine reloaded: {report['previous_version']} -> {candidate.version}")
+        else:
+            print(f"⚠ Engine reload rejected: {report['problems']}")
+        
+        report['swapped'] = report['ok']
+        return report
\ No newline at end of file
@@ -0,0 +1,159 @@
+"""
+사주 살(煞) 규칙 테이블
+
+hd2.ipynb의 calculate() 에 있던 p1~p8 규칙을 데이터로 옮긴 것.
+각 규칙은 (기준 위치, 대상 위치) 쌍과 관계표로 정의되고,
+SajuRuleTable 이 이를 배열 연산으로 컴파일해 단건/배치 분석에서 함께 사용한다.
+"""
+import numpy as np
+from itertools import permutations
+from typing import Dict, Tuple
+
+# 사주 토큰 내 위치 (시주는 살 규칙에서 사용하지 않는다)
+YEAR_SKY, YEAR_EARTH, MONTH_SKY, MONTH_EARTH, DAY_SKY, DAY_EARTH, HOUR_SKY, HOUR_EARTH = range(8)
+
+BRANCHES = (YEAR_EARTH, MONTH_EARTH, DAY_EARTH)
+DAY_TO_YEAR_MONTH = ((DAY_EARTH, YEAR_EARTH), (DAY_EARTH, MONTH_EARTH))
+
+SAL_SLOTS = 8
+
+
+def _symmetric(pairs) -> Dict[int, Tuple[int, ...]]:
+    relation: Dict[int, Tuple[int, ...]] = {}
+    for a, b in pairs:
+        relation[a] = relation.get(a, ()) + (b,)
+        relation[b] = relation.get(b, ()) + (a,)
+    return relation
+
+
+# 귀문 (자유, 축오, 인미, 묘신, 진해, 사술)
+GWIMUN = _symmetric([(1, 10), (2, 7), (3, 8), (4, 9), (5, 12), (6, 11)])
+
+# 원진 (자미, 축오, 인유, 묘신, 진해, 사술)
+WONJIN = _symmetric([(1, 8), (2, 7), (3, 10), (4, 9), (5, 12), (6, 11)])
+
+# 충 (여섯 칸 차이)
+CHUNG = {b: ((b + 5) % 12 + 1,) for b in range(1, 13)}
+
+# 괴강 (임진, 무술, 경진, 경술)
+GOEGANG = {9: (5,), 5: (11,), 7: (5, 11)}
+
+
+# slot: sal0/sal1 에서 누적될 칸
+# weights: (남자 가중치 키, 여자 가중치 키) -> SajuEngine.WEIGHTS
+# mode: 'count' 는 걸린 쌍마다 감점, 'any' 는 하나라도 걸리면 한 번 감점
+# relation: 기준 위치 값 -> 대상 위치에서 걸리는 값들
+RULES = (
+    # p1
+    {'name': 'p1', 'slot': 0, 'weights': ('p1', 'p11'), 'mode': 'count',
+     'pairs': DAY_TO_YEAR_MONTH,
+     'relation': {3: (6, 9), 7: (2, 5, 7), 2: (7, 8, 11)}},
+    # p2 귀문
+    {'name': 'p2', 'slot': 1, 'weights': ('p2', 'p21'), 'mode': 'any',
+     'pairs': DAY_TO_YEAR_MONTH,
+     'relation': GWIMUN},
+    {'name': 'p2_year_month', 'slot': 1, 'weights': ('p2', 'p21'), 'mode': 'any',
+     'pairs': ((YEAR_EARTH, MONTH_EARTH),),
+     'relation': GWIMUN},
+    # p3 원진
+    {'name': 'p3', 'slot': 2, 'weights': ('p3', 'p3'), 'mode': 'count',
+     'pairs': tuple(permutations(BRANCHES, 2)),
+     'relation': WONJIN},
+    # p4 충
+    {'name': 'p41', 'slot': 3, 'weights': ('p41', 'p41'), 'mode': 'count',
+     'pairs': ((DAY_EARTH, MONTH_EARTH),),
+     'relation': CHUNG},
+    {'name': 'p42', 'slot': 3, 'weights': ('p42', 'p42'), 'mode': 'count',
+     'pairs': ((DAY_EARTH, YEAR_EARTH),),
+     'relation': CHUNG},
+    {'name': 'p43', 'slot': 3, 'weights': ('p43', 'p43'), 'mode': 'count',
+     'pairs': ((YEAR_EARTH, MONTH_EARTH),),
+     'relation': CHUNG},
+    # p5
+    {'name': 'p5', 'slot': 4, 'weights': ('p5', 'p5'), 'mode': 'any',
+     'pairs': DAY_TO_YEAR_MONTH,
+     'relation': {1: (4,), 2: (11,), 3: (6,), 4: (1,), 6: (9,), 8: (11,), 9: (6,), 11: (8,)}},
+    {'name': 'p5_year_month', 'slot': 4, 'weights': ('p5', 'p5'), 'mode': 'any',
+     'pairs': ((YEAR_EARTH, MONTH_EARTH),),
+     'relation': _symmetric([(1, 4), (2, 11), (3, 6), (6, 9), (8, 11)])},
+    # p6
+    {'name': 'p6', 'slot': 5, 'weights': ('p6', 'p6'), 'mode': 'any',
+     'pairs': DAY_TO_YEAR_MONTH,
+     'relation': {7: (4,), 5: (2,), 4: (7,), 2: (5,)}},
+    {'name': 'p6_year_month', 'slot': 5, 'weights': ('p6', 'p6'), 'mode': 'any',
+     'pairs': ((YEAR_EARTH, MONTH_EARTH),),
+     'relation': {7: (4,), 5: (2,), 4: (7,), 2: (5,)}},
+    # p7 백호 (일주)
+    {'name': 'p7', 'slot': 6, 'weights': ('p7', 'p71'), 'mode': 'any',
+     'pairs': ((DAY_SKY, DAY_EARTH),),
+     'relation': {1: (5,), 2: (8,), 3: (11,), 4: (2,), 5: (5,), 9: (11,), 10: (2,)}},
+    # p8 괴강 (일주/월주/연주, 여자만 감점)
+    {'name': 'p81', 'slot': 7, 'weights': ('p8', 'p81'), 'mode': 'any',
+     'pairs': ((DAY_SKY, DAY_EARTH),),
+     'relation': GOEGANG},
+    {'name': 'p82', 'slot': 7, 'weights': ('p8', 'p82'), 'mode': 'any',
+     'pairs': ((MONTH_SKY, MONTH_EARTH),),
+     'relation': GOEGANG},
+    {'name': 'p83', 'slot': 7, 'weights': ('p8', 'p83'), 'mode': 'any',
+     'pairs': ((YEAR_SKY, YEAR_EARTH),),
+     'relation': GOEGANG},
+)
+
+
+class SajuRuleTable:
+
+    ARRAY_NAMES = ('relations', 'first', 'second', 'owner', 'groups', 'any_mode', 'weight', 'slots')
+
+    def __init__(self, weights: Dict[str, float], rules=RULES):
+        self.rules = rules
+        n_rules = len(rules)
+
+        # relations[r, a, b]: 규칙 r 에서 기준값 a, 대상값 b 가 걸리는지 (1-based, 0 은 미사용)
+        self.relations = np.zeros((n_rules, 13, 13), dtype=bool)
+        first, second, owner = [], [], []
+        for r, rule in enumerate(rules):
+            for anchor, targets in rule['relation'].items():
+                self.relations[r, anchor, list(targets)] = True
+            for i, j in rule['pairs']:
+                first.append(i)
+                second.append(j)
+                owner.append(r)
+
+        self.first = np.array(first)
+        self.second = np.array(second)
+        self.owner = np.array(owner)
+
+        self.groups = np.zeros((len(owner), n_rules))
+        self.groups[np.arange(len(owner)), self.owner] = 1
+        self.any_mode = np.array([rule['mode'] == 'any' for rule in rules])
+
+        # weight[0]: 여자, weight[1]: 남자
+        self.weight = np.array([
+            [weights[rule['weights'][1]] for rule in rules],
+            [weights[rule['weights'][0]] for rule in rules]
+        ], dtype=np.float64)
+
+        self.slots = np.zeros((n_rules, SAL_SLOTS))
+        self.slots[np.arange(n_rules), [rule['slot'] for rule in rules]] = 1
+
+    @classmethod
+    def from_arrays(cls, arrays: Dict[str, np.ndarray]) -> "SajuRuleTable":
+        table = cls.__new__(cls)
+        table.rules = None
+        for name in cls.ARRAY_NAMES:
+            setattr(table, name, arrays[name])
+        return table
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        return {name: getattr(self, name) for name in self.ARRAY_NAMES}
+
+    def evaluate(self, saju: np.ndarray, gender: np.ndarray) -> np.ndarray:
+        """(N, 8) 사주 배열과 (N,) 성별로 (N, 8) 살 점수를 계산한다."""
+        saju = np.asarray(saju)
+        male = (np.asarray(gender) == 1).astype(np.intp)
+
+        hits = self.relations[self.owner, saju[:, self.first], saju[:, self.second]]
+        counts = hits @ self.groups
+        counts = np.where(self.any_mode, np.minimum(counts, 1), counts)
+
+        return (counts * self.weight[male]) @ self.slots
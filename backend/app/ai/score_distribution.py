@@ -0,0 +1,105 @@
+"""
+궁합 점수 분포 (백분위)
+
+궁합 점수는 두 사람의 (연간, 연지) 코드와 각자의 살 점수 합으로 정해지므로
+사람들을 (코드, 감점) 유형별 인원수 히스토그램으로 모은 뒤
+유형 쌍마다 점수를 계산해 0.01점 단위 누적분포(CDF)로 만든다.
+백분위 조회는 cdf[round(score * 100)] 한 번이다.
+"""
+import hashlib
+import numpy as np
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from app.ai.engine_bundle import read_bundle, write_bundle
+
+CODES = 120
+SCORE_BINS = 10001  # 0.00 ~ 100.00
+PENALTY_SCALE = 100  # 감점은 0.01점 단위로 모은다
+
+
+class PersonHistogram:
+    """(코드, 감점) 유형별 인원수. 프로필을 여러 번 나눠 add 할 수 있다."""
+
+    def __init__(self):
+        self.counts: Dict[int, int] = {}
+        self.total = 0
+
+    def add(self, codes: np.ndarray, penalties: np.ndarray):
+        codes = np.asarray(codes, dtype=np.int64)
+        penalty_bins = np.round(np.asarray(penalties) * PENALTY_SCALE).astype(np.int64)
+        keys = penalty_bins * CODES + codes
+        unique, counts = np.unique(keys, return_counts=True)
+        for key, count in zip(unique.tolist(), counts.tolist()):
+            self.counts[key] = self.counts.get(key, 0) + count
+        self.total += len(codes)
+
+    def types(self):
+        keys = np.array(list(self.counts.keys()), dtype=np.int64)
+        counts = np.array(list(self.counts.values()), dtype=np.float64)
+        penalty_bins, codes = np.divmod(keys, CODES)
+        return codes, penalty_bins / PENALTY_SCALE, counts
+
+
+class ScoreDistribution:
+
+    def __init__(self, cdf: np.ndarray, metadata: Optional[Dict] = None):
+        # cdf[i]: 점수가 i/100 이하인 쌍의 비율
+        self.cdf = cdf
+        self.metadata = metadata or {}
+        self.version = hashlib.sha256(np.ascontiguousarray(cdf).tobytes()).hexdigest()[:8]
+
+    @classmethod
+    def build(cls, base_scores: np.ndarray, histogram: PersonHistogram, **metadata) -> "ScoreDistribution":
+        """
+        base_scores[c1, c2]: 코드 c1 인 사람과 c2 인 사람의 (천간+지지)/2*100 (120 x 120)
+        모든 (사람1, 사람2) 순서쌍의 점수 분포를 만든다.
+        """
+        codes, penalties, counts = histogram.types()
+        hist = np.zeros(SCORE_BINS)
+
+        # 유형 수가 수천 개라 유형 쌍을 행 단위로 나눠 계산한다
+        chunk = 256
+        for start in range(0, len(codes), chunk):
+            rows = slice(start, start + chunk)
+            scores = base_scores[codes[rows, None], codes[None, :]] - penalties[rows, None] - penalties[None, :]
+            bins = np.round(np.clip(scores, 0, 100) * 100).astype(np.int64)
+            weights = counts[rows, None] * counts[None, :]
+            hist += np.bincount(bins.ravel(), weights=weights.ravel(), minlength=SCORE_BINS)
+
+        cdf = np.cumsum(hist)
+        cdf /= cdf[-1]
+        metadata = {
+            'built_at': datetime.now(timezone.utc).isoformat(),
+            'population': histogram.total,
+            'types': len(codes),
+            **metadata
+        }
+        return cls(cdf.astype(np.float32), metadata)
+
+    @classmethod
+    def load(cls, path: str) -> "ScoreDistribution":
+        arrays, header = read_bundle(path)
+        return cls(arrays['cdf'], header['metadata'])
+
+    def save(self, path: str) -> str:
+        return write_bundle(path, {'cdf': self.cdf}, self.metadata)
+
+    def percentile(self, score: float) -> Dict[str, float]:
+        """{'percentile': 이 점수 이하 비율(%), 'top_percent': 이 점수 이상 비율(%)}"""
+        index = int(round(min(max(score, 0.0), 100.0) * 100))
+        below = float(self.cdf[index - 1]) if index > 0 else 0.0
+        return {
+            'percentile': round(float(self.cdf[index]) * 100, 1),
+            'top_percent': round((1 - below) * 100, 1)
+        }
+
+    def percentiles(self, scores) -> Dict[str, np.ndarray]:
+        index = np.round(np.clip(scores, 0, 100) * 100).astype(np.int64)
+        # percentile() 과 같은 값이 나오도록 float64 로 계산한다
+        cdf = self.cdf.astype(np.float64)
+        below = np.where(index > 0, cdf[np.maximum(index - 1, 0)], 0.0)
+        return {
+            'percentile': np.round(cdf[index] * 100, 1),
+            'top_percent': np.round((1 - below) * 100, 1)
+        }
@@ -0,0 +1,190 @@
+"""
+후보(shadow) 엔진 비교 평가
+
+새 모델/번들을 교체하기 전에 실제 요청의 일부를 후보 엔진으로도 채점해
+서비스 엔진 점수와의 차이를 점수 구간별로 모은다.
+채점은 응답을 보낸 뒤 별도 스레드 1개에서 실행되고, 밀린 작업이
+SHADOW_MAX_PENDING 을 넘으면 버리므로 요청 지연에는 영향을 주지 않는다.
+"""
+import random
+import threading
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from app.config import settings
+
+BUCKET_SIZE = 10  # 서비스 엔진 점수 10점 단위 구간
+DELTA_EDGES = (-np.inf, -10, -5, -2, -1, -0.1, 0.1, 1, 2, 5, 10, np.inf)
+
+
+def _delta_label(index: int) -> str:
+    low, high = DELTA_EDGES[index], DELTA_EDGES[index + 1]
+    if low == -np.inf:
+        return f"<{high:g}"
+    if high == np.inf:
+        return f">={low:g}"
+    return f"{low:g}~{high:g}"
+
+
+class ShadowEvaluator:
+
+    def __init__(self, fraction: float, max_pending: int = 256):
+        self.fraction = fraction
+        self.max_pending = max_pending
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._engine = None
+        self._lock = threading.Lock()
+
+        self.error: Optional[str] = None
+        self.pending = 0
+        self.reset()
+
+    @property
+    def enabled(self) -> bool:
+        return self.fraction > 0 and self.error is None
+
+    def reset(self):
+        """통계 초기화 (서비스 엔진이 바뀌었을 때)"""
+        with self._lock:
+            self.sampled = 0
+            self.dropped = 0
+            self.failed = 0
+            self.compared = 0
+            self.identical = 0
+            self.band_changes = 0
+            self.max_abs_delta = 0.0
+            self.bucket_counts = np.zeros(100 // BUCKET_SIZE, dtype=np.int64)
+            self.bucket_delta_sum = np.zeros(100 // BUCKET_SIZE)
+            self.bucket_abs_sum = np.zeros(100 // BUCKET_SIZE)
+            self.bucket_max_abs = np.zeros(100 // BUCKET_SIZE)
+            self.bucket_band_changes = np.zeros(100 // BUCKET_SIZE, dtype=np.int64)
+            self.delta_hist = np.zeros(len(DELTA_EDGES) - 1, dtype=np.int64)
+
+    def submit(self, method: str, primary: Dict, *args, **kwargs) -> bool:
+        """
+        서비스 엔진 결과(primary)를 받은 뒤 호출한다. 표본으로 뽑히면 후보 엔진 채점을 예약하고 바로 돌아온다.
+        args/kwargs 는 서비스 엔진에 넘긴 그대로.
+        """
+        if not self.enabled or random.random() >= self.fraction:
+            return False
+
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.dropped += 1
+                return False
+            self.pending += 1
+            self.sampled += 1
+
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=1, thread_name_prefix='shadow-engine')
+        # 이후 라우터가 결과 dict 에 이름 등을 덧붙이므로 비교할 값만 복사해 둔다
+        expected = {
+            'compatibility_score': primary['compatibility_score'],
+            'interpretation': primary['interpretation']
+        }
+        self._pool.submit(self._evaluate, method, expected, args, kwargs)
+        return True
+
+    def _get_engine(self):
+        if self._engine is None:
+            from app.ai.saju_engine import SajuEngine
+            model_paths = (
+                settings.SHADOW_SKY_MODEL_PATH or settings.SKY_MODEL_PATH,
+                settings.SHADOW_EARTH_MODEL_PATH or settings.EARTH_MODEL_PATH
+            )
+            # 번들이 없으면 ENGINE_BUNDLE_PATH 대신 후보 모델 파일에서 읽도록 "" 를 넘긴다
+            self._engine = SajuEngine(settings.SHADOW_BUNDLE_PATH, model_paths=model_paths, shadow=True)
+            print(f"✓ Shadow engine loaded (version {self._engine.version})")
+        return self._engine
+
+    def _evaluate(self, method: str, expected: Dict, args: tuple, kwargs: dict):
+        try:
+            engine = self._get_engine()
+        except Exception as e:
+            # 후보 엔진을 만들 수 없으면 더 이상 표본을 뽑지 않는다
+            print(f"⚠ Warning: Shadow engine could not be loaded, disabling: {e}")
+            with self._lock:
+                self.error = str(e)
+                self.pending -= 1
+            return
+
+        try:
+            candidate = getattr(engine, method)(*args, **kwargs)
+        except Exception as e:
+            print(f"⚠ Warning: Shadow scoring failed: {e}")
+            with self._lock:
+                self.failed += 1
+                self.pending -= 1
+            return
+
+        self._record(expected, candidate)
+
+    def _record(self, expected: Dict, candidate: Dict):
+        score = expected['compatibility_score']
+        delta = candidate['compatibility_score'] - score
+        bucket = min(int(score // BUCKET_SIZE), len(self.bucket_counts) - 1)
+        band_changed = candidate['interpretation'] != expected['interpretation']
+
+        with self._lock:
+            self.pending -= 1
+            self.compared += 1
+            self.identical += delta == 0
+            self.band_changes += band_changed
+            self.max_abs_delta = max(self.max_abs_delta, abs(delta))
+            self.bucket_counts[bucket] += 1
+            self.bucket_delta_sum[bucket] += delta
+            self.bucket_abs_sum[bucket] += abs(delta)
+            self.bucket_max_abs[bucket] = max(self.bucket_max_abs[bucket], abs(delta))
+            self.bucket_band_changes[bucket] += band_changed
+            self.delta_hist[np.searchsorted(DELTA_EDGES, delta, side='right') - 1] += 1
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            buckets = []
+            for bucket, count in enumerate(self.bucket_counts.tolist()):
+                if count == 0:
+                    continue
+                buckets.append({
+                    'score_range': f"{bucket * BUCKET_SIZE}~{(bucket + 1) * BUCKET_SIZE}",
+                    'count': count,
+                    'mean_delta': round(self.bucket_delta_sum[bucket] / count, 4),
+                    'mean_abs_delta': round(self.bucket_abs_sum[bucket] / count, 4),
+                    'max_abs_delta': round(float(self.bucket_max_abs[bucket]), 4),
+                    'interpretation_changes': int(self.bucket_band_changes[bucket])
+                })
+
+            return {
+                'enabled': self.enabled,
+                'fraction': self.fraction,
+                'engine_version': self._engine.version if self._engine is not None else None,
+                'error': self.error,
+                'sampled': self.sampled,
+                'dropped': self.dropped,
+                'failed': self.failed,
+                'pending': self.pending,
+                'compared': self.compared,
+                'identical': self.identical,
+                'interpretation_changes': self.band_changes,
+                'mean_abs_delta': round(float(self.bucket_abs_sum.sum()) / self.compared, 4) if self.compared else None,
+                'max_abs_delta': round(self.max_abs_delta, 4),
+                'buckets': buckets,
+                'delta_histogram': {
+                    _delta_label(index): int(count) for index, count in enumerate(self.delta_hist)
+                }
+            }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+
+_shadow_instance = None
+
+
+def get_shadow_evaluator() -> ShadowEvaluator:
+    global _shadow_instance
+    if _shadow_instance is None:
+        _shadow_instance = ShadowEvaluator(settings.SHADOW_FRACTION, settings.SHADOW_MAX_PENDING)
+    return _shadow_instance
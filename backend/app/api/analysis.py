@@ -1,23 +1,41 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.responses import StreamingResponse
+from starlette.requests import ClientDisconnect
 from sqlalchemy.ext.asyncio import AsyncSession
 
+from app.config import settings
 from app.database import get_db
 from app.api.auth import get_current_user
 from app.models.user import User
-from app.schemas.analysis import DirectAnalysisRequest
-from app.ai.saju_engine import get_engine
+from app.schemas.analysis import DirectAnalysisRequest, GroupAnalysisRequest, EngineReloadRequest
+from app.ai.executor import get_engine_executor, EngineBusyError
+from app.ai.batcher import get_score_batcher
+from app.ai.result_cache import get_result_cache
+from app.ai.profile_matrix import get_profile_matrix
+from app.ai.engine_reload import reload_engine
+from app.ai.shadow import get_shadow_evaluator
+from app.services.bulk_analysis import stream_bulk_analysis
 
 router = APIRouter()
 
 
+def require_admin_token(x_admin_token: str = Header(default="")):
+    """관리자 API 용. X-Admin-Token 이 ADMIN_TOKEN 과 같아야 하며, ADMIN_TOKEN 이 비어 있으면 모두 거부한다."""
+    if not settings.ADMIN_TOKEN or x_admin_token != settings.ADMIN_TOKEN:
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Admin token required"
+        )
+
+
 @router.post("/calculate")
 async def calculate_compatibility(
         data: DirectAnalysisRequest,
+        response: Response,
 ):
     try:
-        engine = get_engine()
-
-        result = engine.analyze_compatibility(
+        birth_data = dict(
             year1=data.user1_birth_year,
             month1=data.user1_birth_month,
             day1=data.user1_birth_day,
@@ -31,11 +49,32 @@ async def calculate_compatibility(
             gender2=data.user2_gender
         )
 
+        if data.hour_uncertainty:
+            result, timing = await get_engine_executor().call('analyze_hour_uncertainty', **birth_data)
+            response.headers['Server-Timing'] = (
+                f"queue;dur={timing['queue_wait_ms']}, engine;dur={timing['execution_ms']}"
+            )
+        elif settings.ENGINE_MICRO_BATCHING:
+            result = await get_score_batcher().analyze_compatibility(**birth_data)
+        else:
+            result, timing = await get_engine_executor().call('analyze_compatibility', **birth_data)
+            response.headers['Server-Timing'] = (
+                f"queue;dur={timing['queue_wait_ms']}, engine;dur={timing['execution_ms']}"
+            )
+
+        if not data.hour_uncertainty:
+            get_shadow_evaluator().submit('analyze_compatibility', result, **birth_data)
+
         result['user1_name'] = data.user1_name
         result['user2_name'] = data.user2_name
 
         return result
 
+    except EngineBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
     except Exception as e:
         print(f"Analysis Error: {str(e)}")
         raise HTTPException(
@@ -44,6 +83,146 @@ async def calculate_compatibility(
         )
 
 
+@router.post("/group")
+async def calculate_group_compatibility(
+        data: GroupAnalysisRequest,
+        response: Response,
+):
+    members = data.members
+    try:
+        result, timing = await get_engine_executor().call(
+            'analyze_group',
+            [member.birth_year for member in members],
+            [member.birth_month for member in members],
+            [member.birth_day for member in members],
+            [member.birth_hour for member in members],
+            [member.gender for member in members]
+        )
+    except EngineBusyError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e)
+        )
+    except Exception as e:
+        print(f"Group Analysis Error: {str(e)}")
+        raise HTTPException(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            detail=f"Analysis failed: {str(e)}"
+        )
+
+    response.headers['Server-Timing'] = (
+        f"queue;dur={timing['queue_wait_ms']}, engine;dur={timing['execution_ms']}"
+    )
+    result['names'] = [member.name for member in members]
+    return result
+
+
+CSV_CONTENT_TYPES = ('text/csv', 'application/csv')
+NDJSON_CONTENT_TYPES = ('application/x-ndjson', 'application/ndjson', 'application/jsonl', 'application/x-jsonlines')
+
+
+class BodyStreamingResponse(StreamingResponse):
+    """
+    요청 본문을 읽으면서 응답을 내보내는 StreamingResponse.
+    기본 StreamingResponse 는 연결 끊김을 기다리며 receive() 를 따로 읽어 본문 메시지를 가로채므로 쓰지 않는다.
+    연결이 끊기면 본문 읽기에서 ClientDisconnect 가 나므로 거기서 멈춘다.
+    """
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await self.stream_response(send)
+        except ClientDisconnect:
+            return
+        if self.background is not None:
+            await self.background()
+
+
+@router.post("/bulk")
+async def calculate_bulk_compatibility(
+        request: Request,
+        content_type: str = Header(default="application/x-ndjson"),
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    """
+    NDJSON 또는 CSV (헤더 행 필요) 본문의 각 행을 /calculate 와 같은 필드로 받아 궁합을 계산하고,
+    결과를 입력 순서대로 NDJSON 으로 스트리밍한다. 잘못된 행은 해당 줄에 error 로 표시된다.
+    """
+    media_type = content_type.split(';')[0].strip().lower()
+    if media_type not in CSV_CONTENT_TYPES + NDJSON_CONTENT_TYPES:
+        raise HTTPException(
+            status_code=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            detail="Content-Type must be application/x-ndjson or text/csv"
+        )
+
+    # 스트림이 끝날 때까지 DB 연결을 붙잡고 있지 않도록 인증 후 바로 반납한다
+    await db.close()
+
+    return BodyStreamingResponse(
+        stream_bulk_analysis(request.stream(), csv_input=media_type in CSV_CONTENT_TYPES),
+        media_type="application/x-ndjson"
+    )
+
+
+@router.get("/engine/stats", dependencies=[Depends(require_admin_token)])
+async def get_engine_stats():
+    return {
+        'executor': get_engine_executor().stats(),
+        'micro_batching': get_score_batcher().stats() if settings.ENGINE_MICRO_BATCHING else None,
+        'result_cache': get_result_cache().stats(),
+        'match_index': get_profile_matrix().stats()
+    }
+
+
+@router.get("/engine/shadow", dependencies=[Depends(require_admin_token)])
+async def get_shadow_report():
+    return get_shadow_evaluator().report()
+
+
+@router.post("/engine/reload", dependencies=[Depends(require_admin_token)])
+async def reload_analysis_engine(data: EngineReloadRequest):
+    report = await reload_engine(data.bundle_path, data.max_delta)
+    if not report['swapped']:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=report
+        )
+    return report
+
+
+@router.get("/matches")
+async def get_top_matches(
+        k: int = Query(10, ge=1, le=100),
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    from app.services.match_service import MatchService
+    match_service = MatchService(db)
+    return await match_service.find_matches(current_user.id, k)
+
+
+@router.post("/couple/{couple_id}", status_code=status.HTTP_202_ACCEPTED)
+async def request_couple_analysis(
+        couple_id: int,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    from app.services.analysis_service import AnalysisService
+    analysis_service = AnalysisService(db)
+    return await analysis_service.create_analysis_for_couple(couple_id, current_user.id)
+
+
+@router.get("/requests/{request_id}")
+async def get_analysis_request_status(
+        request_id: int,
+        current_user: User = Depends(get_current_user),
+        db: AsyncSession = Depends(get_db)
+):
+    from app.services.analysis_service import AnalysisService
+    analysis_service = AnalysisService(db)
+    return await analysis_service.get_request_status(request_id, current_user.id)
+
+
 @router.get("/{result_id}")
 async def get_analysis_result(
         result_id: int,
@@ -58,9 +237,11 @@ async def get_analysis_result(
 @router.get("/couple/{couple_id}/history")
 async def get_analysis_history(
         couple_id: int,
+        limit: int = Query(20, ge=1, le=100),
+        cursor: Optional[str] = Query(None, description="이전 응답의 next_cursor"),
         current_user: User = Depends(get_current_user),
         db: AsyncSession = Depends(get_db)
 ):
     from app.services.analysis_service import AnalysisService
     analysis_service = AnalysisService(db)
-    return await analysis_service.get_couple_history(couple_id, current_user.id)
+    return await analysis_service.get_couple_history(couple_id, current_user.id, limit, cursor)
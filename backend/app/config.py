@@ -30,6 +30,36 @@ class Settings(BaseSettings):
     SKY_MODEL_PATH: str = "./models/sky3000.h5"
     EARTH_MODEL_PATH: str = "./models/earth3000.h5"
     CALENDAR_FILE_PATH: str = "./models/cal.csv"
+    USE_SCORE_TABLES: bool = True
+    ENGINE_BACKEND: str = "keras"  # keras | numpy
+    ENGINE_EXECUTOR: str = "thread"  # thread | process
+    ENGINE_POOL_SIZE: int = 4
+    ENGINE_MAX_QUEUE: int = 64
+    ENGINE_MICRO_BATCHING: bool = False
+    MICRO_BATCH_MAX_SIZE: int = 64
+    MICRO_BATCH_MAX_WAIT_MS: float = 2.0
+    ENGINE_RESULT_CACHE_SIZE: int = 4096  # 0 이면 사용 안 함
+    PILLAR_TABLE_PATH: str = "./models/pillar_table.bin"  # 생년월일시 -> 기둥 조회표 (없거나 오래되면 자동 생성)
+    SCORE_DISTRIBUTION_PATH: str = "./models/score_distribution.bin"  # 백분위 계산용 점수 분포 (refresh_score_distribution.py)
+    ENGINE_WATCH_INTERVAL: float = 0  # 초, 0 이면 모델/절기 파일 감시 안 함
+    ENGINE_RELOAD_MAX_DELTA: float = 0  # 교체 시 golden 점수 변화 허용치, 0 이면 제한 없음
+    ENGINE_RELOAD_MARKER_PATH: str = "./models/engine_reload.json"  # 워커들이 함께 보는 마지막 엔진 교체 기록
+    ENGINE_RELOAD_SYNC_INTERVAL: float = 2.0  # 초, 다른 워커의 교체 기록 확인 주기 (0 이면 교체가 요청받은 워커에만 적용)
+    ADMIN_TOKEN: str = ""  # 관리자 API (X-Admin-Token), 비워두면 비활성화
+    SHADOW_FRACTION: float = 0.0  # 후보 엔진으로도 채점할 요청 비율 (0 이면 사용 안 함)
+    SHADOW_BUNDLE_PATH: str = ""  # 후보 엔진 번들
+    SHADOW_SKY_MODEL_PATH: str = ""  # 번들 대신 후보 모델 파일 (비우면 서비스 모델 사용)
+    SHADOW_EARTH_MODEL_PATH: str = ""
+    SHADOW_MAX_PENDING: int = 256  # 밀린 후보 채점이 이보다 많으면 버린다
+    ANALYSIS_WORKERS: int = 2  # 커플 분석 작업자 수 (0 이면 이 프로세스에서는 처리하지 않음)
+    ANALYSIS_BATCH_SIZE: int = 32  # 작업자가 한 번에 가져가 배치로 계산할 요청 수
+    ANALYSIS_POLL_INTERVAL: float = 1.0  # 초, 대기 요청이 없을 때 다시 확인하는 간격
+    ANALYSIS_JOB_TIMEOUT: float = 300  # 초, 이 시간 동안 끝나지 않은 PROCESSING 요청은 다시 가져간다
+    BULK_CHUNK_SIZE: int = 1024  # 대량 분석 스트림에서 엔진 배치 한 번에 계산할 행 수
+    BULK_MAX_LINE_BYTES: int = 65536  # 대량 분석 입력 한 줄의 최대 크기 (넘으면 그 행만 오류)
+    RESULT_CACHE_TTL: int = 0  # 초, 분석 결과 조회 Redis 캐시 (0 이면 사용 안 함)
+    MATCH_INDEX_REFRESH_INTERVAL: float = 5.0  # 초, 다른 워커에서 바뀐 프로필을 궁합 검색 행렬에 반영하는 주기
+    ENGINE_BUNDLE_PATH: str = ""  # build_engine_bundle.py 로 만든 번들 (설정 시 모델/cal.csv 대신 사용)
     
     IMAGE_CACHE_DIR: str = "./cache/images"
     IMAGE_CACHE_TTL: int = 3600
@@ -1,16 +1,42 @@
+import asyncio
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from app.config import settings
 from app.database import init_db
+from app.ai.executor import shutdown_engine_executor
+from app.ai.engine_reload import watch_engine_sources, watch_reload_marker, apply_reload_marker_at_startup
+from app.ai.shadow import get_shadow_evaluator
+from app.services.analysis_worker import start_analysis_workers
+from app.utils.cache import cache
 from app.api import auth, users, couples, analysis, ranking, share
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     await init_db()
+    watchers = []
+    if settings.ENGINE_WATCH_INTERVAL > 0:
+        watchers.append(asyncio.create_task(watch_engine_sources(settings.ENGINE_WATCH_INTERVAL)))
+    if settings.ENGINE_RELOAD_SYNC_INTERVAL > 0:
+        apply_reload_marker_at_startup()
+        watchers.append(asyncio.create_task(watch_reload_marker(settings.ENGINE_RELOAD_SYNC_INTERVAL)))
+    workers = start_analysis_workers()
+    if settings.RESULT_CACHE_TTL > 0:
+        try:
+            await cache.connect()
+        except Exception as e:
+            print(f"⚠ Warning: Redis connection failed, result cache disabled: {e}")
     print(f"✅ {settings.APP_NAME} v{settings.APP_VERSION} started")
     yield
+    for watcher in watchers:
+        watcher.cancel()
+    for worker in workers:
+        worker.cancel()
+    await asyncio.gather(*workers, return_exceptions=True)
+    get_shadow_evaluator().shutdown()
+    shutdown_engine_executor()
+    await cache.disconnect()
     print(f"🛑 {settings.APP_NAME} shutting down")
 
 app = FastAPI(
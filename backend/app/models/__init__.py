@@ -1,4 +1,4 @@
-from app.models.user import User, Profile, GenderEnum
+from app.models.user import User, Profile, ProfileDeletion, GenderEnum
 from app.models.couple import Couple
 from app.models.analysis import AnalysisRequest, AnalysisResult, AnalysisStatusEnum
 from app.models.ranking import RankingEntry, RankingPeriodEnum
@@ -8,6 +8,7 @@ from app.models.share import ShareLog, SharePlatformEnum
 __all__ = [
     "User",
     "Profile",
+    "ProfileDeletion",
     "GenderEnum",
     "Couple",
     "AnalysisRequest",
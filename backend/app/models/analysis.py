@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Enum as SQLEnum, Text
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Float, JSON, Enum as SQLEnum, Text, Index, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -12,6 +12,10 @@ class AnalysisStatusEnum(str, enum.Enum):
     FAILED = "failed"
 
 
+# 아직 처리되지 않은 요청 (DB 에는 enum 이름이 저장된다)
+_ACTIVE_STATUS_CLAUSE = "status IN ('PENDING', 'PROCESSING')"
+
+
 class AnalysisRequest(Base):
     __tablename__ = "analysis_requests"
     
@@ -19,7 +23,21 @@ class AnalysisRequest(Base):
     couple_id = Column(Integer, ForeignKey("couples.id", ondelete="CASCADE"), nullable=False)
     status = Column(SQLEnum(AnalysisStatusEnum), default=AnalysisStatusEnum.PENDING)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)  # 작업자가 가져간 시각
     completed_at = Column(DateTime(timezone=True), nullable=True)
+    error_message = Column(Text, nullable=True)  # FAILED 사유
+    
+    __table_args__ = (
+        # 작업자가 대기 중인 요청을 오래된 순으로 가져가는 쿼리용
+        Index('ix_analysis_requests_status_created', 'status', 'created_at'),
+        # 커플 분석 기록 keyset 페이지네이션용
+        Index('ix_analysis_requests_couple_created', 'couple_id', 'created_at', 'id'),
+        # 커플당 처리 중인 요청은 하나만 (동시에 들어온 분석 요청 중복 방지)
+        Index(
+            'uq_analysis_requests_couple_active', 'couple_id', unique=True,
+            postgresql_where=text(_ACTIVE_STATUS_CLAUSE), sqlite_where=text(_ACTIVE_STATUS_CLAUSE)
+        ),
+    )
     
     # Relationships
     couple = relationship("Couple", back_populates="analysis_requests")
@@ -37,6 +55,8 @@ class AnalysisResult(Base):
     saju_data_user2 = Column(JSON, nullable=True)  # 사용자2 사주 데이터
     interpretation = Column(Text, nullable=True)  # AI 해석 텍스트
     certificate_image_url = Column(String(255), nullable=True)  # 인증서 이미지 URL
+    input_hash = Column(String(64), nullable=True, index=True)  # 두 사람의 생년월일시/성별 해시
+    engine_version = Column(String(32), nullable=True)  # 계산한 SajuEngine 버전
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, Boolean, ForeignKey, Enum as SQLEnum
+from sqlalchemy import Column, Integer, String, DateTime, Boolean, Float, JSON, ForeignKey, Enum as SQLEnum
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from app.database import Base
@@ -45,8 +45,21 @@ class Profile(Base):
     gender = Column(SQLEnum(GenderEnum), nullable=True)
     zodiac_sign = Column(String(20), nullable=True)
     avatar_url = Column(String(255), nullable=True)
+    # 생년월일시/성별로 미리 계산한 사주 (SajuEngine.analyze_person)
+    saju_pillars = Column(JSON, nullable=True)  # 8개 기둥 값
+    saju_sal = Column(JSON, nullable=True)  # 살 점수 8칸
+    saju_penalty = Column(Float, nullable=True)  # 살 점수 합
+    saju_version = Column(String(32), nullable=True)  # 계산한 엔진 버전
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), onupdate=func.now())
 
     # Relationships
-    user = relationship("User", back_populates="profile")
\ No newline at end of file
+    user = relationship("User", back_populates="profile")
+
+class ProfileDeletion(Base):
+    """삭제된 프로필 기록. 다른 워커의 궁합 검색 행렬이 삭제를 따라오는 데 쓴다."""
+    __tablename__ = "profile_deletions"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now(), nullable=False, index=True)
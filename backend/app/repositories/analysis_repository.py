@@ -1,7 +1,11 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional, List
+from sqlalchemy import select, update, or_, and_, tuple_, literal
+from sqlalchemy.orm import aliased
+from datetime import datetime
+from typing import Optional, List, Dict, Tuple
 from app.models.analysis import AnalysisRequest, AnalysisResult, AnalysisStatusEnum
+from app.models.couple import Couple
+from app.models.user import Profile
 
 
 class AnalysisRepository:
@@ -32,6 +36,138 @@ class AnalysisRepository:
         )
         return list(result.scalars().all())
     
+    async def claim_pending(self, limit: int, stale_before: datetime, claimed_at: datetime) -> List[AnalysisRequest]:
+        """
+        대기 중인 요청을 오래된 순으로 최대 limit 개 가져와 PROCESSING 으로 바꾸고 started_at 을 claimed_at 으로 찍는다.
+        FOR UPDATE SKIP LOCKED 로 여러 작업자가 같은 요청을 가져가지 않고,
+        stale_before 이전에 가져간 뒤 끝나지 않은 요청(작업자 중단)도 다시 가져간다.
+        """
+        result = await self.db.execute(
+            select(AnalysisRequest)
+            .where(or_(
+                AnalysisRequest.status == AnalysisStatusEnum.PENDING,
+                and_(
+                    AnalysisRequest.status == AnalysisStatusEnum.PROCESSING,
+                    AnalysisRequest.started_at < stale_before
+                )
+            ))
+            .order_by(AnalysisRequest.created_at, AnalysisRequest.id)
+            .limit(limit)
+            .with_for_update(skip_locked=True)
+        )
+        requests = list(result.scalars().all())
+        
+        for request in requests:
+            request.status = AnalysisStatusEnum.PROCESSING
+            request.started_at = claimed_at
+        await self.db.flush()
+        return requests
+    
+    async def complete_claimed(self, request_ids: List[int], claimed_at: datetime, completed_at: datetime) -> List[int]:
+        """
+        claimed_at 에 가져간 요청 중 아직 그 작업자 몫인 것만 COMPLETED 로 바꾸고 그 id 를 돌려준다.
+        처리 중 시간이 초과되어 다른 작업자가 다시 가져간 요청은 started_at 이 바뀌어 있어 제외된다.
+        """
+        if not request_ids:
+            return []
+        result = await self.db.execute(
+            update(AnalysisRequest)
+            .where(
+                AnalysisRequest.id.in_(request_ids),
+                AnalysisRequest.status == AnalysisStatusEnum.PROCESSING,
+                AnalysisRequest.started_at == claimed_at
+            )
+            .values(status=AnalysisStatusEnum.COMPLETED, completed_at=completed_at)
+            .returning(AnalysisRequest.id)
+        )
+        return list(result.scalars().all())
+    
+    async def get_couple_profiles(self, couple_ids: List[int]) -> Dict[int, Tuple[Optional[Profile], Optional[Profile]]]:
+        """커플별 (user1 프로필, user2 프로필)을 한 번에 읽는다."""
+        if not couple_ids:
+            return {}
+        profile1 = aliased(Profile)
+        profile2 = aliased(Profile)
+        result = await self.db.execute(
+            select(Couple.id, profile1, profile2)
+            .outerjoin(profile1, profile1.user_id == Couple.user1_id)
+            .outerjoin(profile2, profile2.user_id == Couple.user2_id)
+            .where(Couple.id.in_(couple_ids))
+        )
+        return {couple_id: (first, second) for couple_id, first, second in result.all()}
+    
+    async def get_request_status(self, request_id: int) -> Optional[Tuple[AnalysisRequest, Optional[AnalysisResult], int, int]]:
+        """(요청, 결과, 커플 user1_id, user2_id) 를 한 번에 읽는다."""
+        result = await self.db.execute(
+            select(AnalysisRequest, AnalysisResult, Couple.user1_id, Couple.user2_id)
+            .join(Couple, Couple.id == AnalysisRequest.couple_id)
+            .outerjoin(AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id)
+            .where(AnalysisRequest.id == request_id)
+        )
+        return result.one_or_none()
+    
+    async def get_active_request(self, couple_id: int) -> Optional[AnalysisRequest]:
+        """아직 처리되지 않은 (PENDING/PROCESSING) 가장 최근 요청"""
+        result = await self.db.execute(
+            select(AnalysisRequest)
+            .where(
+                AnalysisRequest.couple_id == couple_id,
+                AnalysisRequest.status.in_([AnalysisStatusEnum.PENDING, AnalysisStatusEnum.PROCESSING])
+            )
+            .order_by(AnalysisRequest.created_at.desc(), AnalysisRequest.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def find_result(self, couple_id: int, input_hash: str, engine_version: str) -> Optional[AnalysisResult]:
+        """같은 입력과 엔진 버전으로 이미 계산한 이 커플의 결과"""
+        result = await self.db.execute(
+            select(AnalysisResult)
+            .join(AnalysisRequest, AnalysisRequest.id == AnalysisResult.request_id)
+            .where(
+                AnalysisRequest.couple_id == couple_id,
+                AnalysisResult.input_hash == input_hash,
+                AnalysisResult.engine_version == engine_version
+            )
+            .order_by(AnalysisResult.id.desc())
+            .limit(1)
+        )
+        return result.scalar_one_or_none()
+    
+    async def get_history_page(
+        self,
+        couple_id: int,
+        limit: int,
+        before: Optional[Tuple[datetime, int]] = None
+    ) -> list:
+        """
+        커플의 분석 요청과 결과 요약을 최신순으로 limit 개 읽는다 (요청 LEFT JOIN 결과, 쿼리 한 번).
+        before: 이전 페이지 마지막 행의 (created_at, id). 그보다 오래된 행부터 읽는다.
+        """
+        query = (
+            select(
+                AnalysisRequest.id.label('request_id'),
+                AnalysisRequest.status,
+                AnalysisRequest.created_at,
+                AnalysisRequest.completed_at,
+                AnalysisResult.id.label('result_id'),
+                AnalysisResult.compatibility_score,
+                AnalysisResult.interpretation
+            )
+            .outerjoin(AnalysisResult, AnalysisResult.request_id == AnalysisRequest.id)
+            .where(AnalysisRequest.couple_id == couple_id)
+            .order_by(AnalysisRequest.created_at.desc(), AnalysisRequest.id.desc())
+            .limit(limit)
+        )
+        if before is not None:
+            created_at, request_id = before
+            query = query.where(
+                tuple_(AnalysisRequest.created_at, AnalysisRequest.id)
+                < tuple_(literal(created_at, AnalysisRequest.created_at.type), literal(request_id))
+            )
+        result = await self.db.execute(query)
+        return list(result.all())
+    
     async def create_result(self, request_id: int, score: float, **kwargs) -> AnalysisResult:
         result = AnalysisResult(
             request_id=request_id,
@@ -43,12 +179,41 @@ class AnalysisRepository:
         await self.db.refresh(result)
         return result
     
+    async def create_results(self, rows: List[Dict]) -> List[AnalysisResult]:
+        """여러 결과를 한 번의 flush 로 저장한다. rows: create_result 의 인자 dict"""
+        results = [
+            AnalysisResult(request_id=row.pop('request_id'), compatibility_score=row.pop('score'), **row)
+            for row in rows
+        ]
+        self.db.add_all(results)
+        await self.db.flush()
+        return results
+    
     async def get_result_by_id(self, result_id: int) -> Optional[AnalysisResult]:
         result = await self.db.execute(
             select(AnalysisResult).where(AnalysisResult.id == result_id)
         )
         return result.scalar_one_or_none()
     
+    async def get_result_for_user(self, result_id: int, user_id: int) -> Optional[Tuple[AnalysisResult, bool]]:
+        """(결과, user_id 가 커플 구성원인지) 를 결과 -> 요청 -> 커플 조인 한 번으로 읽는다."""
+        is_member = or_(Couple.user1_id == user_id, Couple.user2_id == user_id).label('is_member')
+        result = await self.db.execute(
+            select(AnalysisResult, is_member)
+            .join(AnalysisRequest, AnalysisRequest.id == AnalysisResult.request_id)
+            .join(Couple, Couple.id == AnalysisRequest.couple_id)
+            .where(AnalysisResult.id == result_id)
+        )
+        return result.one_or_none()
+    
+    async def get_result_ids_by_couple(self, couple_id: int) -> List[int]:
+        result = await self.db.execute(
+            select(AnalysisResult.id)
+            .join(AnalysisRequest, AnalysisRequest.id == AnalysisResult.request_id)
+            .where(AnalysisRequest.couple_id == couple_id)
+        )
+        return list(result.scalars().all())
+    
     async def get_result_by_request_id(self, request_id: int) -> Optional[AnalysisResult]:
         result = await self.db.execute(
             select(AnalysisResult).where(AnalysisResult.request_id == request_id)
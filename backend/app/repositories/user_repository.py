@@ -1,9 +1,15 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import select
-from typing import Optional
-from app.models.user import User, Profile
+from sqlalchemy import select, func
+from datetime import datetime
+from typing import AsyncIterator, Optional, Dict, List, Tuple
+from app.models.user import User, Profile, ProfileDeletion, GenderEnum
 from app.schemas.user import UserCreate, ProfileCreate, ProfileUpdate
 
+# 바뀌면 Profile 에 캐시된 사주를 다시 계산해야 하는 필드
+SAJU_FIELDS = ('birth_year', 'birth_month', 'birth_day', 'birth_hour', 'gender')
+# SAJU_FIELDS 로 미리 계산해 Profile 에 캐시하는 사주 컬럼
+SAJU_COLUMNS = ('saju_pillars', 'saju_sal', 'saju_penalty', 'saju_version')
+
 
 class UserRepository:
     def __init__(self, db: AsyncSession):
@@ -39,8 +45,18 @@ class UserRepository:
         return user
     
     async def delete(self, user: User):
+        # 프로필은 cascade 로 함께 지워지므로 다른 워커의 검색 행렬이 알 수 있게 기록을 남긴다
+        self.db.add(ProfileDeletion(user_id=user.id))
         await self.db.delete(user)
         await self.db.flush()
+    
+    async def get_nicknames(self, user_ids: List[int]) -> Dict[int, str]:
+        if not user_ids:
+            return {}
+        result = await self.db.execute(
+            select(User.id, User.nickname).where(User.id.in_(user_ids))
+        )
+        return {user_id: nickname for user_id, nickname in result.all()}
 
 
 class ProfileRepository:
@@ -51,20 +67,102 @@ class ProfileRepository:
         result = await self.db.execute(select(Profile).where(Profile.user_id == user_id))
         return result.scalar_one_or_none()
     
-    async def create(self, user_id: int, profile_data: ProfileCreate) -> Profile:
+    @staticmethod
+    def _saju_people_query():
+        return select(
+            Profile.user_id,
+            *[getattr(Profile, field) for field in SAJU_FIELDS],
+            Profile.saju_pillars, Profile.saju_sal, Profile.saju_version
+        ).where(*[getattr(Profile, field).isnot(None) for field in SAJU_FIELDS])
+    
+    async def get_saju_people(self) -> List[Tuple[int, Dict]]:
+        """궁합 검색 대상: 생년월일시와 성별이 모두 있는 프로필의 (user_id, saju_person)"""
+        result = await self.db.execute(self._saju_people_query())
+        return [(row.user_id, self.saju_person(row)) for row in result.all()]
+    
+    @staticmethod
+    def _changed_at():
+        # updated_at 은 처음 저장할 때는 비어 있으므로 created_at 으로 대신한다
+        return func.coalesce(Profile.updated_at, Profile.created_at)
+    
+    async def get_saju_watermark(self) -> Optional[datetime]:
+        """가장 최근 프로필 변경 또는 삭제 시각. 한 문장으로 읽어 두 값이 같은 시점을 본다."""
+        result = await self.db.execute(select(
+            select(func.max(self._changed_at())).scalar_subquery(),
+            select(func.max(ProfileDeletion.deleted_at)).scalar_subquery()
+        ))
+        changed_at, deleted_at = result.one()
+        return max((at for at in (changed_at, deleted_at) if at is not None), default=None)
+    
+    async def get_saju_people_changed_since(self, since: Optional[datetime]) -> List[Tuple[int, Optional[Dict]]]:
+        """since 이후 바뀐 프로필의 (user_id, saju_person). 생년월일시/성별이 빠진 프로필은 None"""
+        query = select(
+            Profile.user_id,
+            *[getattr(Profile, field) for field in SAJU_FIELDS],
+            Profile.saju_pillars, Profile.saju_sal, Profile.saju_version
+        )
+        if since is not None:
+            query = query.where(self._changed_at() >= since)
+        result = await self.db.execute(query)
+        return [
+            (row.user_id, None if any(getattr(row, field) is None for field in SAJU_FIELDS) else self.saju_person(row))
+            for row in result.all()
+        ]
+    
+    async def get_deleted_user_ids_since(self, since: Optional[datetime]) -> List[int]:
+        """since 이후 프로필이 삭제된 user_id"""
+        query = select(ProfileDeletion.user_id)
+        if since is not None:
+            query = query.where(ProfileDeletion.deleted_at >= since)
+        result = await self.db.execute(query)
+        return list(result.scalars().all())
+    
+    async def stream_saju_people(self, chunk_size: int = 5000) -> AsyncIterator[List[Dict]]:
+        """get_saju_people 를 chunk_size 명씩 서버 측 커서로 나눠 읽는다."""
+        result = await self.db.stream(
+            self._saju_people_query().execution_options(yield_per=chunk_size)
+        )
+        async for rows in result.partitions(chunk_size):
+            yield [self.saju_person(row) for row in rows]
+    
+    async def create(self, user_id: int, profile_data: ProfileCreate, saju: Optional[Dict] = None) -> Profile:
+        """saju: 미리 계산한 사주 컬럼 (SAJU_COLUMNS). 주어진 값만 저장한다."""
         profile = Profile(
             user_id=user_id,
-            **profile_data.model_dump(exclude_unset=True)
+            **profile_data.model_dump(exclude_unset=True),
+            **(saju or {})
         )
         self.db.add(profile)
         await self.db.flush()
         await self.db.refresh(profile)
         return profile
     
-    async def update(self, profile: Profile, profile_data: ProfileUpdate) -> Profile:
-        for field, value in profile_data.model_dump(exclude_unset=True).items():
+    async def update(self, profile: Profile, profile_data: ProfileUpdate, saju: Optional[Dict] = None) -> Profile:
+        """saju: 생년월일시/성별이 바뀌어 다시 계산한 사주 컬럼. None 이면 캐시된 값을 그대로 둔다."""
+        data = profile_data.model_dump(exclude_unset=True)
+        for field, value in data.items():
             setattr(profile, field, value)
+        for column, value in (saju or {}).items():
+            setattr(profile, column, value)
         
         await self.db.flush()
         await self.db.refresh(profile)
-        return profile
\ No newline at end of file
+        return profile
+    
+    @staticmethod
+    def engine_gender(profile: Profile) -> int:
+        return 1 if profile.gender == GenderEnum.MALE else 0
+    
+    @classmethod
+    def saju_person(cls, profile: Profile) -> Dict:
+        """SajuEngine.analyze_compatibility_cached 에 넘길 한 사람분 데이터"""
+        return {
+            'birth_year': profile.birth_year,
+            'birth_month': profile.birth_month,
+            'birth_day': profile.birth_day,
+            'birth_hour': profile.birth_hour,
+            'gender': cls.engine_gender(profile),
+            'saju_pillars': profile.saju_pillars,
+            'saju_sal': profile.saju_sal,
+            'saju_version': profile.saju_version
+        }
\ No newline at end of file
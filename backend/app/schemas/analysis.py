@@ -1,6 +1,6 @@
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, Field, model_validator
+from typing import Optional, Dict, Any, List, Union
+from datetime import date, datetime
 from app.models.analysis import AnalysisStatusEnum
 
 
@@ -22,6 +22,68 @@ class DirectAnalysisRequest(BaseModel):
     user2_birth_day: int
     user2_birth_hour: int = 12
 
+    # True 면 두 사람의 시진별 시각(+23시) 조합을 모두 계산해 점수 범위를 함께 돌려준다.
+    # 기본 결과는 위의 birth_hour 기준. 시각은 일주(23시)와 절입일의 연주/월주만 바꾸므로 대개 범위가 한 점수다
+    hour_uncertainty: bool = False
+
+
+class BulkAnalysisRow(BaseModel):
+    """대량 분석 스트림의 한 행 (NDJSON 한 줄 또는 CSV 한 행). 필드 이름은 DirectAnalysisRequest 와 같다."""
+    id: Optional[Union[str, int]] = None  # 결과 행에 그대로 돌려주는 호출자 측 식별자
+    user1_name: Optional[str] = None
+    user1_gender: int = Field(..., ge=0, le=1, description="0=female, 1=male")
+    user1_birth_year: int = Field(..., ge=1900, le=2100)
+    user1_birth_month: int = Field(..., ge=1, le=12)
+    user1_birth_day: int = Field(..., ge=1, le=31)
+    user1_birth_hour: int = Field(12, ge=0, le=23)
+
+    user2_name: Optional[str] = None
+    user2_gender: int = Field(..., ge=0, le=1, description="0=female, 1=male")
+    user2_birth_year: int = Field(..., ge=1900, le=2100)
+    user2_birth_month: int = Field(..., ge=1, le=12)
+    user2_birth_day: int = Field(..., ge=1, le=31)
+    user2_birth_hour: int = Field(12, ge=0, le=23)
+
+    @model_validator(mode='after')
+    def check_dates(self):
+        # 2월 30일 같은 날짜는 엔진이 오류 없이 계산해버리므로 여기서 거른다
+        for user in ('user1', 'user2'):
+            try:
+                date(
+                    getattr(self, f"{user}_birth_year"),
+                    getattr(self, f"{user}_birth_month"),
+                    getattr(self, f"{user}_birth_day")
+                )
+            except ValueError as e:
+                raise ValueError(f"{user}: {e}")
+        return self
+
+
+class GroupMember(BaseModel):
+    """그룹 분석의 한 사람. 범위 검사는 BulkAnalysisRow 와 같다."""
+    name: Optional[str] = None
+    gender: int = Field(..., ge=0, le=1, description="0=female, 1=male")
+    birth_year: int = Field(..., ge=1900, le=2100)
+    birth_month: int = Field(..., ge=1, le=12)
+    birth_day: int = Field(..., ge=1, le=31)
+    birth_hour: int = Field(12, ge=0, le=23)
+
+    @model_validator(mode='after')
+    def check_date(self):
+        # 2월 30일 같은 날짜는 엔진이 오류 없이 계산해버리므로 여기서 거른다
+        date(self.birth_year, self.birth_month, self.birth_day)
+        return self
+
+
+class GroupAnalysisRequest(BaseModel):
+    """여러 명의 모든 쌍 궁합을 한 번에 계산하기 위한 요청 스키마"""
+    members: List[GroupMember] = Field(..., min_length=2, max_length=300)
+
+
+class EngineReloadRequest(BaseModel):
+    bundle_path: Optional[str] = None  # 비워두면 현재 설정의 파일로 다시 로드
+    max_delta: Optional[float] = None  # golden 점수 변화 허용치
+
 
 class AnalysisRequestCreate(BaseModel):
     couple_id: int
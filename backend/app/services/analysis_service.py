@@ -1,12 +1,20 @@
+import base64
+from datetime import datetime
+from typing import List, Optional, Tuple
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import IntegrityError
 from fastapi import HTTPException, status
-from datetime import datetime
+from fastapi.encoders import jsonable_encoder
+
+from app.config import settings
+from app.utils.cache import cache
 
 from app.repositories.analysis_repository import AnalysisRepository
 from app.repositories.couple_repository import CoupleRepository
 from app.repositories.user_repository import ProfileRepository
 from app.models.analysis import AnalysisStatusEnum
-from app.ai.saju_engine import get_engine
+from app.ai.executor import get_engine_executor, EngineBusyError
+from app.services.analysis_worker import has_birth_info, input_hash, notify_analysis_workers
 
 
 class AnalysisService:
@@ -15,7 +23,7 @@ class AnalysisService:
         self.analysis_repo = AnalysisRepository(db)
         self.couple_repo = CoupleRepository(db)
         self.profile_repo = ProfileRepository(db)
-        self.engine = get_engine()
+        self.engine_executor = get_engine_executor()
     
     async def create_analysis_for_couple(self, couple_id: int, user_id: int) -> dict:
         couple = await self.couple_repo.get_by_id(couple_id)
@@ -40,83 +48,126 @@ class AnalysisService:
                 detail="Both users must have profiles"
             )
         
-        if not all([
-            profile1.birth_year, profile1.birth_month, profile1.birth_day, profile1.birth_hour,
-            profile2.birth_year, profile2.birth_month, profile2.birth_day, profile2.birth_hour
-        ]):
+        if not has_birth_info(profile1) or not has_birth_info(profile2):
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Both users must have complete birth information"
             )
         
-        request = await self.analysis_repo.create_request(couple_id)
-        request.status = AnalysisStatusEnum.PROCESSING
+        # 연속으로 누른 경우: 아직 처리 중인 요청이 있으면 그 요청을 돌려준다 (작업자는 처리 시점의 프로필을 읽는다)
+        active = await self.analysis_repo.get_active_request(couple_id)
+        if active:
+            return self._active_response(active)
         
-        try:
-            gender1 = 1 if profile1.gender == 'male' else 0
-            gender2 = 1 if profile2.gender == 'male' else 0
-            
-            analysis_result = self.engine.analyze_compatibility(
-                year1=profile1.birth_year,
-                month1=profile1.birth_month,
-                day1=profile1.birth_day,
-                hour1=profile1.birth_hour,
-                gender1=gender1,
-                year2=profile2.birth_year,
-                month2=profile2.birth_month,
-                day2=profile2.birth_day,
-                hour2=profile2.birth_hour,
-                gender2=gender2
-            )
-            
-            result = await self.analysis_repo.create_result(
-                request_id=request.id,
-                score=analysis_result['compatibility_score'],
-                saju_data_user1=analysis_result['saju_data_user1'],
-                saju_data_user2=analysis_result['saju_data_user2'],
-                detailed_scores=analysis_result['detailed_scores'],
-                interpretation=analysis_result['interpretation']
-            )
-            
-            request.status = AnalysisStatusEnum.COMPLETED
-            request.completed_at = datetime.utcnow()
-            
-            await self.db.commit()
-            
+        # 생년월일시/성별과 엔진 버전이 같으면 이전 결과를 그대로 돌려준다
+        existing = await self._find_existing_result(couple_id, profile1, profile2)
+        if existing:
             return {
-                'request_id': request.id,
-                'result_id': result.id,
-                'compatibility_score': result.compatibility_score,
-                'interpretation': result.interpretation,
-                'created_at': result.created_at
+                'request_id': existing.request_id,
+                'result_id': existing.id,
+                'status': AnalysisStatusEnum.COMPLETED,
+                'compatibility_score': existing.compatibility_score,
+                'created_at': existing.created_at,
+                'deduplicated': True
             }
-            
-        except Exception as e:
-            request.status = AnalysisStatusEnum.FAILED
+        
+        # 분석은 작업자가 나중에 처리한다. 요청은 바로 PENDING 으로 돌려주고 상태 API 로 확인한다
+        try:
+            request = await self.analysis_repo.create_request(couple_id)
             await self.db.commit()
+        except IntegrityError:
+            # 같은 커플의 요청이 동시에 들어와 다른 쪽이 먼저 저장했다 (커플당 처리 중 요청은 하나, 부분 유니크 인덱스)
+            await self.db.rollback()
+            active = await self.analysis_repo.get_active_request(couple_id)
+            if not active:
+                raise HTTPException(
+                    status_code=status.HTTP_409_CONFLICT,
+                    detail="Another analysis request for this couple was just processed, please retry"
+                )
+            return self._active_response(active)
+        notify_analysis_workers()
+        
+        return {
+            'request_id': request.id,
+            'status': request.status,
+            'created_at': request.created_at,
+            'deduplicated': False
+        }
+    
+    @staticmethod
+    def _active_response(active) -> dict:
+        return {
+            'request_id': active.id,
+            'status': active.status,
+            'created_at': active.created_at,
+            'deduplicated': True
+        }
+    
+    async def _find_existing_result(self, couple_id: int, profile1, profile2):
+        try:
+            engine_version, _ = await self.engine_executor.call('current_version')
+        except EngineBusyError:
+            # 버전을 확인할 수 없으면 새로 계산한다
+            return None
+        return await self.analysis_repo.find_result(
+            couple_id,
+            input_hash(ProfileRepository.saju_person(profile1), ProfileRepository.saju_person(profile2)),
+            engine_version
+        )
+    
+    async def get_request_status(self, request_id: int, user_id: int) -> dict:
+        row = await self.analysis_repo.get_request_status(request_id)
+        if not row:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Analysis request not found"
+            )
+        
+        request, result, user1_id, user2_id = row
+        if user_id not in [user1_id, user2_id]:
             raise HTTPException(
-                status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-                detail=f"Analysis failed: {str(e)}"
+                status_code=status.HTTP_403_FORBIDDEN,
+                detail="Access denied"
             )
+        
+        return {
+            'request_id': request.id,
+            'couple_id': request.couple_id,
+            'status': request.status,
+            'created_at': request.created_at,
+            'started_at': request.started_at,
+            'completed_at': request.completed_at,
+            'error': request.error_message,
+            'result': {
+                'id': result.id,
+                'compatibility_score': result.compatibility_score,
+                'percentile': (result.detailed_scores or {}).get('percentile'),
+                'top_percent': (result.detailed_scores or {}).get('top_percent'),
+                'interpretation': result.interpretation
+            } if result else None
+        }
     
     async def get_result_by_id(self, result_id: int, user_id: int) -> dict:
-        result = await self.analysis_repo.get_result_by_id(result_id)
-        if not result:
+        # 권한 확인은 조회 쿼리에서 하고, 캐시에는 확인을 통과한 (결과, 사용자) 조합만 담는다
+        cached = await _get_cached_result(result_id, user_id)
+        if cached is not None:
+            return cached
+        
+        row = await self.analysis_repo.get_result_for_user(result_id, user_id)
+        if not row:
             raise HTTPException(
                 status_code=status.HTTP_404_NOT_FOUND,
                 detail="Analysis result not found"
             )
         
-        request = await self.analysis_repo.get_request_by_id(result.request_id)
-        couple = await self.couple_repo.get_by_id(request.couple_id)
-        
-        if user_id not in [couple.user1_id, couple.user2_id]:
+        result, is_member = row
+        if not is_member:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
                 detail="Access denied"
             )
         
-        return {
+        response = {
             'id': result.id,
             'request_id': result.request_id,
             'compatibility_score': result.compatibility_score,
@@ -127,8 +178,16 @@ class AnalysisService:
             'certificate_image_url': result.certificate_image_url,
             'created_at': result.created_at
         }
+        await _cache_result(result_id, user_id, response)
+        return response
     
-    async def get_couple_history(self, couple_id: int, user_id: int) -> list:
+    async def get_couple_history(
+        self,
+        couple_id: int,
+        user_id: int,
+        limit: int = 20,
+        cursor: Optional[str] = None
+    ) -> dict:
         couple = await self.couple_repo.get_by_id(couple_id)
         if not couple:
             raise HTTPException(
@@ -142,21 +201,79 @@ class AnalysisService:
                 detail="Access denied"
             )
         
-        requests = await self.analysis_repo.get_requests_by_couple(couple_id)
-        
-        history = []
-        for req in requests:
-            result = await self.analysis_repo.get_result_by_request_id(req.id)
-            history.append({
-                'request_id': req.id,
-                'status': req.status,
-                'created_at': req.created_at,
-                'completed_at': req.completed_at,
-                'result': {
-                    'id': result.id,
-                    'compatibility_score': result.compatibility_score,
-                    'interpretation': result.interpretation
-                } if result else None
-            })
-        
-        return history
\ No newline at end of file
+        # 다음 페이지가 있는지 알기 위해 하나 더 읽는다
+        rows = await self.analysis_repo.get_history_page(couple_id, limit + 1, _decode_cursor(cursor))
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        return {
+            'items': [
+                {
+                    'request_id': row.request_id,
+                    'status': row.status,
+                    'created_at': row.created_at,
+                    'completed_at': row.completed_at,
+                    'result': {
+                        'id': row.result_id,
+                        'compatibility_score': row.compatibility_score,
+                        'interpretation': row.interpretation
+                    } if row.result_id else None
+                }
+                for row in rows
+            ],
+            'next_cursor': _encode_cursor(rows[-1].created_at, rows[-1].request_id) if has_more else None
+        }
+
+
+def _result_cache_key(result_id: int, user_id: int) -> str:
+    return f"analysis_result:{result_id}:{user_id}"
+
+
+async def _get_cached_result(result_id: int, user_id: int) -> Optional[dict]:
+    if settings.RESULT_CACHE_TTL <= 0:
+        return None
+    try:
+        return await cache.get(_result_cache_key(result_id, user_id))
+    except Exception as e:
+        # Redis 장애 시에는 DB 에서 읽는다
+        print(f"⚠ Warning: Result cache read failed: {e}")
+        return None
+
+
+async def _cache_result(result_id: int, user_id: int, value: dict):
+    if settings.RESULT_CACHE_TTL <= 0:
+        return
+    try:
+        await cache.set(_result_cache_key(result_id, user_id), jsonable_encoder(value), settings.RESULT_CACHE_TTL)
+    except Exception as e:
+        print(f"⚠ Warning: Result cache write failed: {e}")
+
+
+async def invalidate_result_cache(result_ids: List[int], user_ids: List[int]):
+    """결과가 지워질 때 (커플 연결 해제로 cascade 삭제 등) 구성원들의 캐시 항목을 지운다."""
+    if settings.RESULT_CACHE_TTL <= 0:
+        return
+    try:
+        for result_id in result_ids:
+            for user_id in user_ids:
+                await cache.delete(_result_cache_key(result_id, user_id))
+    except Exception as e:
+        # 지우지 못한 항목은 RESULT_CACHE_TTL 뒤 만료된다
+        print(f"⚠ Warning: Result cache invalidation failed: {e}")
+
+
+def _encode_cursor(created_at: datetime, request_id: int) -> str:
+    return base64.urlsafe_b64encode(f"{created_at.isoformat()}|{request_id}".encode()).decode()
+
+
+def _decode_cursor(cursor: Optional[str]) -> Optional[Tuple[datetime, int]]:
+    if not cursor:
+        return None
+    try:
+        created_at, request_id = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        return datetime.fromisoformat(created_at), int(request_id)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
@@ -0,0 +1,158 @@
+"""
+커플 궁합 분석 작업 큐
+
+POST /couple/{couple_id} 는 AnalysisRequest 를 PENDING 으로 저장만 하고,
+여기 작업자들이 SELECT ... FOR UPDATE SKIP LOCKED 로 요청을 나눠 가져가
+ANALYSIS_BATCH_SIZE 개씩 엔진 배치 한 번으로 계산해 결과를 저장한다.
+여러 서버 인스턴스의 작업자가 같은 테이블을 함께 처리해도 중복되지 않는다.
+"""
+import asyncio
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List
+
+from app.config import settings
+from app.database import AsyncSessionLocal
+from app.models.analysis import AnalysisStatusEnum
+from app.models.user import Profile
+from app.repositories.analysis_repository import AnalysisRepository
+from app.repositories.user_repository import ProfileRepository
+from app.ai.executor import get_engine_executor, EngineBusyError
+from app.ai.shadow import get_shadow_evaluator
+
+# 새 요청이 들어오면 폴링 간격을 기다리지 않고 작업자를 깨운다 (같은 프로세스 안에서만)
+_wakeup = asyncio.Event()
+
+
+def notify_analysis_workers():
+    _wakeup.set()
+
+
+def has_birth_info(profile: Profile) -> bool:
+    # birth_hour 0 (자시) 도 유효한 값이므로 None 만 확인한다
+    return profile is not None and all(
+        getattr(profile, field) is not None
+        for field in ('birth_year', 'birth_month', 'birth_day', 'birth_hour')
+    )
+
+
+def input_hash(person1: Dict, person2: Dict) -> str:
+    """결과를 정하는 입력(두 사람의 생년월일시, 성별)의 해시. 엔진 버전과 함께 중복 계산을 막는 키가 된다."""
+    fields = ('birth_year', 'birth_month', 'birth_day', 'birth_hour', 'gender')
+    key = json.dumps([[int(person[field]) for field in fields] for person in (person1, person2)])
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def result_row(request_id: int, analysis_result: dict, **kwargs) -> dict:
+    """SajuEngine 결과를 AnalysisRepository.create_result(s) 인자로 바꾼다."""
+    return {
+        **kwargs,
+        'request_id': request_id,
+        'score': analysis_result['compatibility_score'],
+        'saju_data_user1': analysis_result['saju_data_user1'],
+        'saju_data_user2': analysis_result['saju_data_user2'],
+        'detailed_scores': {
+            **analysis_result['detailed_scores'],
+            'percentile': analysis_result['percentile'],
+            'top_percent': analysis_result['top_percent']
+        },
+        'interpretation': analysis_result['interpretation']
+    }
+
+
+async def process_batch(batch_size: int) -> int:
+    """대기 중인 요청을 최대 batch_size 개 처리하고 가져간 요청 수를 돌려준다."""
+    async with AsyncSessionLocal() as db:
+        analysis_repo = AnalysisRepository(db)
+
+        claimed_at = datetime.now(timezone.utc)
+        stale_before = claimed_at - timedelta(seconds=settings.ANALYSIS_JOB_TIMEOUT)
+        requests = await analysis_repo.claim_pending(batch_size, stale_before, claimed_at)
+        # PROCESSING 으로 바꾼 것을 먼저 커밋해 행 잠금을 바로 푼다
+        await db.commit()
+        if not requests:
+            return 0
+
+        profiles = await analysis_repo.get_couple_profiles(list({request.couple_id for request in requests}))
+
+        ready, people1, people2 = [], [], []
+        for request in requests:
+            profile1, profile2 = profiles.get(request.couple_id, (None, None))
+            if not has_birth_info(profile1) or not has_birth_info(profile2):
+                request.status = AnalysisStatusEnum.FAILED
+                request.error_message = "Both users must have complete birth information"
+                continue
+            ready.append(request)
+            people1.append(ProfileRepository.saju_person(profile1))
+            people2.append(ProfileRepository.saju_person(profile2))
+
+        if ready:
+            try:
+                batch, _ = await get_engine_executor().call('analyze_compatibility_cached_batch', people1, people2)
+            except EngineBusyError:
+                # 엔진이 바쁘면 실패로 처리하지 않고 대기열로 되돌린다
+                for request in ready:
+                    request.status = AnalysisStatusEnum.PENDING
+                    request.started_at = None
+                await db.commit()
+                return 0
+            except Exception as e:
+                print(f"⚠ Warning: Analysis batch failed: {e}")
+                for request in ready:
+                    request.status = AnalysisStatusEnum.FAILED
+                    request.error_message = f"Analysis failed: {e}"
+            else:
+                # 처리하는 동안 시간이 초과되어 다른 작업자가 다시 가져간 요청은 그쪽에서 결과를 저장한다
+                completed = set(await analysis_repo.complete_claimed(
+                    [request.id for request in ready], claimed_at, datetime.now(timezone.utc)
+                ))
+                if len(completed) < len(ready):
+                    print(f"⚠ Warning: {len(ready) - len(completed)} analysis requests were re-claimed by another worker, skipping their results")
+                finished = [
+                    (request, person1, person2, analysis_result)
+                    for request, person1, person2, analysis_result in zip(ready, people1, people2, batch['results'])
+                    if request.id in completed
+                ]
+                await analysis_repo.create_results([
+                    result_row(
+                        request.id, analysis_result,
+                        input_hash=input_hash(person1, person2),
+                        engine_version=batch['version']
+                    )
+                    for request, person1, person2, analysis_result in finished
+                ])
+                shadow = get_shadow_evaluator()
+                for request, person1, person2, analysis_result in finished:
+                    shadow.submit('analyze_compatibility_cached', analysis_result, person1, person2)
+
+        await db.commit()
+        return len(requests)
+
+
+async def run_analysis_worker(worker_id: int):
+    while True:
+        # 처리 중에 들어온 알림은 남겨두도록 처리 전에 비운다
+        _wakeup.clear()
+        try:
+            processed = await process_batch(settings.ANALYSIS_BATCH_SIZE)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # 커밋되지 못한 요청은 ANALYSIS_JOB_TIMEOUT 뒤 다시 가져간다
+            print(f"⚠ Warning: Analysis worker {worker_id} failed: {e}")
+            processed = 0
+
+        if processed:
+            continue
+        try:
+            await asyncio.wait_for(_wakeup.wait(), settings.ANALYSIS_POLL_INTERVAL)
+        except asyncio.TimeoutError:
+            pass
+
+
+def start_analysis_workers() -> List[asyncio.Task]:
+    tasks = [asyncio.create_task(run_analysis_worker(i)) for i in range(settings.ANALYSIS_WORKERS)]
+    if tasks:
+        print(f"✓ Started {len(tasks)} analysis workers (batch size {settings.ANALYSIS_BATCH_SIZE})")
+    return tasks
@@ -9,6 +9,7 @@ from app.schemas.user import UserCreate
 from app.utils.security import verify_password, get_password_hash, create_access_token, create_refresh_token, verify_token
 from app.utils.validators import validate_username, validate_password, validate_nickname
 from app.models.user import User, Profile
+from app.services.user_service import compute_saju_columns
 
 
 class AuthService:
@@ -56,7 +57,7 @@ class AuthService:
         
         from app.schemas.user import ProfileCreate
         empty_profile = ProfileCreate()
-        await self.profile_repo.create(user.id, empty_profile)
+        await self.profile_repo.create(user.id, empty_profile, await compute_saju_columns(empty_profile.model_dump()))
         
         await self.db.commit()
         
@@ -0,0 +1,167 @@
+"""
+대량 궁합 분석 스트림
+
+요청 본문(NDJSON 또는 CSV)을 도착하는 대로 줄 단위로 읽어 BULK_CHUNK_SIZE 행씩
+엔진 배치 한 번으로 계산하고, 결과를 입력 순서대로 NDJSON 으로 바로 내보낸다.
+한 번에 들고 있는 것은 청크 하나뿐이라 입력 크기와 관계없이 메모리 사용량이 일정하고,
+클라이언트가 응답을 읽지 않으면 본문도 더 읽지 않는다.
+잘못된 행은 스트림을 끊지 않고 그 행 자리에 error 로 알려준다.
+"""
+import asyncio
+import csv
+import json
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+from pydantic import ValidationError
+
+from app.config import settings
+from app.schemas.analysis import BulkAnalysisRow
+from app.ai.executor import get_engine_executor, EngineBusyError
+
+BIRTH_FIELDS = ('birth_year', 'birth_month', 'birth_day', 'birth_hour', 'gender')
+ENGINE_BUSY_RETRIES = 5  # 엔진 대기열이 가득 차면 0.1, 0.2, 0.4 ... 초 기다렸다 다시 시도
+
+
+async def iter_lines(body: AsyncIterator[bytes], max_line_bytes: int) -> AsyncIterator[Optional[bytes]]:
+    """본문을 줄 단위로 나눈다. max_line_bytes 를 넘는 줄은 끝까지 버리고 그 자리에 None 을 돌려준다."""
+    buffer = b''
+    overflow = False
+    async for chunk in body:
+        lines = (buffer + chunk).split(b'\n')
+        buffer = lines.pop()
+        for line in lines:
+            if overflow or len(line) > max_line_bytes:
+                overflow = False
+                yield None
+            else:
+                yield line
+        if len(buffer) > max_line_bytes:
+            # 줄 끝이 나올 때까지 쌓지 않고 버린다
+            overflow = True
+            buffer = b''
+
+    if overflow:
+        yield None
+    elif buffer:
+        yield buffer
+
+
+def _validation_message(e: ValidationError) -> str:
+    return '; '.join(
+        f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+        for error in e.errors()
+    )
+
+
+async def _call_engine(rows: List[BulkAnalysisRow]) -> Dict:
+    columns = [
+        [getattr(row, f"{user}_{field}") for row in rows]
+        for user in ('user1', 'user2')
+        for field in BIRTH_FIELDS
+    ]
+    for attempt in range(ENGINE_BUSY_RETRIES + 1):
+        try:
+            batch, _ = await get_engine_executor().call('analyze_compatibility_rows', *columns)
+            return batch
+        except EngineBusyError:
+            # 대량 요청은 지연보다 처리량이 중요하므로 바로 실패시키지 않는다
+            if attempt == ENGINE_BUSY_RETRIES:
+                raise
+            await asyncio.sleep(0.1 * 2 ** attempt)
+
+
+async def stream_bulk_analysis(body: AsyncIterator[bytes], csv_input: bool) -> AsyncIterator[bytes]:
+    """
+    입력 한 행마다 결과 한 줄 ({'row', 'id', 이름, 점수...} 또는 {'row', 'id', 'error'}) 을 내보내고,
+    마지막에 {'summary': {...}} 한 줄로 끝난다. row 는 빈 줄과 CSV 헤더를 뺀 1부터의 행 번호.
+    """
+    chunk_size = max(1, settings.BULK_CHUNK_SIZE)
+    entries: List[Dict[str, Any]] = []
+    valid_entries: List[Dict[str, Any]] = []
+    valid_rows: List[BulkAnalysisRow] = []
+    summary = {'rows': 0, 'succeeded': 0, 'failed': 0, 'engine_versions': []}
+    header: Optional[List[str]] = None
+
+    async def flush() -> bytes:
+        if valid_rows:
+            try:
+                batch = await _call_engine(valid_rows)
+            except EngineBusyError as e:
+                for entry in valid_entries:
+                    entry['error'] = str(e)
+            except Exception as e:
+                print(f"⚠ Warning: Bulk analysis chunk failed: {e}")
+                for entry in valid_entries:
+                    entry['error'] = f"Analysis failed: {e}"
+            else:
+                for entry, result in zip(valid_entries, batch['results']):
+                    entry.update(result)
+                if batch['version'] not in summary['engine_versions']:
+                    summary['engine_versions'].append(batch['version'])
+
+        failed = sum('error' in entry for entry in entries)
+        summary['failed'] += failed
+        summary['succeeded'] += len(entries) - failed
+        output = ''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries).encode()
+        entries.clear()
+        valid_entries.clear()
+        valid_rows.clear()
+        return output
+
+    async for line in iter_lines(body, settings.BULK_MAX_LINE_BYTES):
+        record: Any = None
+        error = None
+        if line is None:
+            error = f"Line exceeds {settings.BULK_MAX_LINE_BYTES} bytes"
+        else:
+            try:
+                text = line.decode('utf-8').strip()
+            except UnicodeDecodeError:
+                text, error = None, "Line is not valid UTF-8"
+            if text is not None:
+                # 첫 줄의 BOM (엑셀에서 저장한 CSV 등)
+                text = text.lstrip('\ufeff')
+                if not text:
+                    continue
+
+                if csv_input and header is None:
+                    header = [name.strip() for name in next(csv.reader([text]))]
+                    continue
+
+                if csv_input:
+                    values = next(csv.reader([text]))
+                    if len(values) != len(header):
+                        error = f"Expected {len(header)} columns, got {len(values)}"
+                    else:
+                        # 빈 칸은 값이 없는 것으로 본다 (birth_hour 기본값 등)
+                        record = {name: value for name, value in zip(header, values) if value != ''}
+                else:
+                    try:
+                        record = json.loads(text)
+                    except json.JSONDecodeError as e:
+                        error = f"Invalid JSON: {e}"
+                    else:
+                        if not isinstance(record, dict):
+                            record, error = None, "Each line must be a JSON object"
+
+        summary['rows'] += 1
+        entry = {'row': summary['rows'], 'id': record.get('id') if isinstance(record, dict) else None}
+        if error is None:
+            try:
+                row = BulkAnalysisRow.model_validate(record)
+            except ValidationError as e:
+                error = _validation_message(e)
+            else:
+                entry.update(user1_name=row.user1_name, user2_name=row.user2_name)
+                valid_entries.append(entry)
+                valid_rows.append(row)
+        if error is not None:
+            entry['error'] = error
+        entries.append(entry)
+
+        if len(entries) >= chunk_size:
+            yield await flush()
+
+    if entries:
+        yield await flush()
+    yield (json.dumps({'summary': summary}, ensure_ascii=False) + '\n').encode()
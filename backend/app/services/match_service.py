@@ -0,0 +1,129 @@
+import asyncio
+import time
+from datetime import timedelta
+from sqlalchemy.ext.asyncio import AsyncSession
+from fastapi import HTTPException, status
+
+from app.config import settings
+from app.repositories.user_repository import UserRepository, ProfileRepository, SAJU_FIELDS
+from app.models.user import Profile
+from app.ai.executor import get_engine_executor, EngineBusyError
+from app.ai.profile_matrix import get_profile_matrix
+
+# 마지막 변경 시각보다 이만큼 앞에서부터 다시 읽는다 (먼저 시작해 늦게 커밋된 트랜잭션의 updated_at)
+SYNC_OVERLAP = timedelta(seconds=60)
+
+_load_lock = asyncio.Lock()
+
+
+class MatchService:
+    def __init__(self, db: AsyncSession):
+        self.db = db
+        self.user_repo = UserRepository(db)
+        self.profile_repo = ProfileRepository(db)
+        self.engine_executor = get_engine_executor()
+        self.matrix = get_profile_matrix()
+
+    async def ensure_loaded(self):
+        """
+        처음 검색할 때 전체 프로필을 한 번 읽어 행렬을 만든다.
+        이후에는 MATCH_INDEX_REFRESH_INTERVAL 마다 다른 워커에서 바뀐 프로필을 반영한다.
+        """
+        if self.matrix.loaded and not self._refresh_due():
+            return
+        async with _load_lock:
+            if not self.matrix.loaded:
+                await self._load()
+            elif self._refresh_due():
+                await self._refresh()
+
+    def _refresh_due(self) -> bool:
+        return time.monotonic() - self.matrix.checked_at >= settings.MATCH_INDEX_REFRESH_INTERVAL
+
+    async def _load(self):
+        # 읽기 전에 변경 시각을 잡아야 읽는 동안 바뀐 프로필을 다음 갱신에서 놓치지 않는다
+        changed_at = await self.profile_repo.get_saju_watermark()
+        people = await self.profile_repo.get_saju_people()
+        user_ids = [user_id for user_id, _ in people]
+        persons = [person for _, person in people]
+
+        pillars, penalty = await self._call('resolve_people', persons)
+        self.matrix.replace(user_ids, pillars, [person['gender'] for person in persons], penalty)
+        self.matrix.mark_synced(changed_at)
+        print(f"✓ Loaded {len(user_ids)} profiles into match index")
+
+    async def _refresh(self):
+        changed_at = await self.profile_repo.get_saju_watermark()
+        since = self.matrix.synced_at - SYNC_OVERLAP if self.matrix.synced_at else None
+        changes = await self.profile_repo.get_saju_people_changed_since(since)
+        deleted = await self.profile_repo.get_deleted_user_ids_since(since)
+
+        # 삭제를 먼저 반영해야 같은 구간에 다시 저장된 행이 남는다
+        for user_id in deleted:
+            self.matrix.remove(user_id)
+
+        complete = [(user_id, person) for user_id, person in changes if person is not None]
+        if complete:
+            pillars, penalty = await self._call('resolve_people', [person for _, person in complete])
+            for (user_id, person), row_pillars, row_penalty in zip(complete, pillars.tolist(), penalty.tolist()):
+                self.matrix.upsert(user_id, row_pillars, person['gender'], row_penalty)
+        for user_id, person in changes:
+            if person is None:
+                self.matrix.remove(user_id)
+
+        self.matrix.mark_synced(changed_at)
+
+    async def find_matches(self, user_id: int, k: int) -> dict:
+        profile = await self.profile_repo.get_by_user_id(user_id)
+        if not profile or any(getattr(profile, field) is None for field in SAJU_FIELDS):
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST,
+                detail="Complete birth information and gender are required"
+            )
+
+        await self.ensure_loaded()
+
+        person = ProfileRepository.saju_person(profile)
+        scores = await self._call('match_scores', person)
+        # 행렬은 이 프로세스에만 있으므로 엔진 풀(프로세스 모드면 통째로 pickle 된다) 대신 여기서 고른다
+        loop = asyncio.get_running_loop()
+        matches = await loop.run_in_executor(
+            None, lambda: self.matrix.top_matches(scores, k, gender=1 - person['gender'], exclude_user_id=user_id)
+        )
+
+        nicknames = await self.user_repo.get_nicknames([match['user_id'] for match in matches])
+        for match in matches:
+            match['nickname'] = nicknames.get(match['user_id'])
+
+        return {
+            'user_id': user_id,
+            'candidates': len(self.matrix),
+            'matches': matches
+        }
+
+    async def _call(self, method: str, *args, **kwargs):
+        try:
+            result, _ = await self.engine_executor.call(method, *args, **kwargs)
+            return result
+        except EngineBusyError as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail=str(e)
+            )
+
+
+def sync_profile_matrix(profile: Profile):
+    """
+    프로필 저장 후 호출. 검색 행렬이 이미 만들어져 있으면 해당 행만 바로 고친다.
+    다른 워커의 행렬은 MatchService.ensure_loaded 의 주기적 갱신으로 따라온다.
+    """
+    matrix = get_profile_matrix()
+    if not matrix.loaded:
+        return
+    if profile.saju_pillars and profile.saju_penalty is not None:
+        matrix.upsert(
+            profile.user_id, profile.saju_pillars,
+            ProfileRepository.engine_gender(profile), profile.saju_penalty
+        )
+    else:
+        matrix.remove(profile.user_id)
@@ -1,11 +1,44 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Optional
+from typing import Optional, Dict
 from fastapi import HTTPException, status
 
-from app.repositories.user_repository import UserRepository, ProfileRepository
+from app.repositories.user_repository import UserRepository, ProfileRepository, SAJU_FIELDS, SAJU_COLUMNS
 from app.repositories.couple_repository import CoupleRepository
+from app.repositories.analysis_repository import AnalysisRepository
 from app.schemas.user import UserUpdate, UserWithProfile, ProfileUpdate
-from app.models.user import User
+from app.models.user import User, GenderEnum
+from app.ai.executor import get_engine_executor
+from app.services.match_service import sync_profile_matrix
+from app.services.analysis_service import invalidate_result_cache
+
+
+async def compute_saju_columns(fields: Dict) -> Dict:
+    """
+    생년월일시/성별(SAJU_FIELDS)로 사주(기둥, 살 점수)를 계산해 Profile 의 saju_* 컬럼 값으로 돌려준다.
+    필드가 빠졌거나 계산하지 못하면 모두 None.
+    """
+    saju = dict.fromkeys(SAJU_COLUMNS)
+    if any(fields.get(field) is None for field in SAJU_FIELDS):
+        return saju
+    
+    try:
+        person, _ = await get_engine_executor().call(
+            'analyze_person',
+            fields['birth_year'], fields['birth_month'], fields['birth_day'], fields['birth_hour'],
+            1 if fields['gender'] == GenderEnum.MALE else 0
+        )
+    except Exception as e:
+        # 저장하지 못해도 궁합 계산 시 다시 계산하므로 프로필 저장은 막지 않는다
+        print(f"⚠ Warning: Could not precompute saju: {e}")
+        return saju
+    
+    saju.update(
+        saju_pillars=person['pillars'],
+        saju_sal=person['sal'],
+        saju_penalty=person['penalty'],
+        saju_version=person['version']
+    )
+    return saju
 
 
 class UserService:
@@ -80,8 +113,17 @@ class UserService:
                 detail="Profile not found"
             )
         
-        await self.profile_repo.update(profile, data)
+        changes = data.model_dump(exclude_unset=True)
+        saju = None
+        if set(SAJU_FIELDS) & changes.keys():
+            saju = await compute_saju_columns({
+                field: changes[field] if field in changes else getattr(profile, field)
+                for field in SAJU_FIELDS
+            })
+        
+        await self.profile_repo.update(profile, data, saju)
         await self.db.commit()
+        sync_profile_matrix(profile)
         
         return await self.get_user_with_profile(user_id)
     
@@ -141,7 +183,12 @@ class UserService:
                 detail="No partner connection found"
             )
         
+        # 분석 요청/결과는 커플과 함께 cascade 삭제되므로 캐시된 결과도 지운다
+        result_ids = await AnalysisRepository(self.db).get_result_ids_by_couple(couple.id)
+        user_ids = [couple.user1_id, couple.user2_id]
+        
         await self.couple_repo.delete(couple)
         await self.db.commit()
+        await invalidate_result_cache(result_ids, user_ids)
         
         return {"message": "Successfully disconnected from partner"}
\ No newline at end of file
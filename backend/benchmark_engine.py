@@ -0,0 +1,325 @@
+"""
+SajuEngine micro-benchmarks with a stored baseline.
+
+Measures pillar lookup, sky/earth scoring, the sal rules, single and cached
+analyze_compatibility, the batch sizes the API uses (micro-batch, hour
+uncertainty, group matrix) and the cold start (engine construction time and
+peak RSS, measured in a fresh interpreter).
+
+    python benchmark_engine.py --output bench.json
+    python benchmark_engine.py --save-baseline               # record benchmarks/engine_baseline.json
+    python benchmark_engine.py --compare --threshold 0.25    # exit 1 on >25% regressions
+
+Timings are the best of --repeat runs (per operation, or per row for batch
+benchmarks), which is the least noisy statistic on a shared machine.
+Baselines are only comparable on the same hardware and Python/NumPy versions;
+the stored file records both so mismatches are reported.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+
+from app.config import settings
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmarks', 'engine_baseline.json')
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        # Windows
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is KiB on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def cold_start_probe(bundle_path):
+    """Runs in a fresh interpreter: import + construct the engine once and report time and memory."""
+    started = time.perf_counter()
+    from app.ai.saju_engine import SajuEngine
+    imported = time.perf_counter()
+    rss_before = peak_rss_mb()
+
+    engine = SajuEngine(bundle_path)
+    constructed = time.perf_counter()
+    engine.analyze_compatibility(1990, 5, 5, 12, 1, 1992, 7, 7, 7, 0)
+    first_call = time.perf_counter()
+
+    print(json.dumps({
+        'import_s': round(imported - started, 4),
+        'construct_s': round(constructed - imported, 4),
+        'first_call_s': round(first_call - constructed, 4),
+        'total_s': round(first_call - started, 4),
+        'peak_rss_before_engine_mb': rss_before,
+        'peak_rss_mb': peak_rss_mb()
+    }))
+
+
+def measure_cold_start(bundle_path, runs):
+    command = [sys.executable, os.path.abspath(__file__), '--cold-start-probe']
+    if bundle_path is not None:
+        command += ['--bundle', bundle_path]
+
+    samples = []
+    for _ in range(runs):
+        output = subprocess.run(command, check=True, capture_output=True, text=True).stdout
+        samples.append(json.loads(output.strip().splitlines()[-1]))
+
+    # Best run for times, worst run for memory
+    result = {key: min(sample[key] for sample in samples) for key in samples[0] if key.endswith('_s')}
+    for key in ('peak_rss_before_engine_mb', 'peak_rss_mb'):
+        values = [sample[key] for sample in samples if sample[key] is not None]
+        result[key] = max(values) if values else None
+    return result
+
+
+def measure(fn, rows=1, repeat=5, min_time=0.1):
+    """Best and median seconds per row. The loop count is calibrated so one run takes at least min_time."""
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2 if elapsed == 0 else max(2, min(10, int(min_time / elapsed) + 1))
+
+    runs = [elapsed]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            fn()
+        runs.append(time.perf_counter() - started)
+
+    per_row = np.array(runs) / (loops * rows)
+    return {
+        'best_us': round(float(per_row.min()) * 1e6, 4),
+        'median_us': round(float(np.median(per_row)) * 1e6, 4),
+        'rows_per_sec': round(1 / float(per_row.min())),
+        'rows': rows,
+        'loops': loops
+    }
+
+
+def random_births(rng, n):
+    year = rng.integers(1950, 2010, n)
+    month = rng.integers(1, 13, n)
+    day = rng.integers(1, 29, n)
+    hour = rng.integers(0, 24, n)
+    gender = rng.integers(0, 2, n)
+    return year, month, day, hour, gender
+
+
+def benchmarks(engine, rng):
+    """(name, function, rows per call)"""
+    from app.ai.result_cache import AnalysisCache
+
+    year, month, day, hour, gender = random_births(rng, 256)
+    births = list(zip(year.tolist(), month.tolist(), day.tolist(), hour.tolist(), gender.tolist()))
+    tokens = [engine._get_saju_pillars(y, m, d, h) for y, m, d, h, _ in births]
+    cursor = {'i': 0}
+
+    def next_index():
+        cursor['i'] = (cursor['i'] + 1) % len(births)
+        return cursor['i']
+
+    def pillars_single():
+        y, m, d, h, _ = births[next_index()]
+        engine._get_saju_pillars(y, m, d, h)
+
+    def sky_score():
+        i = next_index()
+        engine.calculate_sky_score(tokens[i][0], tokens[-1 - i][0])
+
+    def earth_score():
+        i = next_index()
+        engine.calculate_earth_score(tokens[i][1], tokens[-1 - i][1])
+
+    def detailed_rules():
+        i = next_index()
+        engine.calculate_detailed_compatibility(tokens[i], tokens[-1 - i], births[i][4], births[-1 - i][4], 80.0)
+
+    def analyze_uncached():
+        i = next_index()
+        engine.analyze_compatibility(*births[i], *births[-1 - i])
+
+    uncached, cached = engine.result_cache, AnalysisCache(1024)
+
+    def analyze_cached():
+        engine.result_cache = cached
+        try:
+            engine.analyze_compatibility(*births[0], *births[-1])
+        finally:
+            engine.result_cache = uncached
+
+    items = [
+        ('pillars.single', pillars_single, 1),
+        ('score.sky', sky_score, 1),
+        ('score.earth', earth_score, 1),
+        ('rules.detailed', detailed_rules, 1),
+        ('analyze.single', analyze_uncached, 1),
+        ('analyze.cached', analyze_cached, 1),
+    ]
+
+    for size in (1024, 65536):
+        columns = random_births(rng, size)[:4]
+        items.append((f"pillars.batch_{size}", lambda columns=columns: engine._get_saju_pillars_batch(*columns), size))
+
+    # Micro-batch size, a 144-pair batch (about one hour-uncertainty matrix) and larger batch jobs
+    for size in sorted({1, settings.MICRO_BATCH_MAX_SIZE, 144, 1024, 16384}):
+        columns = random_births(rng, size) + random_births(rng, size)
+        items.append((f"analyze.batch_{size}", lambda columns=columns: engine.analyze_compatibility_batch(*columns), size))
+
+    items.append((
+        'analyze.hour_uncertainty',
+        lambda: engine.analyze_hour_uncertainty(1990, 5, 5, 12, 1, 1992, 7, 7, 12, 0),
+        1
+    ))
+    group = random_births(rng, 300)
+    # One N x N group analysis (300 members, the API limit)
+    items.append(('analyze.group_300', lambda: engine.analyze_group(*group), 1))
+    return items
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=os.path.dirname(os.path.abspath(__file__)),
+            check=True, capture_output=True, text=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(bundle_path, repeat, min_time, cold_start_runs, only=None):
+    from app.ai.result_cache import AnalysisCache
+    from app.ai.saju_engine import SajuEngine
+
+    engine = SajuEngine(bundle_path)
+    # Measure computation, not cache hits (analyze.cached measures those explicitly)
+    engine.result_cache = AnalysisCache(0)
+
+    results = {}
+    for name, fn, rows in benchmarks(engine, np.random.default_rng(0)):
+        if only and not any(name.startswith(prefix) for prefix in only):
+            continue
+        results[name] = measure(fn, rows, repeat, min_time)
+        print(f"  {name:<28} {results[name]['best_us']:>12.3f} us/row  {results[name]['rows_per_sec']:>12,} rows/s")
+
+    cold_start = None
+    if cold_start_runs > 0:
+        cold_start = measure_cold_start(bundle_path, cold_start_runs)
+        print(f"  {'cold_start':<28} {cold_start['total_s']:>12.3f} s        peak RSS {cold_start['peak_rss_mb']} MB")
+
+    return {
+        'environment': {
+            'recorded_at': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'platform': platform.platform(),
+            'python': platform.python_version(),
+            'numpy': np.__version__,
+            'machine': platform.machine(),
+            'processor': platform.processor(),
+            'cpus': os.cpu_count(),
+            'backend': engine.backend,
+            'use_score_tables': engine.use_score_tables,
+            'bundle': bool(engine.bundle_info)
+        },
+        'engine_version': engine.version,
+        'benchmarks': results,
+        'cold_start': cold_start
+    }
+
+
+def compare(current, baseline, threshold):
+    """Metrics that got slower/larger than baseline * (1 + threshold)."""
+    recorded = baseline['environment']
+    print(f"  baseline: {recorded.get('recorded_at')} at {recorded.get('commit')} on {recorded.get('platform')}, "
+          f"{recorded.get('cpus')} CPUs, Python {recorded.get('python')}, NumPy {recorded.get('numpy')}, {recorded.get('backend')} backend")
+    for key in ('python', 'numpy', 'machine', 'cpus', 'backend'):
+        if current['environment'].get(key) != baseline['environment'].get(key):
+            print(f"⚠ Environment differs from baseline ({key}: {baseline['environment'].get(key)} -> {current['environment'].get(key)})")
+
+    metrics = []
+    for name, result in current['benchmarks'].items():
+        if name in baseline['benchmarks']:
+            metrics.append((name, baseline['benchmarks'][name]['best_us'], result['best_us'], 'us/row'))
+    if current.get('cold_start') and baseline.get('cold_start'):
+        for key, unit in (('construct_s', 's'), ('total_s', 's'), ('peak_rss_mb', 'MB')):
+            if current['cold_start'].get(key) is not None and baseline['cold_start'].get(key) is not None:
+                metrics.append((f"cold_start.{key}", baseline['cold_start'][key], current['cold_start'][key], unit))
+
+    regressions = []
+    print(f"\n  {'metric':<28} {'baseline':>12} {'current':>12} {'change':>9}")
+    for name, before, after, unit in metrics:
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold
+        mark = '❌' if regressed else ' '
+        print(f"{mark} {name:<28} {before:>12.3f} {after:>12.3f} {change:>+8.1%}  {unit}")
+        if regressed:
+            regressions.append({'metric': name, 'baseline': before, 'current': after, 'change': round(change, 4)})
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bundle', default=None, help='Engine bundle to benchmark (default: ENGINE_BUNDLE_PATH)')
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.1, help='Minimum seconds per timed run')
+    parser.add_argument('--cold-start-runs', type=int, default=3, help='Fresh interpreters for the cold start (0 to skip)')
+    parser.add_argument('--only', nargs='*', help='Benchmark name prefixes to run, e.g. analyze.batch pillars')
+    parser.add_argument('--output', default=None, help='Write results as JSON to this path')
+    parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+    parser.add_argument('--save-baseline', action='store_true', help='Store these results as the baseline')
+    parser.add_argument('--compare', action='store_true', help='Compare against the baseline and fail on regressions')
+    parser.add_argument('--threshold', type=float, default=0.25, help='Allowed slowdown/growth ratio before failing')
+    parser.add_argument('--cold-start-probe', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.cold_start_probe:
+        cold_start_probe(args.bundle)
+        return
+
+    print("Benchmarking SajuEngine")
+    current = run(args.bundle, args.repeat, args.min_time, args.cold_start_runs, args.only)
+
+    regressions = []
+    if args.compare:
+        if not os.path.exists(args.baseline):
+            print(f"❌ Baseline not found: {args.baseline} (run with --save-baseline first)")
+            raise SystemExit(2)
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = compare(current, baseline, args.threshold)
+        current['comparison'] = {'baseline': args.baseline, 'threshold': args.threshold, 'regressions': regressions}
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"\n✓ Results written to {args.output}")
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w') as f:
+            json.dump(current, f, indent=2)
+        print(f"✓ Baseline saved to {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} regression(s) over {args.threshold:.0%}")
+        raise SystemExit(1)
+    if args.compare:
+        print(f"\n✅ No regressions over {args.threshold:.0%}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""
+Build the compiled SajuEngine bundle from the .h5 models and cal.csv.
+
+The bundle holds the model weights, precomputed sky/earth score tables,
+the solar-term index and the rule tables in one checksummed binary file
+that SajuEngine memory-maps at startup (ENGINE_BUNDLE_PATH).
+"""
+import argparse
+import hashlib
+import os
+from datetime import datetime, timezone
+
+from app.config import settings
+
+
+def file_sha256(path):
+    """sha256 of a source file, recorded in the bundle metadata"""
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_bundle(output_path):
+    """Load the engine from source files with the numpy backend and export it"""
+    # Bundles store raw weights, so the source engine must not go through Keras
+    settings.ENGINE_BACKEND = 'numpy'
+
+    from app.ai.saju_engine import SajuEngine
+    engine = SajuEngine(bundle_path='')
+
+    metadata = {
+        'built_at': datetime.now(timezone.utc).isoformat(),
+        'sources': {
+            'sky_model': {'path': settings.SKY_MODEL_PATH, 'sha256': file_sha256(settings.SKY_MODEL_PATH)},
+            'earth_model': {'path': settings.EARTH_MODEL_PATH, 'sha256': file_sha256(settings.EARTH_MODEL_PATH)},
+            'calendar': {'path': settings.CALENDAR_FILE_PATH, 'sha256': file_sha256(settings.CALENDAR_FILE_PATH)},
+        },
+        'rules': [rule['name'] for rule in engine.rules.rules],
+        'weights': engine.WEIGHTS,
+    }
+
+    checksum = engine.export_bundle(output_path, metadata)
+    print(f"✓ Saved to: {output_path}")
+    print(f"  Size: {os.path.getsize(output_path)} bytes")
+    print(f"  Checksum: {checksum}")
+    return checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--output',
+        default=os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models', 'engine.bundle')
+    )
+    args = parser.parse_args()
+
+    build_bundle(args.output)
+
+    print(f"\nUpdate your .env file:")
+    print(f"  ENGINE_BUNDLE_PATH={args.output}")
+
+
+if __name__ == '__main__':
+    main()
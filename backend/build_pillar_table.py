@@ -0,0 +1,44 @@
+"""
+Regenerate the birth-datetime -> pillar lookup table (PILLAR_TABLE_PATH).
+
+SajuEngine also regenerates the table at startup when cal.csv or the pillar
+formula has changed; run this after updating the calendar data so the first
+server start does not pay for it.
+"""
+import argparse
+import os
+
+from app.config import settings
+
+
+def build_table(output_path):
+    from app.ai.pillar_table import PillarTable, source_hash
+    from app.ai.saju_calendar import SolarTermIndex
+    from app.ai.saju_engine import SajuEngine
+
+    solar_terms = SolarTermIndex.from_csv(settings.CALENDAR_FILE_PATH)
+
+    # Pillars do not depend on the models, so skip loading them
+    engine = SajuEngine.__new__(SajuEngine)
+    engine.solar_terms = solar_terms
+
+    table = PillarTable.build(engine._compute_saju_pillars_batch, source_hash(solar_terms))
+    checksum = table.save(output_path)
+
+    print(f"✓ Saved to: {output_path}")
+    print(f"  Shape: {table.table.shape}")
+    print(f"  Size: {os.path.getsize(output_path)} bytes")
+    print(f"  Checksum: {checksum}")
+    return checksum
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', default=settings.PILLAR_TABLE_PATH)
+    args = parser.parse_args()
+
+    build_table(args.output)
+
+
+if __name__ == '__main__':
+    main()
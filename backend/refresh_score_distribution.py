@@ -0,0 +1,77 @@
+"""
+Build and publish the compatibility score distribution (SCORE_DISTRIBUTION_PATH).
+
+This script is the only writer of the file: server workers just read it.
+When it is missing or was built for another engine version, each worker
+falls back to an in-memory distribution over all pillar/gender
+combinations. The file is written to a temporary file and renamed into
+place, so a worker that is starting or reloading sees either the old or
+the new distribution.
+
+By default profiles are read in one streaming pass and reduced to a
+(year pillar code, sal penalty) histogram, so memory does not grow with
+the number of profiles. --combinations publishes the all-combinations
+distribution instead (no database needed), e.g. as a deploy step after
+the models change. Run it with the same models/bundle as the server,
+then reload the engine (POST /api/analysis/engine/reload) or restart to
+pick up the new file.
+"""
+import argparse
+import asyncio
+
+from app.config import settings
+
+
+async def refresh(output_path, chunk_size, min_population):
+    from app.database import AsyncSessionLocal
+    from app.repositories.user_repository import ProfileRepository
+    from app.ai.saju_engine import get_engine
+    from app.ai.score_distribution import PersonHistogram
+
+    engine = get_engine()
+    histogram = PersonHistogram()
+
+    async with AsyncSessionLocal() as session:
+        async for people in ProfileRepository(session).stream_saju_people(chunk_size):
+            pillars, penalty = engine.resolve_people(people)
+            histogram.add((pillars[:, 0] - 1) * 12 + pillars[:, 1] - 1, penalty)
+            print(f"  {histogram.total} profiles")
+
+    if histogram.total < min_population:
+        print(f"⚠ Only {histogram.total} profiles (< {min_population}), keeping the current distribution")
+        return None
+
+    return publish(engine, engine.build_distribution(histogram, source='profiles'), output_path)
+
+
+def publish(engine, distribution, output_path):
+    checksum = distribution.save(output_path)
+
+    print(f"✓ Published to: {output_path}")
+    print(f"  Source: {distribution.metadata['source']}, population: {distribution.metadata['population']}, "
+          f"{distribution.metadata['types']} types")
+    print(f"  Engine version: {engine.content_version}, distribution version: {distribution.version}")
+    print(f"  Checksum: {checksum}")
+    return distribution
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--output', default=settings.SCORE_DISTRIBUTION_PATH)
+    parser.add_argument('--combinations', action='store_true',
+                        help='Publish the distribution over all pillar/gender combinations instead of profiles')
+    parser.add_argument('--chunk-size', type=int, default=5000)
+    parser.add_argument('--min-population', type=int, default=1000)
+    args = parser.parse_args()
+
+    if args.combinations:
+        from app.ai.saju_engine import get_engine
+
+        engine = get_engine()
+        publish(engine, engine.build_distribution(engine.combination_histogram(), source='combinations'), args.output)
+    else:
+        asyncio.run(refresh(args.output, args.chunk_size, args.min_population))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,475 @@
+"""
+Check every fast SajuEngine path against references that do not share its code or data.
+
+Reference paths:
+  - scores:  one model.predict() per pair with the Keras models (needs TensorFlow)
+             and the baseline's hand-written rule-score fallback
+  - rules:   the original notebook's calculate() and p* weights, extracted from
+             hd2.ipynb and run as-is
+  - pillars: the notebook's getCalendar() for year/month pillars, and a
+             date.toordinal() count from 2000-01-01 (무오일) for day/hour pillars
+
+The notebook has known bugs that the engine fixes on purpose. The reference
+applies the same fixes, and only those:
+  - calculate() evaluates sal slots 0 and 7 wrongly for person A (nested a3==7
+    check, p82 reading the day stem) and slot 1 wrongly for person B
+    (ungendered b3==5 branch). Those slots are taken from the other side.
+  - getCalendar()'s year branch is two branches off the standard cycle.
+  - Most cal.csv rows repeat the 1905 yyyymm columns. Each row's ddhhmm values
+    are read under the row's own year, as the engine does.
+The calendar reference only covers the years in cal.csv (1904-2021). The
+engine fills later years from the nearest row, which is checked for
+consistency only (lookup table vs direct computation).
+
+Without TensorFlow there is no independent model reference. The model-score
+checks then compare the engine against its own models, are marked [self],
+and the run exits with status 1 unless --allow-unverified is passed.
+
+Fast paths compared against the references: precomputed sky/earth tables,
+batched prediction, the configured backend (numpy/bundle), the compiled rule
+table, the pillar lookup table, single and batch analyze_compatibility.
+
+Enumerated exhaustively: all 10x10 sky pairs, all 12x12 earth pairs and every
+realizable (year, month, day) pillar combination x gender for the rules.
+Birth datetimes are sampled densely (every hour of every --day-step days).
+
+Each check reports throughput so correctness and speed regressions show up
+together. Exits with status 1 when any check fails.
+"""
+import argparse
+import ast
+import json
+import os
+import time
+from datetime import date
+
+import numpy as np
+
+from app.config import settings
+
+DEFAULT_NOTEBOOK = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'hd2.ipynb')
+
+# Notebook typos the engine fixes: slot -> the side whose calculate() output is correct
+NOTEBOOK_SAL_SIDE = {0: 'b', 1: 'a', 7: 'b'}
+
+# 2000-01-01 is 무오일: stem 무 (5), branch 오 (7)
+DAY_ANCHOR = date(2000, 1, 1)
+DAY_ANCHOR_STEM, DAY_ANCHOR_BRANCH = 5, 7
+
+# Stem of the 자시 hour for each day stem: 갑기일 갑자시, 을경일 병자시, 병신일 무자시, 정임일 경자시, 무계일 임자시
+ZI_HOUR_STEM = {1: 1, 6: 1, 2: 3, 7: 3, 3: 5, 8: 5, 4: 7, 9: 7, 5: 9, 10: 9}
+
+
+def reference_pair_score(model, size, first, second, rule_score):
+    """One predict() per pair; rule score when the prediction fails or looks untrained."""
+    inputs = np.zeros((1, size * 2))
+    inputs[0, first - 1] = 1
+    inputs[0, size + second - 1] = 1
+    try:
+        score = float(np.clip(np.asarray(model.predict(inputs, verbose=0))[0][0], 0.0, 1.0))
+    except Exception:
+        score = None
+    if score is None or score > 0.99 or score < 0.01:
+        return float(rule_score(abs(first - second)))
+    return score
+
+
+def reference_sky_rule_score(diff):
+    """The baseline engine's hand-written sky fallback."""
+    if diff == 5:
+        return 0.9
+    elif diff == 6 or diff == 4:
+        return 0.3
+    elif diff == 0:
+        return 0.7
+    elif diff == 1 or diff == 9:
+        return 0.65
+    return 0.6
+
+
+def reference_earth_rule_score(diff):
+    """The baseline engine's hand-written earth fallback."""
+    if diff == 1 or diff == 11:
+        return 0.85
+    elif diff == 6:
+        return 0.2
+    elif diff == 4 or diff == 8:
+        return 0.95
+    elif diff == 3 or diff == 9:
+        return 0.4
+    elif diff == 0:
+        return 0.75
+    return 0.6
+
+
+class _CalendarNumpy:
+    """numpy for the notebook code, with np.loadtxt() returning the already loaded calendar."""
+
+    def __init__(self, rows):
+        self.rows = rows
+
+    def loadtxt(self, *args, **kwargs):
+        return self.rows
+
+    def __getattr__(self, name):
+        return getattr(np, name)
+
+
+def load_calendar_rows(path):
+    """cal.csv rows with every yyyymm column rewritten from the row's own year."""
+    rows = np.loadtxt(path, delimiter=',', skiprows=1, encoding='latin-1')
+    years = rows[:, 0].astype(np.int64)
+    if not (np.diff(years) == 1).all() or years[0] != 1904:
+        raise SystemExit(f"❌ {path}: getCalendar() expects one row per year from 1904")
+    stale = int((rows[:, 1] // 100 != years).sum())
+    for month in range(12):
+        rows[:, 1 + month * 2] = years * 100 + month + 1
+    return rows, int(years[-1]), stale
+
+
+class Notebook:
+    """calculate() and getCalendar() from the original notebook, run unchanged."""
+
+    def __init__(self, path, calendar_rows):
+        if not os.path.exists(path):
+            raise SystemExit(f"❌ Notebook not found: {path} (the rule and calendar references come from it; see --notebook)")
+        with open(path, encoding='utf-8') as f:
+            cells = json.load(f)['cells']
+        source = next(
+            ''.join(cell['source']) for cell in cells
+            if cell['cell_type'] == 'code' and 'def calculate(' in ''.join(cell['source'])
+        )
+        # Keep only the functions and the p* weight assignments; the rest loads models and asks for input
+        body = [
+            node for node in ast.parse(source).body
+            if (isinstance(node, ast.FunctionDef) and node.name in ('calculate', 'getCalendar'))
+            or (isinstance(node, ast.Assign) and all(
+                isinstance(target, ast.Name) and target.id[0] == 'p' and target.id[1:].isdigit()
+                for target in node.targets
+            ))
+        ]
+        namespace = {'np': _CalendarNumpy(calendar_rows), 'calendarFile': None}
+        exec(compile(ast.Module(body=body, type_ignores=[]), path, 'exec'), namespace)
+        self.calculate = namespace['calculate']
+        self.get_calendar = namespace['getCalendar']
+        self.weights = {name: value for name, value in namespace.items() if name[0] == 'p' and name[1:].isdigit()}
+        self._sal = {}
+
+    def sal_sides(self, token, gender):
+        """calculate() with the same person on both sides: (person A reading, person B reading)."""
+        _, sal_a, sal_b = self.calculate(list(token), list(token), gender, gender, np.float64(100.0))
+        return [float(v) for v in sal_a], [float(v) for v in sal_b]
+
+    def sal(self, token, gender):
+        key = (tuple(token[:6]), gender)
+        if key not in self._sal:
+            sal_a, sal_b = self.sal_sides(token, gender)
+            self._sal[key] = [
+                (sal_b if NOTEBOOK_SAL_SIDE.get(slot) == 'b' else sal_a)[slot] for slot in range(len(sal_a))
+            ]
+        return self._sal[key]
+
+    def year_month(self, year, month, day, hour):
+        year_sky, year_earth, month_sky, month_earth = self.get_calendar(year, month, day, hour, 0)
+        # The notebook's year branch is two branches off (1984 must be 갑자)
+        return [year_sky, (year_earth + 1) % 12 + 1, month_sky, month_earth]
+
+    def pillars(self, year, month, day, hour):
+        return self.year_month(year, month, day, hour) + reference_day_hour(year, month, day, hour)
+
+
+def reference_day_hour(year, month, day, hour):
+    """Day and hour pillars by counting days from 2000-01-01 (무오일); 자시 starts at 23:00."""
+    days = (date(year, month, day) - DAY_ANCHOR).days + (hour >= 23)
+    day_sky = (DAY_ANCHOR_STEM - 1 + days) % 10 + 1
+    day_earth = (DAY_ANCHOR_BRANCH - 1 + days) % 12 + 1
+    branch = 0 if hour == 23 else (hour + 1) // 2
+    return [day_sky, day_earth, (ZI_HOUR_STEM[day_sky] - 1 + branch) % 10 + 1, branch + 1]
+
+
+def load_reference_models(engine):
+    """Keras models for the per-pair reference, or None without TensorFlow."""
+    try:
+        import tensorflow  # noqa: F401
+    except ImportError:
+        return None
+    return (
+        engine._load_keras_model('sky', settings.SKY_MODEL_PATH, 20),
+        engine._load_keras_model('earth', settings.EARTH_MODEL_PATH, 24)
+    )
+
+
+class Report:
+
+    def __init__(self):
+        self.checks = []
+
+    def add(self, name, rows, seconds, expected, actual, tolerance, independent=True):
+        """independent=False marks a check whose expected values come from the engine itself."""
+        expected = np.asarray(expected, dtype=np.float64)
+        actual = np.asarray(actual, dtype=np.float64)
+        diff = np.abs(expected - actual).reshape(len(expected), -1).max(axis=1) if len(expected) else np.zeros(0)
+        check = {
+            'name': name,
+            'rows': int(rows),
+            'seconds': round(seconds, 4),
+            'rows_per_sec': round(rows / seconds) if seconds > 0 else None,
+            'max_abs_diff': float(diff.max()) if len(diff) else 0.0,
+            'mismatches': int((diff > tolerance).sum()),
+            'tolerance': tolerance,
+            'independent': independent
+        }
+        check['ok'] = check['mismatches'] == 0
+        self.checks.append(check)
+
+        mark = '❌' if not check['ok'] else '✓' if independent else '⚠'
+        label = name if independent else f"[self] {name}"
+        rate = f"{check['rows_per_sec']:,}/s" if check['rows_per_sec'] else '-'
+        print(f"{mark} {label:<46} rows={rows:>9,}  {rate:>14}  max_diff={check['max_abs_diff']:.3g}"
+              + ('' if check['ok'] else f"  mismatches={check['mismatches']}"))
+        return check
+
+    @property
+    def ok(self):
+        return all(check['ok'] for check in self.checks)
+
+    @property
+    def unverified(self):
+        return [check['name'] for check in self.checks if not check['independent']]
+
+
+def timed(fn, *args, **kwargs):
+    started = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - started
+
+
+def check_scores(engine, report, tolerance):
+    print("\n[1] Sky/earth pair scores (all pairs)")
+    models = load_reference_models(engine)
+    if models is None:
+        print("⚠ TensorFlow is not installed: model scores are compared against the engine's own models [self]")
+        models, independent = (engine.sky_model, engine.earth_model), False
+    else:
+        independent = True
+    print(f"  reference backend: {'keras' if independent else engine.backend}, engine backend: {engine.backend}")
+
+    references = {}
+    for kind, model, size, reference_rule, rule_score, table in (
+        ('sky', models[0], 10, reference_sky_rule_score, engine._sky_rule_score, engine.sky_table),
+        ('earth', models[1], 12, reference_earth_rule_score, engine._earth_rule_score, engine.earth_table),
+    ):
+        diffs = np.arange(size)
+        report.add(f"{kind} rule fallback vs baseline", size, 0.0,
+                   [reference_rule(d) for d in diffs.tolist()], rule_score(diffs), 0)
+
+        first, second = np.divmod(np.arange(size * size), size)
+        first, second = first + 1, second + 1
+
+        expected, seconds = timed(lambda: np.array([
+            reference_pair_score(model, size, a, b, reference_rule) for a, b in zip(first.tolist(), second.tolist())
+        ]))
+        report.add(f"{kind} reference (per-pair predict)", len(first), seconds, expected, expected, tolerance, independent)
+
+        actual, seconds = timed(engine.score_pairs, kind, first, second)
+        report.add(f"{kind} score table", len(first), seconds, expected, actual, tolerance, independent)
+
+        actual, seconds = timed(engine._predict_scores, getattr(engine, f"{kind}_model"), size, first, second, rule_score)
+        report.add(f"{kind} batched predict ({engine.backend})", len(first), seconds, expected, actual, tolerance, independent)
+
+        references[kind] = expected.reshape(size, size)
+        if not np.allclose(table, references[kind], atol=tolerance):
+            print(f"  ⚠ {kind} table differs from reference at {np.argwhere(np.abs(table - references[kind]) > tolerance).tolist()[:5]}")
+    return references, independent
+
+
+def rule_combinations():
+    """Every realizable (year, month, day) pillar combination x gender. Hour pillars are not used by the rules."""
+    cycle = np.arange(60)
+    stems, branches = cycle % 10 + 1, cycle % 12 + 1
+    y, m, d = np.meshgrid(cycle, cycle, cycle, indexing='ij')
+    y, m, d = y.ravel(), m.ravel(), d.ravel()
+    tokens = np.stack([stems[y], branches[y], stems[m], branches[m], stems[d], branches[d],
+                       np.ones_like(y), np.ones_like(y)], axis=1)
+    gender = np.repeat([0, 1], len(tokens))
+    return np.concatenate([tokens, tokens]), gender
+
+
+def check_rules(engine, notebook, report, tolerance):
+    print("\n[2] Sal rules (every realizable year/month/day pillar combination x gender)")
+    tokens, gender = rule_combinations()
+    token_list, gender_list = tokens.tolist(), gender.tolist()
+
+    weights = {name: notebook.weights.get(name) for name in engine.WEIGHTS}
+    if weights != engine.WEIGHTS:
+        print(f"  ⚠ weights differ from the notebook: engine {engine.WEIGHTS}, notebook {notebook.weights}")
+
+    sides, seconds = timed(lambda: [notebook.sal_sides(token, g) for token, g in zip(token_list, gender_list)])
+    sal_a = np.array([a for a, _ in sides])
+    sal_b = np.array([b for _, b in sides])
+    shared = [slot for slot in range(sal_a.shape[1]) if slot not in NOTEBOOK_SAL_SIDE]
+    report.add("notebook calculate() A/B sides agree", len(tokens), seconds, sal_a[:, shared], sal_b[:, shared], tolerance)
+
+    expected = sal_a.copy()
+    for slot, side in NOTEBOOK_SAL_SIDE.items():
+        if side == 'b':
+            expected[:, slot] = sal_b[:, slot]
+    print(f"  notebook typos fixed by the engine (slot: rows where the buggy side differs): "
+          f"{ {slot: int((np.abs(sal_a[:, slot] - sal_b[:, slot]) > tolerance).sum()) for slot in NOTEBOOK_SAL_SIDE} }")
+
+    actual, seconds = timed(engine.rules.evaluate, tokens, gender)
+    report.add("rule table (vectorized)", len(tokens), seconds, expected, actual, tolerance)
+
+    # Make sure the enumeration actually triggers every penalty slot
+    slots_hit = (expected > 0).any(axis=0)
+    print(f"  triggered slots: {np.flatnonzero(slots_hit).tolist()}, distinct penalty vectors: {len(np.unique(expected, axis=0))}")
+
+    sample = np.random.default_rng(0).choice(len(tokens) // 2, 2000, replace=False)
+    pairs = [(token_list[i], token_list[-1 - i], gender_list[i], gender_list[-1 - i]) for i in sample.tolist()]
+
+    def detailed():
+        return np.array([engine.calculate_detailed_compatibility(t0, t1, g0, g1, 100.0)[0] for t0, t1, g0, g1 in pairs])
+
+    actual, seconds = timed(detailed)
+    expected = np.array([
+        100.0 - sum(notebook.sal(t0, g0)) - sum(notebook.sal(t1, g1))
+        for t0, t1, g0, g1 in pairs
+    ])
+    report.add("calculate_detailed_compatibility", len(pairs), seconds, expected, actual, tolerance)
+
+
+def birth_datetimes(start, end, day_step):
+    days = np.arange(date(start, 1, 1).toordinal(), date(end, 12, 31).toordinal() + 1, day_step)
+    dates = [date.fromordinal(int(d)) for d in days]
+    year = np.repeat([d.year for d in dates], 24)
+    month = np.repeat([d.month for d in dates], 24)
+    day = np.repeat([d.day for d in dates], 24)
+    hour = np.tile(np.arange(24), len(dates))
+    return year, month, day, hour
+
+
+def check_pillars(engine, notebook, calendar_end, report, day_step, samples):
+    print(f"\n[3] Pillars (every hour of every {day_step} day(s))")
+    year, month, day, hour = birth_datetimes(1904, calendar_end, day_step)
+    inputs = list(zip(year.tolist(), month.tolist(), day.tolist(), hour.tolist()))
+
+    expected, seconds = timed(lambda: np.array([notebook.pillars(*x) for x in inputs]))
+    report.add(f"notebook getCalendar + day count 1904-{calendar_end}", len(inputs), seconds, expected, expected, 0)
+
+    actual, seconds = timed(engine._get_saju_pillars_batch, year, month, day, hour)
+    report.add("pillars lookup table (batch)", len(year), seconds, expected, actual, 0)
+
+    actual, seconds = timed(engine._compute_saju_pillars_batch, year, month, day, hour)
+    report.add("pillars direct computation", len(year), seconds, expected, actual, 0)
+
+    rng = np.random.default_rng(1)
+    sample = rng.choice(len(year), min(samples, len(year)), replace=False)
+    actual, seconds = timed(lambda: np.array([engine._get_saju_pillars(*inputs[i]) for i in sample.tolist()]))
+    report.add("pillars lookup table (single)", len(sample), seconds, expected[sample], actual, 0)
+
+    # Outside the calendar years only the two engine paths can be compared with each other;
+    # the day/hour pillars still have the day-count reference
+    year, month, day, hour = (
+        np.concatenate(parts) for parts in zip(birth_datetimes(1900, 1903, day_step), birth_datetimes(calendar_end + 1, 2100, day_step))
+    )
+    expected, seconds = timed(engine._compute_saju_pillars_batch, year, month, day, hour)
+    actual, seconds = timed(engine._get_saju_pillars_batch, year, month, day, hour)
+    report.add(f"lookup table vs direct, 1900-1903/{calendar_end + 1}-2100", len(year), seconds, expected, actual, 0)
+
+    inputs = list(zip(year.tolist(), month.tolist(), day.tolist(), hour.tolist()))
+    reference, seconds = timed(lambda: np.array([reference_day_hour(*x) for x in inputs]))
+    report.add("day/hour pillars vs day count (same years)", len(inputs), seconds, reference, actual[:, 4:], 0)
+
+
+def check_end_to_end(engine, notebook, calendar_end, report, references, scores_independent, pairs, score_tolerance):
+    print(f"\n[4] analyze_compatibility ({pairs:,} random pairs, 1904-{calendar_end})")
+    rng = np.random.default_rng(2)
+    start, end = date(1904, 1, 1).toordinal(), date(calendar_end, 12, 31).toordinal()
+    people = []
+    for _ in range(2):
+        dates = [date.fromordinal(int(d)) for d in rng.integers(start, end + 1, pairs)]
+        people.append((
+            np.array([d.year for d in dates]), np.array([d.month for d in dates]), np.array([d.day for d in dates]),
+            rng.integers(0, 24, pairs), rng.integers(0, 2, pairs)
+        ))
+    (y1, m1, d1, h1, g1), (y2, m2, d2, h2, g2) = people
+
+    def reference():
+        saju1 = [notebook.pillars(*x) for x in zip(y1.tolist(), m1.tolist(), d1.tolist(), h1.tolist())]
+        saju2 = [notebook.pillars(*x) for x in zip(y2.tolist(), m2.tolist(), d2.tolist(), h2.tolist())]
+        scores = []
+        for t1, t2, a, b in zip(saju1, saju2, g1.tolist(), g2.tolist()):
+            base = (references['sky'][t1[0] - 1, t2[0] - 1] + references['earth'][t1[1] - 1, t2[1] - 1]) / 2 * 100
+            score = base - sum(notebook.sal(t1, a)) - sum(notebook.sal(t2, b))
+            scores.append(round(max(0, min(100, score)), 2))
+        return np.array(scores)
+
+    expected, seconds = timed(reference)
+    report.add("reference pipeline", pairs, seconds, expected, expected, score_tolerance, scores_independent)
+
+    columns = list(zip(*(array.tolist() for array in (y1, m1, d1, h1, g1, y2, m2, d2, h2, g2))))
+    actual, seconds = timed(lambda: np.array([engine.analyze_compatibility(*row)['compatibility_score'] for row in columns]))
+    report.add("analyze_compatibility (single)", pairs, seconds, expected, actual, score_tolerance, scores_independent)
+
+    result, seconds = timed(engine.analyze_compatibility_batch, y1, m1, d1, h1, g1, y2, m2, d2, h2, g2)
+    report.add("analyze_compatibility_batch", pairs, seconds, expected, result['compatibility_score'],
+               score_tolerance, scores_independent)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--bundle', default=None, help='Engine bundle to verify (default: ENGINE_BUNDLE_PATH)')
+    parser.add_argument('--notebook', default=DEFAULT_NOTEBOOK, help='Original notebook with calculate()/getCalendar()')
+    parser.add_argument('--day-step', type=int, default=1, help='Sample every N days for the pillar check')
+    parser.add_argument('--samples', type=int, default=20000, help='Datetimes for the single-call pillar checks')
+    parser.add_argument('--pairs', type=int, default=20000, help='Random pairs for the end-to-end check')
+    parser.add_argument('--tolerance', type=float, default=1e-5, help='Allowed difference for raw model scores and penalties')
+    parser.add_argument('--score-tolerance', type=float, default=0.01, help='Allowed difference for rounded final scores')
+    parser.add_argument('--allow-unverified', action='store_true',
+                        help='Exit 0 even when model scores could only be compared against the engine itself')
+    parser.add_argument('--json', default=None, help='Write the report as JSON to this path')
+    args = parser.parse_args()
+
+    from app.ai.result_cache import AnalysisCache
+    from app.ai.saju_engine import SajuEngine
+
+    calendar_rows, calendar_end, stale = load_calendar_rows(settings.CALENDAR_FILE_PATH)
+    notebook = Notebook(args.notebook, calendar_rows)
+    print(f"✓ Notebook reference loaded from {args.notebook} "
+          f"(cal.csv 1904-{calendar_end}, {stale} rows with stale yyyymm columns re-dated)")
+
+    engine, seconds = timed(SajuEngine, args.bundle)
+    # Disable the result cache so hits do not inflate throughput
+    engine.result_cache = AnalysisCache(0)
+    print(f"✓ Engine {engine.version} loaded in {seconds:.2f}s")
+
+    report = Report()
+    references, scores_independent = check_scores(engine, report, args.tolerance)
+    check_rules(engine, notebook, report, args.tolerance)
+    check_pillars(engine, notebook, calendar_end, report, args.day_step, args.samples)
+    check_end_to_end(engine, notebook, calendar_end, report, references, scores_independent, args.pairs, args.score_tolerance)
+
+    unverified = report.unverified
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({
+                'engine_version': engine.version,
+                'ok': report.ok,
+                'verified': not unverified,
+                'unverified': unverified,
+                'checks': report.checks
+            }, f, indent=2)
+        print(f"\n✓ Report written to {args.json}")
+
+    if not report.ok:
+        print("\n❌ Some paths differ from the reference")
+        raise SystemExit(1)
+    if unverified:
+        print(f"\n⚠ UNVERIFIED: {len(unverified)} checks only compared the engine with itself "
+              f"(install TensorFlow for the Keras reference): {', '.join(unverified)}")
+        raise SystemExit(0 if args.allow_unverified else 1)
+    print("\n✅ All paths match the reference")
+
+
+if __name__ == '__main__':
+    main()